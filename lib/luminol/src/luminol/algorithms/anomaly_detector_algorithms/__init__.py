@@ -9,6 +9,8 @@ Unless required by applicable law or agreed to in writing, software
 distributed under the License is distributed on an "AS IS" BASIS,
 WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 """
+import numpy
+
 from luminol.constants import *
 
 __all__ = ['bitmap_detector', 'derivative_detector', 'exp_avg_detector', 'default_detector', 'absolute_threshold',
@@ -47,8 +49,14 @@ class AnomalyDetectorAlgorithm(object):
     [0.08, 4.6, 4.6, 4.6, 1.0, 1.0]
     [0.0010, 0.0012, 0.0012, 0.0008, 0.0008]
     while the second series is pretty flat(suppose it has a max score of 100).
-    param dict scores: the scores to be denoised.
+    param scores: the scores to be denoised, a dict or a numpy array.
     """
+    if isinstance(scores, numpy.ndarray):
+      if len(scores):
+        maximal = scores.max()
+        if maximal:
+          scores = numpy.where(scores < DEFAULT_NOISE_PCT_THRESHOLD * maximal, 0.0, scores)
+      return scores
     if scores:
       maximal = max(scores.values())
       if maximal:
@@ -9,9 +9,7 @@ Unless required by applicable law or agreed to in writing, software
 distributed under the License is distributed on an "AS IS" BASIS,
 WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 """
-from collections import defaultdict
-from copy import copy
-import math
+import numpy
 
 from luminol import exceptions
 from luminol.algorithms.anomaly_detector_algorithms import AnomalyDetectorAlgorithm
@@ -68,141 +66,91 @@ class BitmapDetector(AnomalyDetectorAlgorithm):
     if self.future_window_size > DEFAULT_BITMAP_MAXIMAL_POINTS_IN_WINDOWS:
       self.future_window_size = DEFAULT_BITMAP_MAXIMAL_POINTS_IN_WINDOWS
 
-  def _generate_SAX_single(self, sections, value):
-    """
-    Generate SAX representation(Symbolic Aggregate approXimation) for a single data point.
-    Read more about it here: Assumption-Free Anomaly Detection in Time Series(http://alumni.cs.ucr.edu/~ratana/SSDBM05.pdf).
-    :param dict sections: value sections.
-    :param float value: value to be categorized.
-    :return str: a SAX representation.
-    """
-    sax = 0
-    for section_number in sections.keys():
-      section_lower_bound = sections[section_number]
-      if value >= section_lower_bound:
-        sax = section_number
-      else:
-        break
-    return str(sax)
+    # Each window has to hold at least one chunk.
+    if self.chunk_size > min(self.lag_window_size, self.future_window_size):
+      raise exceptions.NotEnoughDataPoints
 
   def _generate_SAX(self):
     """
-    Generate SAX representation for all values of the time series.
+    Generate SAX representation(Symbolic Aggregate approXimation) for all values of the time series: each value is
+    replaced by the number of the section of the value range it falls in.
+    Read more about it here: Assumption-Free Anomaly Detection in Time Series(http://alumni.cs.ucr.edu/~ratana/SSDBM05.pdf).
     """
-    sections = {}
     self.value_min = self.time_series.min()
     self.value_max = self.time_series.max()
     # Break the whole value range into different sections.
     section_height = (self.value_max - self.value_min) / self.precision
-    for section_number in range(self.precision):
-      sections[section_number] = self.value_min + section_number * section_height
-    # Generate SAX representation.
-    self.sax = ''.join(self._generate_SAX_single(sections, value) for value in self.time_series.values)
+    section_lower_bounds = self.value_min + numpy.arange(self.precision) * section_height
+    sections = numpy.maximum(numpy.digitize(self.time_series.values_array, section_lower_bounds) - 1, 0)
+    # Symbols are the digits of the section numbers, sections numbers past 9 take two symbols.
+    if self.precision > 10:
+      self.sax = ''.join(str(section) for section in sections.tolist())
+    else:
+      self.sax = (sections + ord('0')).astype(numpy.uint8).tostring()
+    self.sax_symbols = numpy.frombuffer(self.sax, dtype=numpy.uint8) - ord('0')
 
-  def _construct_SAX_chunk_dict(self, sax):
+  def _generate_SAX_chunk_ids(self):
     """
-    Form a chunk frequency dictionary from a SAX representation.
-    :param str sax: a SAX representation.
-    :return dict: frequency dictionary for chunks in the SAX representation.
+    Number the distinct chunks of the SAX representation.
+    :return: tuple of a numpy array of the id of the chunk starting at each position and the number of distinct chunks.
     """
-    frequency = defaultdict(int)
     chunk_size = self.chunk_size
-    length = len(sax)
-    for i in range(length):
-      if i + chunk_size <= length:
-        chunk = sax[i: i + chunk_size]
-        frequency[chunk] += 1
-    return frequency
+    alphabet_size = 10 if self.precision > 10 else self.precision
+    chunk_count = len(self.sax_symbols) - chunk_size + 1
+    if alphabet_size ** chunk_size < 2 ** 62:
+      codes = numpy.zeros(chunk_count, dtype=numpy.int64)
+      for offset in range(chunk_size):
+        codes = codes * alphabet_size + self.sax_symbols[offset:offset + chunk_count]
+    else:
+      codes = numpy.lib.stride_tricks.as_strided(self.sax_symbols, shape=(chunk_count, chunk_size), strides=self.sax_symbols.strides * 2)
+      codes = codes.copy().view(numpy.dtype((numpy.void, chunk_size))).ravel()
+    chunks, chunk_ids = numpy.unique(codes, return_inverse=True)
+    return chunk_ids, len(chunks)
 
-  def _construct_all_SAX_chunk_dict(self):
+  def _compute_anom_scores_between_windows(self):
     """
-    Construct the chunk dicts for lagging window and future window at each index.
-     e.g: Suppose we have a SAX sequence as '1234567890', both window sizes are 3, and the chunk size is 2.
-     The first index that has a lagging window is 3. For index equals 3, the lagging window has sequence '123',
-     the chunk to leave lagging window(lw_leave_chunk) is '12', and the chunk to enter lagging window(lw_enter_chunk) is '34'.
-     Therefore, given chunk dicts at i, to compute chunk dicts at i+1, simply decrement the count for lw_leave_chunk,
-     and increment the count for lw_enter_chunk from chunk dicts at i. Same method applies to future window as well.
+    Slide a lagging window and a future window over the SAX representation and compute the distance between the
+    chunk frequencies of both windows, which is the anomaly score of the data point on the window boundary in the
+    middle. The distance is the sum of the squared differences of the frequencies of each chunk.
+
+    The difference between the frequencies of the two windows is kept in a single count array: moving the windows one
+    point ahead adds a chunk to each window and removes one from each. The count arrays of a block of consecutive data
+    points are the cumulative sums of these updates, so that they are scored in vector form.
+    :return: numpy array of the anomaly scores of the data points between lws and length - fws.
     """
-    lag_dicts = {}
-    fut_dicts = {}
-    length = self.time_series_length
+    chunk_ids, chunk_count = self._generate_SAX_chunk_ids()
     lws = self.lag_window_size
     fws = self.future_window_size
     chunk_size = self.chunk_size
-
-    for i in range(length):
-      # If i is too small or too big, there will be no chunk dicts.
-      if i < lws or i > length - fws:
-        lag_dicts[i] = None
-
-      else:
-        # Just enter valid range.
-        if lag_dicts[i - 1] is None:
-          lag_dict = self._construct_SAX_chunk_dict(self.sax[i - lws: i])
-          lag_dicts[i] = lag_dict
-          lw_leave_chunk = self.sax[0:chunk_size]
-          lw_enter_chunk = self.sax[i - chunk_size + 1: i + 1]
-
-          fut_dict = self._construct_SAX_chunk_dict(self.sax[i: i + fws])
-          fut_dicts[i] = fut_dict
-          fw_leave_chunk = self.sax[i: i + chunk_size]
-          fw_enter_chunk = self.sax[i + fws + 1 - chunk_size: i + fws + 1]
-
-        else:
-          # Update dicts according to leave_chunks and enter_chunks.
-          lag_dict = copy(lag_dicts[i - 1])
-          lag_dict[lw_leave_chunk] -= 1
-          lag_dict[lw_enter_chunk] += 1
-          lag_dicts[i] = lag_dict
-
-          fut_dict = copy(fut_dicts[i - 1])
-          fut_dict[fw_leave_chunk] -= 1
-          fut_dict[fw_enter_chunk] += 1
-          fut_dicts[i] = fut_dict
-
-          # Updata leave_chunks and enter_chunks.
-          lw_leave_chunk = self.sax[i - lws: i - lws + chunk_size]
-          lw_enter_chunk = self.sax[i - chunk_size + 1: i + 1]
-          fw_leave_chunk = self.sax[i: i + chunk_size]
-          fw_enter_chunk = self.sax[i + fws + 1 - chunk_size: i + fws + 1]
-
-    self.lag_dicts = lag_dicts
-    self.fut_dicts = fut_dicts
-
-  def _compute_anom_score_between_two_windows(self, i):
-    """
-    Compute distance difference between two windows' chunk frequencies,
-    which is then marked as the anomaly score of the data point on the window boundary in the middle.
-    :param int i: index of the data point between two windows.
-    :return float: the anomaly score.
-    """
-    lag_window_chunk_dict = self.lag_dicts[i]
-    future_window_chunk_dict = self.fut_dicts[i]
-    score = 0
-    for chunk in lag_window_chunk_dict:
-      if chunk in future_window_chunk_dict:
-        score += math.pow(future_window_chunk_dict[chunk] - lag_window_chunk_dict[chunk], 2)
-      else:
-        score += math.pow(lag_window_chunk_dict[chunk], 2)
-    for chunk in future_window_chunk_dict:
-      if chunk not in lag_window_chunk_dict:
-        score += math.pow(future_window_chunk_dict[chunk], 2)
-    return score
+    first = lws
+    last = self.time_series_length - fws
+    # The chunks of a window of [start, end) are the ones starting in [start, end - chunk_size].
+    difference = (numpy.bincount(chunk_ids[first:first + fws - chunk_size + 1], minlength=chunk_count) -
+                  numpy.bincount(chunk_ids[first - lws:first - chunk_size + 1], minlength=chunk_count))
+    scores = numpy.empty(last - first + 1, dtype=numpy.float64)
+    scores[0] = numpy.dot(difference, difference)
+    block_size = max(1, BITMAP_SCORE_BLOCK_ELEMENTS // chunk_count)
+    for block_start in range(first + 1, last + 1, block_size):
+      indexes = numpy.arange(block_start, min(block_start + block_size, last + 1))
+      rows = numpy.arange(len(indexes))
+      updates = numpy.zeros((len(indexes), chunk_count), dtype=numpy.int64)
+      # Chunks entering and leaving the future window and the lagging window.
+      numpy.add.at(updates, (rows, chunk_ids[indexes + fws - chunk_size]), 1)
+      numpy.add.at(updates, (rows, chunk_ids[indexes - 1]), -1)
+      numpy.add.at(updates, (rows, chunk_ids[indexes - chunk_size]), -1)
+      numpy.add.at(updates, (rows, chunk_ids[indexes - 1 - lws]), 1)
+      differences = numpy.cumsum(updates, axis=0, out=updates)
+      differences += difference
+      scores[indexes - first] = numpy.einsum('ij,ij->i', differences, differences)
+      difference = differences[-1].copy()
+    return scores
 
   def _set_scores(self):
     """
     Compute anomaly scores for the time series by sliding both lagging window and future window.
+    Data points without a full lagging window or future window have a score of 0.
     """
-    anom_scores = {}
     self._generate_SAX()
-    self._construct_all_SAX_chunk_dict()
-    length = self.time_series_length
-    lws = self.lag_window_size
-    fws = self.future_window_size
-
-    for i, timestamp in enumerate(self.time_series.timestamps):
-      if i < lws or i > length - fws:
-        anom_scores[timestamp] = 0
-      else:
-        anom_scores[timestamp] = self._compute_anom_score_between_two_windows(i)
-    self.anom_scores = TimeSeries(self._denoise_scores(anom_scores))
+    scores = numpy.zeros(self.time_series_length, dtype=numpy.float64)
+    scores[self.lag_window_size:self.time_series_length - self.future_window_size + 1] = self._compute_anom_scores_between_windows()
+    self.anom_scores = TimeSeries.from_arrays(self.time_series.timestamps_array, self._denoise_scores(scores))
@@ -9,6 +9,8 @@ Unless required by applicable law or agreed to in writing, software
 distributed under the License is distributed on an "AS IS" BASIS,
 WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 """
+import numpy
+
 from exp_avg_detector import ExpAvgDetector
 from derivative_detector import DerivativeDetector
 from luminol.algorithms.anomaly_detector_algorithms import AnomalyDetectorAlgorithm
@@ -37,12 +39,12 @@ class DefaultDetector(AnomalyDetectorAlgorithm):
     """
     anom_scores_ema = self.exp_avg_detector.run()
     anom_scores_deri = self.derivative_detector.run()
-    anom_scores = {}
-    for timestamp in anom_scores_ema.timestamps:
-      # Compute a weighted anomaly score.
-      anom_scores[timestamp] = max(anom_scores_ema[timestamp],
-                                   anom_scores_ema[timestamp] * DEFAULT_DETECTOR_EMA_WEIGHT + anom_scores_deri[timestamp] * (1 - DEFAULT_DETECTOR_EMA_WEIGHT))
-      # If ema score is significant enough, take the bigger one of the weighted score and deri score.
-      if anom_scores_ema[timestamp] > DEFAULT_DETECTOR_EMA_SIGNIFICANT:
-        anom_scores[timestamp] = max(anom_scores[timestamp], anom_scores_deri[timestamp])
-    self.anom_scores = TimeSeries(self._denoise_scores(anom_scores))
+    # Both detectors score every timestamp of the time series.
+    ema = anom_scores_ema.values_array
+    deri = anom_scores_deri.values_array
+    # Compute a weighted anomaly score.
+    anom_scores = numpy.maximum(ema, ema * DEFAULT_DETECTOR_EMA_WEIGHT + deri * (1 - DEFAULT_DETECTOR_EMA_WEIGHT))
+    # If ema score is significant enough, take the bigger one of the weighted score and deri score.
+    significant = ema > DEFAULT_DETECTOR_EMA_SIGNIFICANT
+    anom_scores[significant] = numpy.maximum(anom_scores[significant], deri[significant])
+    self.anom_scores = TimeSeries.from_arrays(anom_scores_ema.timestamps_array, self._denoise_scores(anom_scores))
@@ -33,38 +33,30 @@ class DerivativeDetector(AnomalyDetectorAlgorithm):
     """
     super(DerivativeDetector, self).__init__(self.__class__.__name__, time_series, baseline_time_series)
     self.smoothing_factor = (smoothing_factor or DEFAULT_DERI_SMOOTHING_FACTOR)
-    self.time_series_items = self.time_series.items()
 
   def _compute_derivatives(self):
     """
     Compute derivatives of the time series.
     """
-    derivatives = []
-    for i, (timestamp, value) in enumerate(self.time_series_items):
-      if i > 0:
-        pre_item = self.time_series_items[i - 1]
-        pre_timestamp = pre_item[0]
-        pre_value = pre_item[1]
-        td = timestamp - pre_timestamp
-        derivative = (value - pre_value) / td if td != 0 else value - pre_value
-        derivative = abs(derivative)
-        derivatives.append(derivative)
+    timestamps = self.time_series.timestamps_array
+    values = self.time_series.values_array
+    td = numpy.diff(timestamps)
+    # Points at the same timestamp get the difference of their values.
+    td[td == 0] = 1
+    derivatives = numpy.abs(numpy.diff(values) / td)
     # First timestamp is assigned the same derivative as the second timestamp.
-    if derivatives:
-      derivatives.insert(0, derivatives[0])
+    if len(derivatives):
+      derivatives = numpy.insert(derivatives, 0, derivatives[0])
     self.derivatives = derivatives
 
   def _set_scores(self):
     """
     Compute anomaly scores for the time series.
     """
-    anom_scores = {}
     self._compute_derivatives()
     derivatives_ema = utils.compute_ema(self.smoothing_factor, self.derivatives)
-    for i, (timestamp, value) in enumerate(self.time_series_items):
-      anom_scores[timestamp] = abs(self.derivatives[i] - derivatives_ema[i])
-    stdev = numpy.std(anom_scores.values())
+    anom_scores = numpy.abs(self.derivatives - derivatives_ema)
+    stdev = numpy.std(anom_scores)
     if stdev:
-        for timestamp in anom_scores.keys():
-          anom_scores[timestamp] /= stdev
-    self.anom_scores = TimeSeries(self._denoise_scores(anom_scores))
+      anom_scores /= stdev
+    self.anom_scores = TimeSeries.from_arrays(self.time_series.timestamps_array, self._denoise_scores(anom_scores))
@@ -36,49 +36,28 @@ class ExpAvgDetector(AnomalyDetectorAlgorithm):
     self.use_lag_window = use_lag_window
     self.smoothing_factor = smoothing_factor if smoothing_factor > 0 else DEFAULT_EMA_SMOOTHING_FACTOR
     self.lag_window_size = lag_window_size if lag_window_size else int(self.time_series_length * DEFAULT_EMA_WINDOW_SIZE_PCT)
-    self.time_series_items = self.time_series.items()
-
-  def _compute_anom_score(self, lag_window_points, point):
-    """
-    Compute anomaly score for a single data point.
-    Anomaly score for a single data point(t,v) equals: abs(v - ema(lagging window)).
-    :param list lag_window_points: values in the lagging window.
-    :param float point: data point value.
-    :return float: the anomaly score.
-    """
-    ema = utils.compute_ema(self.smoothing_factor, lag_window_points)[-1]
-    return abs(point - ema)
 
   def _compute_anom_data_using_window(self):
     """
     Compute anomaly scores using a lagging window.
+    Anomaly score for a single data point(t,v) equals: abs(v - ema(lagging window)).
     """
-    anom_scores = {}
-    values = self.time_series.values
+    values = self.time_series.values_array
     stdev = numpy.std(values)
-    for i, (timestamp, value) in enumerate(self.time_series_items):
-      if i < self.lag_window_size:
-        anom_score = self._compute_anom_score(values[:i + 1], value)
-      else:
-        anom_score = self._compute_anom_score(values[i - self.lag_window_size: i + 1], value)
-      if stdev:
-        anom_scores[timestamp] = anom_score / stdev
-      else:
-        anom_scores[timestamp] = anom_score
-    self.anom_scores = TimeSeries(self._denoise_scores(anom_scores))
+    anom_scores = numpy.abs(values - utils.compute_window_ema(self.smoothing_factor, values, self.lag_window_size))
+    if stdev:
+      anom_scores /= stdev
+    self.anom_scores = TimeSeries.from_arrays(self.time_series.timestamps_array, self._denoise_scores(anom_scores))
 
   def _compute_anom_data_decay_all(self):
     """
     Compute anomaly scores using a lagging window covering all the data points before.
     """
-    anom_scores = {}
-    values = self.time_series.values
+    values = self.time_series.values_array
     ema = utils.compute_ema(self.smoothing_factor, values)
     stdev = numpy.std(values)
-    for i, (timestamp, value) in enumerate(self.time_series_items):
-      anom_score = abs((value - ema[i]) / stdev) if stdev else value - ema[i]
-      anom_scores[timestamp] = anom_score
-    self.anom_scores = TimeSeries(self._denoise_scores(anom_scores))
+    anom_scores = numpy.abs((values - ema) / stdev) if stdev else values - ema
+    self.anom_scores = TimeSeries.from_arrays(self.time_series.timestamps_array, self._denoise_scores(anom_scores))
 
   def _set_scores(self):
     """
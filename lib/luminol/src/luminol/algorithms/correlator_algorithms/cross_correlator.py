@@ -9,6 +9,8 @@ Unless required by applicable law or agreed to in writing, software
 distributed under the License is distributed on an "AS IS" BASIS,
 WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 """
+import numpy
+
 from luminol.algorithms.correlator_algorithms import CorrelatorAlgorithm
 from luminol.constants import *
 from luminol.modules.correlation_result import CorrelationResult
@@ -40,12 +42,9 @@ class CrossCorrelator(CorrelatorAlgorithm):
     Detect correlation by computing correlation coefficients for all allowed shift steps,
     then take the maximum.
     """
-    correlations = []
-    shifted_correlations = []
     self.time_series_a.normalize()
     self.time_series_b.normalize()
     a, b = self.time_series_a.align(self.time_series_b)
-    a_values, b_values = a.values, b.values
     a_avg, b_avg = a.average(), b.average()
     a_stdev, b_stdev = a.stdev(), b.stdev()
     n = len(a)
@@ -58,28 +57,32 @@ class CrossCorrelator(CorrelatorAlgorithm):
     else:
       shift_upper_bound = 1
       shift_lower_bound = 0
-    for delay in range(shift_lower_bound, shift_upper_bound):
-      delay_in_seconds = a.timestamps[abs(delay)] - a.timestamps[0]
-      if delay < 0:
-        delay_in_seconds = -delay_in_seconds
-      s = 0
-      for i in range(n):
-        j = i + delay
-        if j < 0 or j >= n:
-          continue
-        else:
-          s += ((a_values[i] - a_avg) * (b_values[j] - b_avg))
-      r = s / denom if denom != 0 else s
-      correlations.append([delay_in_seconds, r])
-      # Take shift into account to create a "shifted correlation coefficient".
-      if self.max_shift_milliseconds:
-        shifted_correlations.append(r * (1 + float(delay_in_seconds) / self.max_shift_milliseconds * self.shift_impact))
-      else:
-        shifted_correlations.append(r)
-    max_correlation = list(max(correlations, key=lambda k: k[1]))
-    max_shifted_correlation = max(shifted_correlations)
-    max_correlation.append(max_shifted_correlation)
-    self.correlation_result = CorrelationResult(*max_correlation)
+    delays = numpy.arange(shift_lower_bound, shift_upper_bound)
+    timestamps = a.timestamps_array
+    delays_in_seconds = numpy.sign(delays) * (timestamps[numpy.abs(delays)] - timestamps[0])
+    s = self._cross_correlate(a.values_array - a_avg, b.values_array - b_avg, delays)
+    correlations = s / denom if denom != 0 else s
+    # Take shift into account to create a "shifted correlation coefficient".
+    if self.max_shift_milliseconds:
+      shifted_correlations = correlations * (1 + delays_in_seconds.astype(float) / self.max_shift_milliseconds * self.shift_impact)
+    else:
+      shifted_correlations = correlations
+    best = int(numpy.argmax(correlations))
+    self.correlation_result = CorrelationResult(int(delays_in_seconds[best]), float(correlations[best]),
+                                                float(shifted_correlations.max()))
+
+  def _cross_correlate(self, a_values, b_values, delays):
+    """
+    Compute the sums of (a[i] * b[i + delay]) over the overlapping points for all delays at once in the frequency
+    domain. The values are zero padded so that shifted values never wrap around.
+    param numpy.array a_values: values of time series a.
+    param numpy.array b_values: values of time series b.
+    param numpy.array delays: shift steps.
+    :return numpy.array: sum for each delay.
+    """
+    size = 1 << int(len(a_values) + numpy.abs(delays).max() - 1).bit_length()
+    sums = numpy.fft.irfft(numpy.conj(numpy.fft.rfft(a_values, size)) * numpy.fft.rfft(b_values, size), size)
+    return sums[delays]
 
   def _find_allowed_shift(self, timestamps):
     """
@@ -15,6 +15,8 @@ API for Anomaly Detector Module
 This module detects anomalies in a single time series.
 """
 
+import multiprocessing
+
 from luminol import exceptions, utils
 from luminol.algorithms.anomaly_detector_algorithms.all import anomaly_detector_algorithms
 from luminol.constants import *
@@ -29,8 +31,8 @@ class AnomalyDetector(object):
                refine_algorithm_params=None, algorithm_class=None):
     """
     Initializer
-    :param time_series: a TimeSeries, a dictionary or a path to a csv file(str).
-    :param baseline_time_series: a TimeSeries, a dictionary or a path to a csv file(str).
+    :param time_series: a TimeSeries, a dictionary, a tuple of timestamps and values or a path to a csv file(str).
+    :param baseline_time_series: a TimeSeries, a dictionary, a tuple of timestamps and values or a path to a csv file(str).
     :param bool score_only: if asserted, only anomaly scores are computed.
     :param float score_percent_threshold: percent threshold on anomaly score above which is considered an anomaly.
     :param str algorithm_name: name of the algorithm to use(file name).
@@ -63,7 +65,7 @@ class AnomalyDetector(object):
   def _load(self, time_series):
     """
     Load time series.
-    :param time_series: a TimeSeries, a dictionary or a path to a csv file(str).
+    :param time_series: a TimeSeries, a dictionary, a tuple of timestamps and values or a path to a csv file(str).
     :return TimeSeries: a TimeSeries object.
     """
     if not time_series:
@@ -72,6 +74,8 @@ class AnomalyDetector(object):
       return time_series
     if isinstance(time_series, dict):
       return TimeSeries(time_series)
+    if isinstance(time_series, tuple):
+      return TimeSeries.from_arrays(*time_series)
     return TimeSeries(utils.read_csv(time_series))
 
   def _get_algorithm(self, algorithm_name):
@@ -155,3 +159,37 @@ class AnomalyDetector(object):
     :return: a TimeSeries object represents anomaly scores.
     """
     return getattr(self, 'anom_scores', None)
+
+
+def _detect_anomalies_args(args):
+  time_series, kwargs = args
+  return AnomalyDetector(time_series, **kwargs).get_anomalies()
+
+
+def detect_anomalies(time_series_list, workers=None, **kwargs):
+  """
+  Detect anomalies in several time series, in a pool of worker processes when there are several of them. Csv files
+  are read by the workers.
+  :param time_series_list: a list of time series, each a TimeSeries, a dictionary, a tuple of timestamps and values or
+    a path to a csv file(str), or a dictionary of names to time series.
+  :param int workers: number of worker processes. Defaults to the number of cpus.
+  :param kwargs: parameters of AnomalyDetector, applied to all the time series.
+  :return: a list of the lists of Anomaly objects of each time series, or a dictionary of names to lists of Anomaly
+    objects if time_series_list is a dictionary.
+  """
+  if isinstance(time_series_list, dict):
+    names = list(time_series_list.keys())
+    return dict(zip(names, detect_anomalies([time_series_list[name] for name in names], workers, **kwargs)))
+  args = [(time_series, kwargs) for time_series in time_series_list]
+  workers = min(workers or multiprocessing.cpu_count(), len(args))
+  # Daemonic processes, like the workers of a pool, cannot have children
+  if workers > 1 and not multiprocessing.current_process().daemon:
+    pool = multiprocessing.Pool(processes=workers)
+    try:
+      anomalies = pool.map(_detect_anomalies_args, args)
+      pool.close()
+      pool.join()
+    finally:
+      pool.terminate()
+    return anomalies
+  return [_detect_anomalies_args(time_series_args) for time_series_args in args]
@@ -41,6 +41,9 @@ DEFAULT_BITMAP_CHUNK_SIZE = 2
 
 DEFAULT_BITMAP_PRECISION = 4
 
+# Number of chunk counts held in memory at once when scoring with the bitmap detector.
+BITMAP_SCORE_BLOCK_ELEMENTS = 2 ** 20
+
 # Constants for ExpAvgDetector.
 DEFAULT_EMA_SMOOTHING_FACTOR = 0.2
 
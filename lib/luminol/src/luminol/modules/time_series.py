@@ -13,37 +13,133 @@ import numpy
 
 
 class TimeSeries(object):
+  """
+  Time series of int timestamps and float values, sorted by timestamp. Timestamps and values are stored in numpy arrays:
+  timestamps are looked up with a binary search and arithmetic and alignment are vectorized. The timestamps and values
+  attributes are lists, timestamps_array and values_array give read only views of the arrays.
+  """
 
   def __init__(self, series):
-    self.timestamps = []
-    self.values = []
+    timestamps = []
+    values = []
 
     # Clean the time series by removing null values.
     for ts in sorted(series):
       if series[ts] is not None:
-        self.timestamps.append(int(ts))
-        self.values.append(float(series[ts]))
+        timestamps.append(int(ts))
+        values.append(float(series[ts]))
+    self._set_arrays(numpy.array(timestamps, dtype=numpy.int64), numpy.array(values, dtype=numpy.float64))
+
+  @classmethod
+  def from_arrays(cls, timestamps, values):
+    """
+    Create a time series from sequences of timestamps and values without going through a dictionary.
+
+    :param timestamps: sequence of timestamps.
+    :param values: sequence of values, of the same length as timestamps.
+    :return: :class:`TimeSeries` object.
+    """
+    time_series = cls.__new__(cls)
+    timestamps = numpy.asarray(timestamps)
+    if timestamps.dtype.kind == 'f':
+      # int() truncates, as for the timestamps of dictionaries
+      timestamps = numpy.trunc(timestamps)
+    timestamps = timestamps.astype(numpy.int64)
+    values = numpy.array(values, dtype=numpy.float64)
+    if len(timestamps) != len(values):
+      raise ValueError('Timestamps and values have different lengths.')
+    if len(timestamps) > 1 and numpy.any(timestamps[1:] < timestamps[:-1]):
+      order = numpy.argsort(timestamps, kind='mergesort')
+      timestamps, values = timestamps[order], values[order]
+    if len(timestamps) > 1 and numpy.any(timestamps[1:] == timestamps[:-1]):
+      # The last value of a repeated timestamp is kept, as for dictionaries
+      last = numpy.append(timestamps[1:] != timestamps[:-1], True)
+      timestamps, values = timestamps[last], values[last]
+    time_series._set_arrays(timestamps, values)
+    return time_series
+
+  def _set_arrays(self, timestamps, values):
+    self._timestamps = timestamps
+    self._values = values
+    self._timestamps_list = None
+    self._values_list = None
+
+  @property
+  def timestamps(self):
+    """
+    Return the list of timestamps.
+    """
+    if self._timestamps_list is None:
+      self._timestamps_list = self._timestamps.tolist()
+    return self._timestamps_list
+
+  @timestamps.setter
+  def timestamps(self, timestamps):
+    self._set_arrays(numpy.array(timestamps, dtype=numpy.int64), self._values)
+
+  @property
+  def values(self):
+    """
+    Return the list of values.
+    """
+    if self._values_list is None:
+      self._values_list = self._values.tolist()
+    return self._values_list
+
+  @values.setter
+  def values(self, values):
+    self._set_arrays(self._timestamps, numpy.array(values, dtype=numpy.float64))
+
+  @property
+  def timestamps_array(self):
+    """
+    Return a read only int64 array of the timestamps.
+    """
+    return self._read_only(self._timestamps)
+
+  @property
+  def values_array(self):
+    """
+    Return a read only float64 array of the values.
+    """
+    return self._read_only(self._values)
+
+  def _read_only(self, array):
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+  def _find(self, key):
+    """
+    Find the position of a timestamp.
+
+    :return: position of the timestamp, None if it is not in the time series.
+    """
+    pos = int(numpy.searchsorted(self._timestamps, key))
+    if pos < len(self._timestamps) and self._timestamps[pos] == key:
+      return pos
+    return None
 
   @property
   def start(self):
     """
     Return the earliest timestamp in the time series.
     """
-    return min(self.timestamps) if self.timestamps else None
+    return int(self._timestamps[0]) if len(self._timestamps) else None
 
   @property
   def end(self):
     """
     Return the latest timestamp in the time series.
     """
-    return max(self.timestamps) if self.timestamps else None
+    return int(self._timestamps[-1]) if len(self._timestamps) else None
 
   @property
   def timestamps_ms(self):
     """
     Return list of timestamp values in order by milliseconds since epoch.
     """
-    return map(lambda ts: ts * 1000, self.timestamps)
+    return (self._timestamps * 1000).tolist()
 
   def __repr__(self):
     return 'TimeSeries<start={0}, end={1}>'.format(repr(self.start), repr(self.end))
@@ -52,198 +148,136 @@ class TimeSeries(object):
     """
     :return string: Return string representation of time series
     """
-    string_rep = ''
-    for item in self.iteritems():
-      string_rep += str(item)
-    return string_rep
+    return ''.join(str(item) for item in self.iteritems())
 
   def __nonzero__(self):
-    return len(self.timestamps) > 0
+    return len(self._timestamps) > 0
 
   def __getitem__(self, key):
-    if key in self.timestamps:
-      pos = self.timestamps.index(key)
-      return self.values[pos]
-    else:
+    pos = self._find(key)
+    if pos is None:
       raise ValueError('Timestamp does not exist in TimeSeries object')
+    return self.values[pos] if self._values_list is not None else float(self._values[pos])
 
   def __setitem__(self, key, val):
-    if key in self.timestamps:
-      pos = self.timestamps.index(key)
+    pos = self._find(key)
+    if pos is not None:
       if val is None:
-        del self.timestamps[pos]
-        del self.values[pos]
+        self._set_arrays(numpy.delete(self._timestamps, pos), numpy.delete(self._values, pos))
       else:
-        self.values[pos] = val
-    else:
-      self.timestamps = sorted(self.timestamps + [key])
-      pos = self.timestamps.index(key)
-      self.values.insert(pos, val)
+        self._values[pos] = val
+        if self._values_list is not None:
+          self._values_list[pos] = float(val)
+    elif val is not None:
+      pos = int(numpy.searchsorted(self._timestamps, key))
+      self._set_arrays(numpy.insert(self._timestamps, pos, key), numpy.insert(self._values, pos, val))
 
   def __delitem__(self, key):
-    if key in self.timestamps:
-      pos = self.timestamps.index(key)
-      del self.timestamps[pos]
-      del self.values[pos]
+    pos = self._find(key)
+    if pos is not None:
+      self._set_arrays(numpy.delete(self._timestamps, pos), numpy.delete(self._values, pos))
 
   def __contains__(self, item):
-    return item in self.timestamps
+    return self._find(item) is not None
 
   def __iter__(self):
-    for key in self.timestamps:
-      yield key
+    return iter(self.timestamps)
 
   def __len__(self):
-    return len(self.timestamps)
+    return len(self._timestamps)
 
   def __eq__(self, other):
-    if len(self.timestamps) != len(other.timestamps):
-      return False
+    return numpy.array_equal(self._timestamps, other._timestamps) and numpy.array_equal(self._values, other._values)
 
-    for pos, ts in enumerate(self.timestamps):
-      if ts != other.timestamps[pos] or self.values[pos] != other.values[pos]:
-        return False
-    else:
-      return True
+  def __ne__(self, other):
+    return not self == other
 
   def __add__(self, other):
-    return self._generic_binary_op(other, self._get_value_type(other).__add__)
+    return self._generic_binary_op(other, numpy.add)
 
   def __sub__(self, other):
-    return self._generic_binary_op(other, self._get_value_type(other).__sub__)
+    return self._generic_binary_op(other, numpy.subtract)
 
   def __mul__(self, other):
-    return self._generic_binary_op(other, self._get_value_type(other).__mul__)
+    return self._generic_binary_op(other, numpy.multiply)
 
   def __div__(self, other):
-    return self._generic_binary_op(other, self._get_value_type(other).__div__)
+    return self._generic_binary_op(other, numpy.true_divide)
 
+  __truediv__ = __div__
   __radd__ = __add__
   __rmul__ = __mul__
 
   def __rsub__(self, other):
-    return self._generic_binary_op(other, self._get_value_type(other).__rsub__)
+    return self._generic_binary_op(other, numpy.subtract, reflected=True)
 
   def __rdiv__(self, other):
-    return self._generic_binary_op(other, self._get_value_type(other).__rdiv__)
+    return self._generic_binary_op(other, numpy.true_divide, reflected=True)
+
+  __rtruediv__ = __rdiv__
 
   def items(self):
-    return [(ts, self.values[pos]) for pos, ts in enumerate(self.timestamps)]
+    return zip(self.timestamps, self.values)
 
   def iterkeys(self):
-    for key in self.timestamps:
-      yield key
+    return iter(self.timestamps)
 
   def itervalues(self):
-    for value in self.values:
-      yield value
+    return iter(self.values)
 
   def iteritems(self):
-    for item in self.items():
-      yield item
+    return iter(self.items())
 
   def iteritems_silent(self):
     for item in self.items():
       yield item
     yield None
 
-  def _generic_binary_op(self, other, op):
+  def _generic_binary_op(self, other, op, reflected=False):
     """
-    Perform the method operation specified in the op parameter on the values
+    Perform the operation specified in the op parameter on the values
     within the instance's time series values and either another time series
-    or a constant number value.
+    or a constant number value. Timestamps which are not in both time series
+    and divisions by zero are left out of the result.
 
     :param other: Time series of values or a constant number to use in calculations with instance's time series.
-    :param func op: The method to perform the calculation between the values.
+    :param numpy.ufunc op: The operation to perform between the values.
+    :param bool reflected: if asserted, other is the left operand.
     :return: :class:`TimeSeries` object.
     """
-    output = {}
+    if not len(self._values) and not (isinstance(other, TimeSeries) and len(other._values)):
+      raise ValueError('Cannot perform arithmetic on empty time series.')
     if isinstance(other, TimeSeries):
-      for key, value in self.items():
-        if key in other:
-          try:
-            result = op(value, other[key])
-            if result is NotImplemented:
-              other_type = type(other[key])
-              other_op = vars(other_type).get(op.__name__)
-              if other_op:
-                output[key] = other_op(other_type(value), other[key])
-            else:
-              output[key] = result
-          except ZeroDivisionError:
-            continue
-    else:
-      for key, value in self.items():
-        try:
-          result = op(value, other)
-          if result is NotImplemented:
-            other_type = type(other)
-            other_op = vars(other_type).get(op.__name__)
-            if other_op:
-              output[key] = other_op(other_type(value), other)
-          else:
-            output[key] = result
-        except ZeroDivisionError:
-          continue
-
-    if output:
-      return TimeSeries(output)
+      timestamps, pos, other_pos = numpy.intersect1d(self._timestamps, other._timestamps, return_indices=True)
+      values, other_values = self._values[pos], other._values[other_pos]
     else:
+      timestamps, values, other_values = self._timestamps, self._values, float(other)
+    left, right = (other_values, values) if reflected else (values, other_values)
+    if op is numpy.true_divide:
+      # divisions by zero are left out
+      valid = numpy.broadcast_to(numpy.asarray(right) != 0, timestamps.shape)
+      timestamps = timestamps[valid]
+      left = left[valid] if numpy.ndim(left) else left
+      right = right[valid] if numpy.ndim(right) else right
+    if not len(timestamps):
       raise ValueError('TimeSeries data was empty or invalid.')
-
-  def _get_value_type(self, other):
-    """
-    Get the object type of the value within the values portion of the time series.
-
-    :return: `type` of object
-    """
-    if self.values:
-      return type(self.values[0])
-    elif isinstance(other, TimeSeries) and other.values:
-      return type(other.values[0])
-    else:
-      raise ValueError('Cannot perform arithmetic on empty time series.')
+    return TimeSeries.from_arrays(timestamps, op(left, right))
 
   def align(self, other):
     """
     Align two time series so that len(self) == len(other) and self.timstamps == other.timestamps.
+    The aligned time series have the timestamps of both time series, each takes its value at the next timestamp it
+    has, or its last value past its end.
 
     :return: :tuple:(`TimeSeries` object(the aligned self), `TimeSeries` object(the aligned other))
     """
     if isinstance(other, TimeSeries):
-      aligned, other_aligned = {}, {}
-      i, other_i = self.iteritems_silent(), other.iteritems_silent()
-      item, other_item = i.next(), other_i.next()
-
-      while item and other_item:
-        # Unpack timestamps and values.
-        timestamp, value = item
-        other_timestamp, other_value = other_item
-        if timestamp == other_timestamp:
-          aligned[timestamp] = value
-          other_aligned[other_timestamp] = other_value
-          item = i.next()
-          other_item = other_i.next()
-        elif timestamp < other_timestamp:
-          aligned[timestamp] = value
-          other_aligned[timestamp] = other_value
-          item = i.next()
-        else:
-          aligned[other_timestamp] = value
-          other_aligned[other_timestamp] = other_value
-          other_item = other_i.next()
-      # Align remaining items.
-      while item:
-        timestamp, value = item
-        aligned[timestamp] = value
-        other_aligned[timestamp] = other.values[-1]
-        item = i.next()
-      while other_item:
-        other_timestamp, other_value = other_item
-        aligned[other_timestamp] = self.values[-1]
-        other_aligned[other_timestamp] = other_value
-        other_item = other_i.next()
-      return TimeSeries(aligned), TimeSeries(other_aligned)
+      timestamps = numpy.union1d(self._timestamps, other._timestamps)
+      return self._values_at_or_after(timestamps), other._values_at_or_after(timestamps)
+
+  def _values_at_or_after(self, timestamps):
+    pos = numpy.minimum(numpy.searchsorted(self._timestamps, timestamps), len(self._timestamps) - 1)
+    return TimeSeries.from_arrays(timestamps, self._values[pos])
 
   def smooth(self, smoothing_factor):
     """
@@ -253,23 +287,20 @@ class TimeSeries(object):
     :param float smoothing_factor: smoothing factor
     :return: :class:`TimeSeries` object.
     """
-    forward_smooth = {}
-    backward_smooth = {}
-    output = {}
-
-    if self:
-      pre = self.values[0]
-      next = self.values[-1]
-      for key, value in self.items():
-        forward_smooth[key] = smoothing_factor * pre + (1 - smoothing_factor) * value
-        pre = forward_smooth[key]
-      for key, value in reversed(self.items()):
-        backward_smooth[key] = smoothing_factor * next + (1 - smoothing_factor) * value
-        next = backward_smooth[key]
-      for key in forward_smooth.keys():
-        output[key] = (forward_smooth[key] + backward_smooth[key]) / 2
-
-    return TimeSeries(output)
+    values = self.values
+    forward_smooth = []
+    backward_smooth = []
+    if values:
+      pre = values[0]
+      next = values[-1]
+      for value in values:
+        pre = smoothing_factor * pre + (1 - smoothing_factor) * value
+        forward_smooth.append(pre)
+      for value in reversed(values):
+        next = smoothing_factor * next + (1 - smoothing_factor) * value
+        backward_smooth.append(next)
+      backward_smooth.reverse()
+    return TimeSeries.from_arrays(self._timestamps, (numpy.array(forward_smooth) + numpy.array(backward_smooth)) / 2)
 
   def add_offset(self, offset):
     """
@@ -278,7 +309,7 @@ class TimeSeries(object):
     :param int offset: The number of seconds to offset the time series.
     :return: `None`
     """
-    self.timestamps = map(lambda ts: ts + offset, self.timestamps)
+    self._set_arrays(self._timestamps + offset, self._values)
 
   def normalize(self):
     """
@@ -288,7 +319,7 @@ class TimeSeries(object):
     """
     maximum = self.max()
     if maximum:
-      self.values = map(lambda value: value / maximum, self.values)
+      self._set_arrays(self._timestamps, self._values / maximum)
 
   def crop(self, start_timestamp, end_timestamp):
     """
@@ -299,15 +330,11 @@ class TimeSeries(object):
     :param int end_timestamp: the end timestamp value
     :return: :class:`TimeSeries` object.
     """
-    output = {}
-    for key, value in self.items():
-      if key >= start_timestamp and key <= end_timestamp:
-        output[key] = value
-
-    if output:
-      return TimeSeries(output)
-    else:
+    start = numpy.searchsorted(self._timestamps, start_timestamp, side='left')
+    end = numpy.searchsorted(self._timestamps, end_timestamp, side='right')
+    if start >= end:
       raise ValueError('TimeSeries data was empty or invalid.')
+    return TimeSeries.from_arrays(self._timestamps[start:end], self._values[start:end])
 
   def average(self, default=None):
     """
@@ -316,7 +343,7 @@ class TimeSeries(object):
     :param default: Value to return as a default should the calculation not be possible.
     :return: Float representing the average value or `None`.
     """
-    return numpy.asscalar(numpy.average(self.values)) if self.values else default
+    return numpy.asscalar(numpy.average(self._values)) if len(self._values) else default
 
   def median(self, default=None):
     """
@@ -325,7 +352,7 @@ class TimeSeries(object):
     :param default: Value to return as a default should the calculation not be possible.
     :return: Float representing the median value or `None`.
     """
-    return numpy.asscalar(numpy.median(self.values)) if self.values else default
+    return numpy.asscalar(numpy.median(self._values)) if len(self._values) else default
 
   def max(self, default=None):
     """
@@ -334,7 +361,7 @@ class TimeSeries(object):
     :param default: Value to return as a default should the calculation not be possible.
     :return: Float representing the maximum value or `None`.
     """
-    return numpy.asscalar(numpy.max(self.values)) if self.values else default
+    return numpy.asscalar(numpy.max(self._values)) if len(self._values) else default
 
   def min(self, default=None):
     """
@@ -343,7 +370,7 @@ class TimeSeries(object):
     :param default: Value to return as a default should the calculation not be possible.
     :return: Float representing the maximum value or `None`.
     """
-    return numpy.asscalar(numpy.min(self.values)) if self.values else default
+    return numpy.asscalar(numpy.min(self._values)) if len(self._values) else default
 
   def percentile(self, n, default=None):
     """
@@ -353,7 +380,7 @@ class TimeSeries(object):
     :param default: Value to return as a default should the calculation not be possible.
     :return: Float representing the Nth percentile value or `None`.
     """
-    return numpy.asscalar(numpy.percentile(self.values, n)) if self.values else default
+    return numpy.asscalar(numpy.percentile(self._values, n)) if len(self._values) else default
 
   def stdev(self, default=None):
     """
@@ -362,7 +389,7 @@ class TimeSeries(object):
     :param default: Value to return as a default should the calculation not be possible.
     :return: Float representing the standard deviation value or `None`.
     """
-    return numpy.asscalar(numpy.std(self.values)) if self.values else default
+    return numpy.asscalar(numpy.std(self._values)) if len(self._values) else default
 
   def sum(self, default=None):
     """
@@ -371,4 +398,4 @@ class TimeSeries(object):
     :param default: Value to return as a default should the calculation not be possible.
     :return: Float representing the sum or `None`.
     """
-    return numpy.asscalar(numpy.sum(self.values)) if self.values else default
+    return numpy.asscalar(numpy.sum(self._values)) if len(self._values) else default
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+© 2014 LinkedIn Corp. All rights reserved.
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at  http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+"""
+"""
+Benchmark of the exponential moving average, derivative and denoising code of the detectors against the loops they
+replaced. The results of both are checked to be the same before the timings are printed.
+
+  python benchmark.py --points 100000 --window 500
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from luminol import utils
+from luminol.algorithms.anomaly_detector_algorithms.derivative_detector import DerivativeDetector
+from luminol.algorithms.anomaly_detector_algorithms.exp_avg_detector import ExpAvgDetector
+from luminol.constants import *
+from luminol.modules.time_series import TimeSeries
+
+
+def reference_compute_ema(smoothing_factor, points):
+  ema = []
+  if(len(points) > 0):
+    ema.append(points[0])
+  for i in range(1, len(points)):
+    ema.append(smoothing_factor * points[i] + (1 - smoothing_factor) * ema[i - 1])
+  return ema
+
+
+def reference_denoise_scores(scores):
+  if scores:
+    maximal = max(scores.values())
+    if maximal:
+      for key in scores:
+        if scores[key] < DEFAULT_NOISE_PCT_THRESHOLD * maximal:
+          scores[key] = 0
+  return scores
+
+
+def reference_exp_avg_scores(items, smoothing_factor):
+  anom_scores = {}
+  values = [value for timestamp, value in items]
+  ema = reference_compute_ema(smoothing_factor, values)
+  stdev = numpy.std(values)
+  for i, (timestamp, value) in enumerate(items):
+    anom_scores[timestamp] = abs((value - ema[i]) / stdev) if stdev else value - ema[i]
+  return reference_denoise_scores(anom_scores)
+
+
+def reference_window_exp_avg_scores(items, smoothing_factor, lag_window_size):
+  anom_scores = {}
+  values = [value for timestamp, value in items]
+  stdev = numpy.std(values)
+  for i, (timestamp, value) in enumerate(items):
+    window = values[:i + 1] if i < lag_window_size else values[i - lag_window_size: i + 1]
+    anom_score = abs(value - reference_compute_ema(smoothing_factor, window)[-1])
+    anom_scores[timestamp] = anom_score / stdev if stdev else anom_score
+  return reference_denoise_scores(anom_scores)
+
+
+def reference_derivative_scores(items, smoothing_factor):
+  derivatives = []
+  for i, (timestamp, value) in enumerate(items):
+    if i > 0:
+      pre_timestamp, pre_value = items[i - 1]
+      td = timestamp - pre_timestamp
+      derivative = (value - pre_value) / td if td != 0 else value - pre_value
+      derivatives.append(abs(derivative))
+  if derivatives:
+    derivatives.insert(0, derivatives[0])
+  derivatives_ema = reference_compute_ema(smoothing_factor, derivatives)
+  anom_scores = {}
+  for i, (timestamp, value) in enumerate(items):
+    anom_scores[timestamp] = abs(derivatives[i] - derivatives_ema[i])
+  stdev = numpy.std(anom_scores.values())
+  if stdev:
+    for timestamp in anom_scores.keys():
+      anom_scores[timestamp] /= stdev
+  return reference_denoise_scores(anom_scores)
+
+
+def window_exp_avg_scores(time_series, lag_window_size):
+  detector = ExpAvgDetector(time_series, use_lag_window=True, lag_window_size=lag_window_size)
+  detector._compute_anom_data_using_window()
+  return detector.anom_scores
+
+
+def timed(function, *args):
+  start = time.time()
+  result = function(*args)
+  return result, time.time() - start
+
+
+def check_parity(name, expected, actual):
+  """
+  Check that scores computed by a reference loop, as a list or a dict keyed by timestamp, are the ones of a vectorized
+  path, as an array or a TimeSeries. Sums are not done in the same order so the last digits can differ.
+  """
+  if isinstance(expected, dict):
+    expected = [expected[timestamp] for timestamp in sorted(expected)]
+  if isinstance(actual, TimeSeries):
+    actual = actual.values_array
+  if len(expected) != len(actual) or not numpy.allclose(expected, actual, rtol=1e-9, atol=1e-12):
+    raise AssertionError('%s: vectorized results differ from the reference ones' % name)
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Benchmark the vectorized luminol detectors against the reference loops')
+  parser.add_argument('--points', type=int, default=20000, help='number of points of the time series')
+  parser.add_argument('--window', type=int, default=200, help='lagging window size of the windowed exponential moving average')
+  parser.add_argument('--seed', type=int, default=0, help='seed of the random time series')
+  args = parser.parse_args()
+
+  random_state = numpy.random.RandomState(args.seed)
+  timestamps = numpy.cumsum(random_state.randint(1, 2000, args.points))
+  values = random_state.rand(args.points)
+  values[args.points // 2:args.points // 2 + 20] += 8
+  time_series = TimeSeries.from_arrays(timestamps, values)
+  items = time_series.items()
+  smoothing_factor = DEFAULT_EMA_SMOOTHING_FACTOR
+
+  lfilter = utils.lfilter
+  benchmarks = [
+    ('compute_ema', (reference_compute_ema, smoothing_factor, values.tolist()), (utils.compute_ema, smoothing_factor, values)),
+    ('compute_ema without scipy', (reference_compute_ema, smoothing_factor, values.tolist()), (utils.compute_ema, smoothing_factor, values)),
+    ('ExpAvgDetector', (reference_exp_avg_scores, items, smoothing_factor), (lambda: ExpAvgDetector(time_series).run(),)),
+    ('ExpAvgDetector lag window', (reference_window_exp_avg_scores, items, smoothing_factor, args.window),
+     (window_exp_avg_scores, time_series, args.window)),
+    ('DerivativeDetector', (reference_derivative_scores, items, DEFAULT_DERI_SMOOTHING_FACTOR),
+     (lambda: DerivativeDetector(time_series).run(),)),
+  ]
+  print('%d points, lag window of %d points' % (args.points, args.window))
+  print('%-28s %12s %12s %10s' % ('', 'reference s', 'vectorized s', 'speedup'))
+  for name, reference, vectorized in benchmarks:
+    utils.lfilter = None if name.endswith('without scipy') else lfilter
+    try:
+      expected, reference_time = timed(*reference)
+      actual, vectorized_time = timed(*vectorized)
+    finally:
+      utils.lfilter = lfilter
+    check_parity(name, expected, actual)
+    print('%-28s %12.4f %12.4f %9.1fx' % (name, reference_time, vectorized_time, reference_time / max(vectorized_time, 1e-6)))
+  if lfilter is None:
+    print('scipy is not installed, compute_ema was timed without it in both cases')
+
+
+if __name__ == '__main__':
+  main()
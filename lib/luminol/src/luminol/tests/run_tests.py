@@ -12,12 +12,16 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 """
 import os
 import sys
+import tempfile
 import unittest
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from luminol import exceptions
 from luminol import Luminol
+from luminol import utils
+from luminol.algorithms.anomaly_detector_algorithms.bitmap_detector import BitmapDetector
+from luminol.algorithms.correlator_algorithms.cross_correlator import CrossCorrelator
 from luminol.anomaly_detector import AnomalyDetector
 from luminol.correlator import Correlator
 from luminol.modules.time_series import TimeSeries
@@ -78,6 +82,22 @@ class TestCorrelator(unittest.TestCase):
     correlator = Correlator(self.s1, self.s2, algorithm_name='cross_correlator', algorithm_params={'max_shift_seconds': 0})
     self.assertNotEqual(self.correlator2.get_correlation_result().coefficient, correlator.get_correlation_result().coefficient)
 
+  def test_shift(self):
+    """
+    Test if the shift and coefficients match the ones of a direct computation of the correlation sums.
+    """
+    a = TimeSeries(dict((i * 1000, (i * 7919 % 13) + (10 if 40 <= i < 50 else 0)) for i in range(100)))
+    b = TimeSeries(dict((i * 1000, (i * 104729 % 11) + (10 if 45 <= i < 55 else 0)) for i in range(100)))
+    result = CrossCorrelator(a, b, max_shift_seconds=20000).run()
+    a_values = [value - a.average() for value in a.values]
+    b_values = [value - b.average() for value in b.values]
+    denom = a.stdev() * b.stdev() * len(a)
+    correlations = [sum(a_values[i] * b_values[i + delay] for i in range(100) if 0 <= i + delay < 100) / denom
+                    for delay in range(-20, 20)]
+    self.assertEqual(result.shift, 5000)
+    self.assertAlmostEqual(result.coefficient, max(correlations))
+    self.assertAlmostEqual(result.shifted_coefficient, max(r * (1 + (delay - 20) * 0.05 / 20) for delay, r in enumerate(correlations)))
+
   def test_sanity_check(self):
     """
     Test if exception NotEnoughDataPoints is raised as expected.
@@ -92,6 +112,131 @@ class TestCorrelator(unittest.TestCase):
     self.assertRaises(exceptions.InvalidDataFormat, lambda: Correlator(list(), 1))
 
 
+class TestTimeSeries(unittest.TestCase):
+
+  def setUp(self):
+    self.s1 = TimeSeries({0: 1, 1: 2, 3: 4, 6: None, 7: 0})
+    self.s2 = TimeSeries({1: 4, 2: 1, 3: 2, 8: 3})
+
+  def test_lookup(self):
+    """
+    Test if timestamps are looked up, added and removed as expected.
+    """
+    self.assertEqual(self.s1.timestamps, [0, 1, 3, 7])
+    self.assertEqual(self.s1.values, [1.0, 2.0, 4.0, 0.0])
+    self.assertEqual(self.s1[3], 4.0)
+    self.assertTrue(3 in self.s1)
+    self.assertFalse(6 in self.s1)
+    self.assertRaises(ValueError, lambda: self.s1[6])
+    self.s1[5] = 3
+    self.s1[0] = 5
+    self.s1[1] = None
+    del self.s1[7]
+    self.assertEqual(self.s1.items(), [(0, 5.0), (3, 4.0), (5, 3.0)])
+    self.assertEqual(self.s1, TimeSeries({0: 5, 3: 4, 5: 3}))
+    self.assertNotEqual(self.s1, self.s2)
+
+  def test_arithmetic(self):
+    """
+    Test if arithmetic is done on the common timestamps and leaves out divisions by zero.
+    """
+    self.assertEqual((self.s1 + self.s2).items(), [(1, 6.0), (3, 6.0)])
+    self.assertEqual((self.s1 - self.s2).items(), [(1, -2.0), (3, 2.0)])
+    self.assertEqual((self.s2 / self.s1).items(), [(1, 2.0), (3, 0.5)])
+    self.assertEqual((1 / self.s1).items(), [(0, 1.0), (1, 0.5), (3, 0.25)])
+    self.assertEqual((10 - self.s1 * 2).values, [8.0, 6.0, 2.0, 10.0])
+    self.assertRaises(ValueError, lambda: self.s1 / 0)
+
+  def test_align(self):
+    """
+    Test if aligned time series take their next value at missing timestamps and their last value past their end.
+    """
+    a, b = self.s1.align(self.s2)
+    self.assertEqual(a.timestamps, [0, 1, 2, 3, 7, 8])
+    self.assertEqual(a.values, [1.0, 2.0, 4.0, 4.0, 0.0, 0.0])
+    self.assertEqual(b.timestamps, [0, 1, 2, 3, 7, 8])
+    self.assertEqual(b.values, [4.0, 4.0, 1.0, 2.0, 3.0, 3.0])
+
+  def test_crop(self):
+    self.assertEqual(self.s1.crop(1, 6).items(), [(1, 2.0), (3, 4.0)])
+    self.assertRaises(ValueError, lambda: self.s1.crop(4, 6))
+
+
+class TestBitmapDetector(unittest.TestCase):
+
+  def setUp(self):
+    self.ts = TimeSeries(dict((i, (i % 7) + (20 if i >= 500 else 0)) for i in range(1000)))
+
+  def test_scores(self):
+    """
+    Test if points outside of the windows get no score and a level shift gets the highest score.
+    """
+    detector = BitmapDetector(self.ts, lag_window_size=100, future_window_size=100)
+    detector.run()
+    scores = detector.get_scores()
+    self.assertEqual(scores.timestamps, range(1000))
+    self.assertEqual(set(scores.values[:100] + scores.values[901:]), set([0.0]))
+    self.assertTrue(abs(scores.timestamps[scores.values.index(max(scores.values))] - 500) < 100)
+
+  def test_windows(self):
+    """
+    Test if windows which cannot hold a chunk are rejected.
+    """
+    self.assertRaises(exceptions.NotEnoughDataPoints,
+                      lambda: BitmapDetector(self.ts, lag_window_size=100, future_window_size=100, chunk_size=101))
+
+
+class TestUtils(unittest.TestCase):
+
+  def setUp(self):
+    self.points = [(i * 7919 % 13) + (10 if 40 <= i < 50 else 0) for i in range(100)]
+
+  def _compute_ema(self, smoothing_factor, points):
+    ema = [points[0]]
+    for point in points[1:]:
+      ema.append(smoothing_factor * point + (1 - smoothing_factor) * ema[-1])
+    return ema
+
+  def test_compute_ema(self):
+    """
+    Test if the exponential moving average is the same with and without scipy.
+    """
+    lfilter = utils.lfilter
+    try:
+      for utils_lfilter in (lfilter, None):
+        utils.lfilter = utils_lfilter
+        self.assertEqual(utils.compute_ema(0.2, self.points).tolist(), self._compute_ema(0.2, self.points))
+        self.assertEqual(utils.compute_ema(0.2, [3]).tolist(), [3.0])
+        self.assertEqual(utils.compute_ema(0.2, []).tolist(), [])
+    finally:
+      utils.lfilter = lfilter
+
+  def test_read_csv(self):
+    """
+    Test if timestamps of any of the formats are read, the format of a file being reused from one row to the next.
+    """
+    csv_file = tempfile.NamedTemporaryFile(suffix='.csv', delete=False)
+    csv_file.write('2014-04-14 12:09:00.5,1\n2014-04-14 12:09:01.25,2\n20140414_12:09:02,3\n1397477343000,4\n2014-04-14 12:09:03,bad\n')
+    csv_file.close()
+    try:
+      data = utils.read_csv(csv_file.name)
+    finally:
+      os.remove(csv_file.name)
+    self.assertEqual(sorted(data.items()), sorted((utils.to_epoch(t_str), value) for t_str, value in [
+      ('2014-04-14 12:09:00.5', 1), ('2014-04-14 12:09:01.25', 2), ('20140414_12:09:02', 3), ('1397477343000', 4)]))
+    self.assertEqual(data[utils.to_epoch('2014-04-14 12:09:01.25')] - data[utils.to_epoch('2014-04-14 12:09:00.5')], 1)
+    self.assertRaises(exceptions.InvalidDataFormat, lambda: utils.to_epoch('bad'))
+
+  def test_compute_window_ema(self):
+    """
+    Test if the exponential moving average of the lagging windows matches the one computed window by window.
+    """
+    for window_size in (0, 1, 10, 99, 150):
+      window_ema = utils.compute_window_ema(0.2, self.points, window_size)
+      for i in range(100):
+        self.assertAlmostEqual(window_ema[i], self._compute_ema(0.2, self.points[max(0, i - window_size):i + 1])[-1])
+
+
 class TestLuminol(unittest.TestCase):
   def setUp(self):
     self.anomaly = ['A', 'B']
@@ -17,7 +17,7 @@ import unittest
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from luminol import exceptions
-from luminol.anomaly_detector import AnomalyDetector
+from luminol.anomaly_detector import AnomalyDetector, detect_anomalies
 from luminol.modules.time_series import TimeSeries
 
 # Needed for custom algorithms
@@ -128,6 +128,23 @@ class TestAnomalyDetector(unittest.TestCase):
     detector1 = AnomalyDetector(self.s1, score_percent_threshold=0.1, algorithm_name='derivative_detector')
     self.assertNotEqual(detector1.get_anomalies(), detector.get_anomalies())
 
+  def test_detect_anomalies(self):
+    """
+    Test if anomalies detected in a batch of time series are the ones detected in each of them.
+    """
+    s3 = dict((i, (i * 7919 % 13) + (30 if 500 <= i < 510 else 0)) for i in range(1000))
+    s4 = (sorted(s3), [s3[timestamp] * 2 for timestamp in sorted(s3)])
+    expected = [[(a.start_timestamp, a.end_timestamp, a.anomaly_score, a.exact_timestamp) for a in AnomalyDetector(s).get_anomalies()]
+                for s in (self.s1, self.s2, s3, s4)]
+    self.assertTrue(expected[2])
+    for workers in (1, 2):
+      anomalies = detect_anomalies([self.s1, self.s2, s3, s4], workers=workers)
+      self.assertEqual([[(a.start_timestamp, a.end_timestamp, a.anomaly_score, a.exact_timestamp) for a in series_anomalies]
+                        for series_anomalies in anomalies], expected)
+    anomalies = detect_anomalies({'s1': self.s1, 's3': s3}, algorithm_name='exp_avg_detector')
+    self.assertEqual(sorted(anomalies), ['s1', 's3'])
+    self.assertEqual(len(anomalies['s3']), len(AnomalyDetector(s3, algorithm_name='exp_avg_detector').get_anomalies()))
+
 if __name__ == '__main__':
   unittest.main()
 
@@ -18,6 +18,12 @@ import datetime
 import re
 import time
 
+import numpy
+try:
+  from scipy.signal import lfilter
+except ImportError:
+  lfilter = None
+
 from luminol import constants, exceptions
 
 
@@ -26,15 +32,44 @@ def compute_ema(smoothing_factor, points):
   Compute exponential moving average of a list of points.
   :param float smoothing_factor: the smoothing factor.
   :param list points: the data points.
-  :return list: all ema in a list.
+  :return numpy.array: all ema in an array.
   """
-  ema = []
+  points = numpy.asarray(points, dtype=numpy.float64)
+  if len(points) < 2:
+    return points.copy()
   # The initial point has a ema equal to itself.
-  if(len(points) > 0):
-    ema.append(points[0])
-  for i in range(1, len(points)):
-    ema.append(smoothing_factor * points[i] + (1 - smoothing_factor) * ema[i - 1])
-  return ema
+  if lfilter is not None:
+    ema = numpy.empty_like(points)
+    ema[0] = points[0]
+    ema[1:] = lfilter([smoothing_factor], [1, smoothing_factor - 1], points[1:], zi=[(1 - smoothing_factor) * points[0]])[0]
+    return ema
+  # Python floats, arithmetic on numpy scalars is several times slower
+  points = points.tolist()
+  ema = [points[0]]
+  for point in points[1:]:
+    ema.append(smoothing_factor * point + (1 - smoothing_factor) * ema[-1])
+  return numpy.array(ema)
+
+
+def compute_window_ema(smoothing_factor, points, window_size):
+  """
+  Compute for each point the exponential moving average of a lagging window made of the point and the window_size
+  points before it, or of all the points before it at the start.
+  The average of a window starting at index s is the one of all the points shifted by (1 - smoothing_factor) ** (i - s)
+  times the difference between the average at s and the point at s, so all windows are computed from compute_ema().
+  :param float smoothing_factor: the smoothing factor.
+  :param list points: the data points.
+  :param int window_size: number of points before each point in its window.
+  :return numpy.array: the ema of the window of each point.
+  """
+  points = numpy.asarray(points, dtype=numpy.float64)
+  if not window_size:
+    return points.copy()
+  ema = compute_ema(smoothing_factor, points)
+  window_ema = ema.copy()
+  if window_size < len(points):
+    window_ema[window_size:] -= (1 - smoothing_factor) ** window_size * (ema[:-window_size] - points[:-window_size])
+  return window_ema
 
 
 def read_csv(csv_name):
@@ -46,11 +81,12 @@ def read_csv(csv_name):
   data = {}
   if not isinstance(csv_name, (str, unicode)):
     raise exceptions.InvalidDataFormat('luminol.utils: csv_name has to be a string!')
+  time_format = None
   with open(csv_name, 'r') as csv_data:
     reader = csv.reader(csv_data, delimiter=',', quotechar='|')
     for row in reader:
       try:
-        key = to_epoch(row[0])
+        key, time_format = _to_epoch(row[0], time_format)
         value = float(row[1])
         data[key] = value
       except ValueError:
@@ -58,20 +94,39 @@ def read_csv(csv_name):
   return data
 
 
-def to_epoch(t_str):
+def _strptime_epoch(t_str, time_format):
+  t = datetime.datetime.strptime(t_str, time_format)
+  return float(time.mktime(t.utctimetuple()) * 1000.0 + t.microsecond / 1000.0)
+
+
+def _to_epoch(t_str, time_format=None):
   """
-  Covert a timestamp string to an epoch number.
+  Covert a timestamp string to an epoch number, trying the format of the previous timestamp first so that the
+  timestamps of a file are not matched against all the formats.
   :param str t_str: a timestamp string.
-  :return int: epoch number of the timestamp.
+  :param str time_format: format of the previous timestamp.
+  :return tuple: epoch number and format of the timestamp, None for numbers.
   """
+  if time_format:
+    try:
+      return _strptime_epoch(t_str, time_format), time_format
+    except (TypeError, ValueError):
+      pass
   try:
-    t = float(t_str)
-    return t
+    return float(t_str), None
   except:
-    for format in constants.TIMESTAMP_STR_FORMATS:
+    for time_format in constants.TIMESTAMP_STR_FORMATS:
       try:
-        t = datetime.datetime.strptime(t_str, format)
-        return float(time.mktime(t.utctimetuple()) * 1000.0 + t.microsecond / 1000.0)
+        return _strptime_epoch(t_str, time_format), time_format
       except:
         pass
   raise exceptions.InvalidDataFormat
+
+
+def to_epoch(t_str):
+  """
+  Covert a timestamp string to an epoch number.
+  :param str t_str: a timestamp string.
+  :return int: epoch number of the timestamp.
+  """
+  return _to_epoch(t_str)[0]
@@ -19,8 +19,10 @@ from collections import defaultdict
 import ConfigParser
 import errno
 import logging
+import multiprocessing
 import os
 import threading
+import naarad.httpdownload
 import naarad.utils
 import naarad.naarad_constants as CONSTANTS
 from naarad_imports import metric_classes
@@ -50,6 +52,8 @@ class _Analysis(object):
     self.sla_data = {}
     self.stats_data = {}
     self.variables = None
+    self.executor = CONSTANTS.DEFAULT_EXECUTOR
+    self.workers = None
 
 
 class Naarad(object):
@@ -219,8 +223,24 @@ class Naarad(object):
       analysis.ts_end = naarad.utils.get_standardized_timestamp(args.end, None)
     if args.variables:
       analysis.variables = naarad.utils.get_variables(args)
+    if args.workers is not None:
+      if args.workers > 0:
+        analysis.executor = CONSTANTS.PROCESS_EXECUTOR
+        analysis.workers = args.workers
+      else:
+        logger.error('Invalid number of workers %d specified. Will default to the number of cpus', args.workers)
+    self._set_download_cache(args)
     return CONSTANTS.OK
 
+  def _set_download_cache(self, args):
+    """
+    Cache the http(s) downloads of this run in the --cache_dir directory if it is given
+    :param: args: Command Line Arguments received by naarad
+    """
+    if getattr(args, 'cache_dir', None):
+      max_size = args.cache_size * 1024 ** 2 if args.cache_size else CONSTANTS.DOWNLOAD_CACHE_MAX_SIZE
+      naarad.httpdownload.set_download_cache(args.cache_dir, max_size)
+
   def analyze(self, input_directory, output_directory, **kwargs):
     """
     Run all the analysis saved in self._analyses, sorted by test_id.
@@ -271,7 +291,6 @@ class Naarad(object):
     :param **kwargs: Additional keyword args can be passed in here for future enhancements
     :return:
     """
-    threads = []
     crossplots = []
     report_args = {}
     metrics = defaultdict()
@@ -316,27 +335,35 @@ class Naarad(object):
         metric.ts_start = analysis.ts_start
       if analysis.ts_end:
         metric.ts_end = analysis.ts_end
-      thread = threading.Thread(target=naarad.utils.parse_and_plot_single_metrics,
-                                args=(metric, graph_timezone, analysis.output_directory, analysis.input_directory, graphing_library, self.skip_plots))
-      thread.start()
-      threads.append(thread)
-    for t in threads:
-      t.join()
-    for metric in metrics['aggregate_metrics']:
-      thread = threading.Thread(target=naarad.utils.parse_and_plot_single_metrics,
-                                args=(metric, graph_timezone, analysis.output_directory, analysis.input_directory, graphing_library, self.skip_plots))
-      thread.start()
-      threads.append(thread)
-    for t in threads:
-      t.join()
-    self._set_sla_data(analysis.test_id, metrics['metrics'] + metrics['aggregate_metrics'])
-    self._set_stats_data(analysis.test_id, metrics['metrics'] + metrics['aggregate_metrics'])
-    if len(crossplots) > 0 and not self.skip_plots:
-      correlated_plots = naarad.utils.nway_plotting(crossplots, metrics['metrics'] + metrics['aggregate_metrics'],
-                                                    os.path.join(analysis.output_directory, analysis.resource_path),
-                                                    analysis.resource_path, graphing_library)
-    else:
-      correlated_plots = []
+    for metric in metrics['metrics'] + metrics['aggregate_metrics']:
+      # tile pyramids are only loaded by the client charting page of the report
+      if metric.tiles is None:
+        metric.tiles = report_args.get('tiles', True)
+    # Charts are rendered by a pool of processes when the graphing library supports it, the report waits for them
+    render_pool = not self.skip_plots and hasattr(self.available_graphing_modules[graphing_library], 'start_render_pool')
+    if render_pool:
+      self.available_graphing_modules[graphing_library].start_render_pool(analysis.workers)
+    try:
+      # Aggregate metrics are analyzed only after all the metrics they aggregate have completed
+      self._analyze_metrics(analysis, metrics['metrics'], graph_timezone, graphing_library)
+      self._analyze_metrics(analysis, metrics['aggregate_metrics'], graph_timezone, graphing_library)
+      self._set_sla_data(analysis.test_id, metrics['metrics'] + metrics['aggregate_metrics'])
+      self._set_stats_data(analysis.test_id, metrics['metrics'] + metrics['aggregate_metrics'])
+      if len(crossplots) > 0 and not self.skip_plots:
+        correlated_plots = naarad.utils.nway_plotting(crossplots, metrics['metrics'] + metrics['aggregate_metrics'],
+                                                      os.path.join(analysis.output_directory, analysis.resource_path),
+                                                      analysis.resource_path, graphing_library)
+      else:
+        correlated_plots = []
+      if render_pool:
+        failed_plots = self.available_graphing_modules[graphing_library].wait_for_render_pool()
+        for metric in metrics['metrics'] + metrics['aggregate_metrics']:
+          metric.plot_files = [plot_file for plot_file in metric.plot_files if plot_file not in failed_plots]
+        correlated_plots = [plot_file for plot_file in correlated_plots if plot_file not in failed_plots]
+    finally:
+      if render_pool:
+        # Does nothing once wait_for_render_pool() returned, stops the renderers if the analysis failed before that
+        self.available_graphing_modules[graphing_library].stop_render_pool()
     rpt = reporting_modules['report'](None, analysis.output_directory, os.path.join(analysis.output_directory, analysis.resource_path), analysis.resource_path,
                                       metrics['metrics'] + metrics['aggregate_metrics'], correlated_plots=correlated_plots, **report_args)
     rpt.generate()
@@ -350,6 +377,33 @@ class Naarad(object):
 
     return CONSTANTS.OK
 
+  def _analyze_metrics(self, analysis, metrics, graph_timezone, graphing_library):
+    """
+    Analyze the specified metrics using the executor configured for the analysis: one thread per metric, or a pool of
+    worker processes
+    :param: analysis: The analysis object being processed
+    :param: metrics: list of metrics to analyze
+    """
+    if analysis.executor == CONSTANTS.PROCESS_EXECUTOR:
+      for metric in metrics:
+        # Metrics are analyzed in daemonic worker processes, which cannot start pools of their own
+        metric.workers = 1
+      naarad.utils.parse_and_plot_metrics_in_processes(metrics, graph_timezone, analysis.output_directory, analysis.input_directory,
+                                                       graphing_library, self.skip_plots, analysis.workers)
+      return CONSTANTS.OK
+    # The metrics analyzed at once share the workers of the analysis for the pools they start to parse and detect anomalies
+    workers = analysis.workers or multiprocessing.cpu_count()
+    threads = []
+    for metric in metrics:
+      metric.workers = max(1, workers // len(metrics))
+      thread = threading.Thread(target=naarad.utils.parse_and_plot_single_metrics,
+                                args=(metric, graph_timezone, analysis.output_directory, analysis.input_directory, graphing_library, self.skip_plots))
+      thread.start()
+      threads.append(thread)
+    for t in threads:
+      t.join()
+    return CONSTANTS.OK
+
   def diff(self, test_id_1, test_id_2, config=None, **kwargs):
     """
     Create a diff report using test_id_1 as a baseline
@@ -387,6 +441,8 @@ class Naarad(object):
     if kwargs:
       if 'output_directory' in kwargs.keys():
         output_directory = kwargs['output_directory']
+      if 'args' in kwargs.keys():
+        self._set_download_cache(kwargs['args'])
     diff_report = Diff([NaaradReport(report1_location, None), NaaradReport(report2_location, None)], 'diff',
                        output_directory, os.path.join(output_directory, self._resource_path), self._resource_path)
     if config:
@@ -416,6 +472,12 @@ class Naarad(object):
 
     if config.has_section('GLOBAL'):
       ts_start, ts_end = naarad.utils.parse_global_section(config, 'GLOBAL')
+      executor, workers = naarad.utils.parse_executor_options(config, 'GLOBAL')
+      # --workers on the command line takes precedence over the config
+      if analysis.workers is None:
+        if executor:
+          analysis.executor = executor
+        analysis.workers = workers
       if config.has_option('GLOBAL', 'user_defined_metrics'):
         naarad.utils.parse_user_defined_metric_classes(config, metric_classes)
       config.remove_section('GLOBAL')
@@ -0,0 +1,331 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import bz2
+import errno
+import gzip
+import io
+import logging
+import os
+import shutil
+import tarfile
+import zlib
+import naarad.naarad_constants as CONSTANTS
+try:
+  import brotli
+except ImportError:
+  brotli = None
+try:
+  import lzma
+except ImportError:
+  try:
+    from backports import lzma
+  except ImportError:
+    lzma = None
+try:
+  import zstandard
+except ImportError:
+  zstandard = None
+
+logger = logging.getLogger('naarad.compression')
+
+GZIP_MAGIC = '\x1f\x8b'
+BZIP2_MAGIC = 'BZh'
+XZ_MAGIC = '\xfd7zXZ\x00'
+ZSTD_MAGIC = '\x28\xb5\x2f\xfd'
+
+
+def compress_file(file_name, encodings=(CONSTANTS.GZIP_ENCODING,)):
+  """
+  Write compressed copies of a file and remove it. A .gz copy is always written so that the file can be read back
+  by naarad and the client charting page, a .br copy is written too if br is in encodings and brotli is installed. The
+  page does not load .br copies, they are for web servers which serve precompressed files, like nginx brotli_static.
+
+  :param string file_name: path of the file
+  :param encodings: encodings of the copies to write
+  :return: path of the .gz copy
+  """
+  with open(file_name, 'rb') as FH:
+    content = FH.read()
+  gzip_file = file_name + CONSTANTS.GZIP_SUFFIX
+  with open(gzip_file, 'wb') as raw_FH:
+    # mtime is not stored so that compressing the same report twice gives the same files
+    with gzip.GzipFile(filename='', mode='wb', fileobj=raw_FH, compresslevel=CONSTANTS.GZIP_COMPRESSION_LEVEL, mtime=0) as FH:
+      FH.write(content)
+  if CONSTANTS.BROTLI_ENCODING in encodings and brotli is not None:
+    with open(file_name + CONSTANTS.BROTLI_SUFFIX, 'wb') as FH:
+      FH.write(brotli.compress(content))
+  os.remove(file_name)
+  return gzip_file
+
+
+def compress_resources(resource_directory, encodings=(CONSTANTS.GZIP_ENCODING,)):
+  """
+  Replace all the csv files of a report resource directory and of its sub-directories by compressed copies
+
+  :param string resource_directory: path of the resource directory
+  :param encodings: encodings of the copies to write, see compress_file()
+  :return: number of csv files compressed
+  """
+  unknown_encodings = set(encodings) - set([CONSTANTS.GZIP_ENCODING, CONSTANTS.BROTLI_ENCODING])
+  if unknown_encodings:
+    logger.error('Ignoring unsupported resource encodings: %s', ' '.join(sorted(unknown_encodings)))
+  if CONSTANTS.BROTLI_ENCODING in encodings and brotli is None:
+    logger.warning('brotli is not installed. Only .gz resources will be written')
+  count = 0
+  for directory, sub_directories, file_names in os.walk(resource_directory):
+    for file_name in file_names:
+      if file_name.endswith('.csv'):
+        compress_file(os.path.join(directory, file_name), encodings)
+        count += 1
+  logger.info('Compressed %d csv files in %s', count, resource_directory)
+  return count
+
+
+class GunzipStream(object):
+  """
+  Incremental counterpart of gunzip() for content which is read in chunks
+  """
+  def __init__(self):
+    self.decompressor = None
+    self.header = ''
+
+  def decompress(self, chunk):
+    if self.decompressor is None:
+      self.header += chunk
+      if len(self.header) < len(GZIP_MAGIC):
+        return ''
+      chunk, self.header = self.header, ''
+      self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if chunk.startswith(GZIP_MAGIC) else False
+    if not self.decompressor:
+      return chunk
+    return self.decompressor.decompress(chunk)
+
+  def flush(self):
+    if self.decompressor is None:
+      return self.header
+    return self.decompressor.flush() if self.decompressor else ''
+
+
+def gunzip(content):
+  """
+  Decompress gzip content. Content which is not gzip compressed is returned as is, e.g. a .gz resource which the web
+  server already decompressed because it served it with a gzip Content-Encoding.
+  """
+  stream = GunzipStream()
+  return stream.decompress(content) + stream.flush()
+
+
+def copy_resource(file_name, output_directory):
+  """
+  Copy a resource of a local report to a directory. Resources of reports written with compressed resources only
+  exist as .gz files, they are decompressed.
+
+  :param string file_name: path of the resource, without the .gz suffix
+  :param string output_directory: directory to copy the resource to
+  :return: path of the copy
+  """
+  output_file = os.path.join(output_directory, os.path.basename(file_name))
+  if os.path.exists(file_name) or not os.path.exists(file_name + CONSTANTS.GZIP_SUFFIX):
+    shutil.copy(file_name, output_file)
+    return output_file
+  with gzip.open(file_name + CONSTANTS.GZIP_SUFFIX, 'rb') as FH:
+    with open(output_file, 'wb') as output_FH:
+      shutil.copyfileobj(FH, output_FH)
+  return output_file
+
+
+def get_decompressor_factory(magic, file_name=''):
+  """
+  :param str magic: first bytes of a file
+  :return: function returning a new decompressor object for the content of the file, None if it is not compressed
+  """
+  if magic.startswith(GZIP_MAGIC):
+    return lambda: zlib.decompressobj(16 + zlib.MAX_WBITS)
+  if magic.startswith(BZIP2_MAGIC):
+    return bz2.BZ2Decompressor
+  if magic.startswith(XZ_MAGIC):
+    if lzma is None:
+      raise IOError('backports.lzma is not installed, %s cannot be read' % file_name)
+    return lzma.LZMADecompressor
+  if magic.startswith(ZSTD_MAGIC):
+    if zstandard is None:
+      raise IOError('zstandard is not installed, %s cannot be read' % file_name)
+    return lambda: zstandard.ZstdDecompressor().decompressobj()
+  return None
+
+
+class DecompressedFile(io.RawIOBase):
+  """
+  Read only file object of the decompressed content of a stream, meant to be wrapped in an io.BufferedReader. Files of
+  several concatenated compressed streams, e.g. gzip files which were appended to, are read to the end. Seeking back
+  reopens the stream.
+
+  :param opener: function returning a new file object of the stream
+  :param decompressor_factory: function returning a new decompressor object, None if the stream is not compressed
+  """
+  def __init__(self, opener, decompressor_factory=None):
+    io.RawIOBase.__init__(self)
+    self.opener = opener
+    self.decompressor_factory = decompressor_factory
+    self._open()
+
+  def _open(self):
+    self.fileobj = self.opener()
+    self.decompressor = self.decompressor_factory() if self.decompressor_factory else None
+    self.pending = ''
+    self.pending_offset = 0
+    self.position = 0
+    self.eof = False
+
+  def readable(self):
+    return True
+
+  def seekable(self):
+    return True
+
+  def _fill(self):
+    data = self.fileobj.read(CONSTANTS.DECOMPRESSION_CHUNK_SIZE)
+    self.pending_offset = 0
+    if self.decompressor is None:
+      self.pending = data
+      self.eof = not data
+      return
+    if not data:
+      # bz2 and lzma decompressors have no buffered output
+      self.pending = self.decompressor.flush() if hasattr(self.decompressor, 'flush') else ''
+      self.eof = True
+      return
+    self.pending = self.decompressor.decompress(data)
+    unused_data = getattr(self.decompressor, 'unused_data', '')
+    while unused_data.strip('\x00'):
+      self.decompressor = self.decompressor_factory()
+      self.pending += self.decompressor.decompress(unused_data)
+      unused_data = getattr(self.decompressor, 'unused_data', '')
+
+  def readinto(self, buf):
+    while self.pending_offset >= len(self.pending):
+      if self.eof:
+        return 0
+      self._fill()
+    size = min(len(buf), len(self.pending) - self.pending_offset)
+    buf[:size] = self.pending[self.pending_offset:self.pending_offset + size]
+    self.pending_offset += size
+    self.position += size
+    return size
+
+  def tell(self):
+    return self.position
+
+  def seek(self, offset, whence=io.SEEK_SET):
+    if whence == io.SEEK_CUR:
+      offset += self.position
+    elif whence != io.SEEK_SET:
+      raise IOError('Decompressed files can only be seeked from their start or from the current position')
+    if offset < self.position:
+      self.fileobj.close()
+      self._open()
+    buf = bytearray(CONSTANTS.DECOMPRESSION_CHUNK_SIZE)
+    while self.position < offset:
+      if not self.readinto(memoryview(buf)[:offset - self.position]):
+        break
+    return self.position
+
+  def close(self):
+    if not self.closed:
+      self.fileobj.close()
+    io.RawIOBase.close(self)
+
+
+class ArchiveMember(object):
+  """
+  File object of a member of a tar archive read as a stream, which closes the archive along with the member
+  """
+  def __init__(self, archive_file, member_name):
+    self.archive_FH = open_input(archive_file)
+    self.member_FH = None
+    try:
+      self.tar = tarfile.open(fileobj=self.archive_FH, mode='r|')
+      for member in self.tar:
+        if member.isfile() and is_member_path(member.name, member_name):
+          self.member_FH = self.tar.extractfile(member)
+          return
+    except tarfile.TarError as e:
+      self.archive_FH.close()
+      raise IOError('Cannot read %s: %s' % (archive_file, e))
+    self.close()
+    raise IOError(errno.ENOENT, 'No member %s in %s' % (member_name, archive_file))
+
+  def read(self, size=-1):
+    return self.member_FH.read(size)
+
+  def close(self):
+    if self.member_FH:
+      self.member_FH.close()
+    self.tar.close()
+    self.archive_FH.close()
+
+
+def is_member_path(path, member_name):
+  """
+  Check whether the path of a member of an archive matches a member name, which can omit the directories of the path
+  """
+  path = os.path.normpath(path)
+  member_name = os.path.normpath(member_name)
+  return path == member_name or path.endswith('/' + member_name)
+
+
+def find_archive_member(file_name):
+  """
+  Split the path of a member of a tar archive, e.g. /logs/results.tar.gz/sar-results/sar.cpuusage.out, into the path of
+  the archive and the path of the member in the archive
+
+  :return: tuple of the archive path and the member path, None if the file name is not in an archive
+  """
+  if os.path.exists(file_name):
+    return None
+  archive_file, member_name = file_name, ''
+  while True:
+    archive_file, name = os.path.split(archive_file)
+    if not name:
+      return None
+    member_name = os.path.join(name, member_name) if member_name else name
+    if archive_file.endswith(CONSTANTS.TAR_ARCHIVE_SUFFIXES) and os.path.isfile(archive_file):
+      return archive_file, member_name
+
+
+def input_exists(file_name):
+  return os.path.exists(file_name) or find_archive_member(file_name) is not None
+
+
+def open_input(file_name):
+  """
+  Open an input file for reading. gzip, bzip2, xz and zstd files are decompressed as they are read, xz and zstd need
+  backports.lzma and zstandard. Members of tar archives are read straight from the archive, see find_archive_member().
+
+  :param string file_name: path of the file
+  :return: file object
+  """
+  archive_member = find_archive_member(file_name)
+  if archive_member:
+    return io.BufferedReader(DecompressedFile(lambda: ArchiveMember(*archive_member)), CONSTANTS.DECOMPRESSION_CHUNK_SIZE)
+  with open(file_name, 'rb') as FH:
+    magic = FH.read(len(XZ_MAGIC))
+  decompressor_factory = get_decompressor_factory(magic, file_name)
+  if decompressor_factory is None:
+    return open(file_name, 'r')
+  return io.BufferedReader(DecompressedFile(lambda: open(file_name, 'rb'), decompressor_factory), CONSTANTS.DECOMPRESSION_CHUNK_SIZE)
@@ -0,0 +1,133 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import naarad.naarad_constants as CONSTANTS
+
+logger = logging.getLogger('naarad.download_cache')
+
+
+class DownloadCache(object):
+  """
+  Cache of downloaded urls, keyed by url. The ETag and Last-Modified headers of each cached response are kept so that
+  the url is requested again conditionally and the cached copy is reused when the server answers 304 Not Modified.
+  The least recently used entries are evicted once the cache grows beyond max_size bytes.
+  """
+
+  def __init__(self, cache_directory, max_size=CONSTANTS.DOWNLOAD_CACHE_MAX_SIZE):
+    self.cache_directory = cache_directory
+    self.max_size = max_size
+    self.lock = threading.Lock()
+    if not os.path.exists(cache_directory):
+      os.makedirs(cache_directory)
+
+  def _get_paths(self, url):
+    key = hashlib.sha1(url).hexdigest()
+    return os.path.join(self.cache_directory, key), os.path.join(self.cache_directory, key + CONSTANTS.DOWNLOAD_CACHE_METADATA_SUFFIX)
+
+  def get_validators(self, url):
+    """
+    :return: dict of the conditional request headers for a url, empty if the url is not cached
+    """
+    content_file, metadata_file = self._get_paths(url)
+    if not os.path.exists(content_file):
+      return {}
+    try:
+      with open(metadata_file) as FH:
+        metadata = json.load(FH)
+    except (IOError, ValueError):
+      return {}
+    headers = {}
+    if metadata.get('etag'):
+      headers['If-None-Match'] = str(metadata['etag'])
+    if metadata.get('last_modified'):
+      headers['If-Modified-Since'] = str(metadata['last_modified'])
+    return headers
+
+  def copy(self, url, FH):
+    """
+    Write the cached copy of a url to a file object and mark it as recently used
+    :return: number of bytes written, None if the url is no longer cached
+    """
+    content_file = self._get_paths(url)[0]
+    try:
+      with open(content_file, 'rb') as cached_FH:
+        shutil.copyfileobj(cached_FH, FH)
+      os.utime(content_file, None)
+    except (IOError, OSError):
+      return None
+    return os.path.getsize(content_file)
+
+  def store(self, url, file_name, etag=None, last_modified=None):
+    """
+    Cache the downloaded copy of a url. Responses without validators cannot be requested conditionally and are not cached.
+    """
+    if not etag and not last_modified:
+      return False
+    content_file, metadata_file = self._get_paths(url)
+    # files are written under temporary names and renamed so that other naarad processes never read partial entries
+    temporary_file = self._get_temporary_file()
+    shutil.copyfile(file_name, temporary_file)
+    os.rename(temporary_file, content_file)
+    temporary_file = self._get_temporary_file()
+    with open(temporary_file, 'w') as FH:
+      json.dump({'url': url, 'etag': etag, 'last_modified': last_modified}, FH)
+    os.rename(temporary_file, metadata_file)
+    self.evict()
+    return True
+
+  def _get_temporary_file(self):
+    fd, temporary_file = tempfile.mkstemp(dir=self.cache_directory, suffix=CONSTANTS.DOWNLOAD_CACHE_TEMPORARY_SUFFIX)
+    os.close(fd)
+    return temporary_file
+
+  def evict(self):
+    """
+    Remove the least recently used entries until the cache is no larger than max_size
+    :return: number of entries removed
+    """
+    with self.lock:
+      entries = []
+      for file_name in os.listdir(self.cache_directory):
+        path = os.path.join(self.cache_directory, file_name)
+        if os.path.splitext(file_name)[1] in (CONSTANTS.DOWNLOAD_CACHE_METADATA_SUFFIX, CONSTANTS.DOWNLOAD_CACHE_TEMPORARY_SUFFIX):
+          continue
+        try:
+          entries.append((os.path.getmtime(path), os.path.getsize(path), path))
+        except OSError:
+          continue
+      total_size = sum(size for mtime, size, path in entries)
+      count = 0
+      for mtime, size, path in sorted(entries):
+        if total_size <= self.max_size:
+          break
+        for file_name in (path, path + CONSTANTS.DOWNLOAD_CACHE_METADATA_SUFFIX):
+          try:
+            os.remove(file_name)
+          except OSError:
+            pass
+        total_size -= size
+        count += 1
+      if count:
+        logger.info('Evicted %d entries from the download cache %s', count, self.cache_directory)
+      return count
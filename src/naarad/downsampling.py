@@ -0,0 +1,102 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import logging
+import os
+import numpy
+import naarad.naarad_constants as CONSTANTS
+
+logger = logging.getLogger('naarad.downsampling')
+
+
+def lttb_indices(timestamps, values, points):
+  """
+  Select the points of a time series to keep when reducing it to a number of points for plotting. The first and last
+  points are kept, the points in between are split in buckets and for each bucket the point picked by
+  Largest-Triangle-Three-Buckets is kept along with the minimum and maximum of the bucket, so that spikes are never
+  dropped from the chart.
+
+  :param timestamps: numpy array of epoch ms timestamps, sorted
+  :param values: numpy array of values
+  :param int points: maximum number of points to keep, the first and last points are kept even if it is less than 2
+  :return: sorted numpy array of the indices of the points to keep
+  """
+  count = len(values)
+  if points >= count or count < 3:
+    return numpy.arange(count)
+  if points < 5:
+    # too few points for a bucket between the first and last points, only those are kept
+    return numpy.array([0, count - 1], dtype=numpy.int64)
+  # up to 3 points are kept per bucket
+  bucket_count = max(1, (points - 2) // 3)
+  x = numpy.asarray(timestamps, dtype=numpy.float64) - float(timestamps[0])
+  y = numpy.asarray(values, dtype=numpy.float64)
+  edges = numpy.linspace(1, count - 1, bucket_count + 1).astype(numpy.int64)
+  selected = numpy.empty(3 * bucket_count + 2, dtype=numpy.int64)
+  selected[0] = 0
+  selected[-1] = count - 1
+  previous = 0
+  for bucket in range(bucket_count):
+    start, end = edges[bucket], edges[bucket + 1]
+    if bucket + 1 < bucket_count:
+      next_x = x[end:edges[bucket + 2]].mean()
+      next_y = y[end:edges[bucket + 2]].mean()
+    else:
+      next_x = x[-1]
+      next_y = y[-1]
+    # twice the area of the triangles formed by the previous selected point, each point of the bucket and the average
+    # of the next bucket
+    areas = numpy.abs((x[previous] - next_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y - y[previous]))
+    previous = start + int(areas.argmax())
+    selected[3 * bucket + 1] = previous
+    selected[3 * bucket + 2] = start + int(y[start:end].argmin())
+    selected[3 * bucket + 3] = start + int(y[start:end].argmax())
+  return numpy.unique(selected)
+
+
+def downsample(timestamps, values, points=CONSTANTS.DEFAULT_PLOT_POINTS):
+  """
+  Reduce a time series to at most the given number of points, and no less than 2, with lttb_indices()
+
+  :return: tuple of timestamps and values arrays, the arrays passed in if the series has no more points than that
+  """
+  if points is None or len(values) <= points:
+    return timestamps, values
+  indices = lttb_indices(timestamps, values, points)
+  return numpy.asarray(timestamps)[indices], numpy.asarray(values)[indices]
+
+
+def get_downsampled_csv(csv_file):
+  return os.path.splitext(csv_file)[0] + CONSTANTS.DOWNSAMPLED_CSV_SUFFIX
+
+
+def write_downsampled_csv(csv_file, timestamps, values, points=CONSTANTS.DEFAULT_PLOT_POINTS):
+  """
+  Write the downsampled companion of a time series csv file, which the client charting page loads instead of the full
+  resolution csv file. Nothing is written for series which have no more points than the target.
+
+  :param string csv_file: path of the full resolution csv file
+  :return: path of the downsampled csv file or None if it was not written
+  """
+  if points is None or len(values) <= points:
+    return None
+  timestamps, values = downsample(timestamps, values, points)
+  downsampled_csv = get_downsampled_csv(csv_file)
+  with open(downsampled_csv, 'w') as FH:
+    FH.writelines('%d,%r\n' % row for row in zip(timestamps.tolist(), values.tolist()))
+  logger.info('Downsampled %s to %d points in %s', csv_file, len(values), downsampled_csv)
+  return downsampled_csv
@@ -0,0 +1,601 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import logging
+import multiprocessing
+import re
+import naarad.compression
+from naarad.timestamp_parser import TimestampParser
+
+logger = logging.getLogger('naarad.gc_log_parser')
+
+# Regular expressions of the GC log events, kept in line with the ones of bin/PrintGCStats
+HEAP_SIZE = r'[0-9]+[KMG]'  # 8K
+HEAP_SIZE_PAREN = r'\(' + HEAP_SIZE + r'\)'  # (8K)
+HEAP_SIZE_CHANGE = HEAP_SIZE + '->' + HEAP_SIZE  # 8K->4K
+HEAP_SIZE_STATUS = HEAP_SIZE_CHANGE + ' ?' + HEAP_SIZE_PAREN  # 8K->4K(96K), or 8K->4K (96K)
+GC_TIME = r'[0-9]+\.[0-9]+'
+GC_TIME_SECS = GC_TIME + ' secs'
+TIMESTAMP = '(' + GC_TIME + ': *)?'
+GC_DATESTAMP = r'[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}.[0-9]+'
+HEAP_REPORT = HEAP_SIZE_STATUS + ', ' + GC_TIME_SECS  # 8K->4K(96K), 0.0517089 secs
+CMS_HEAP_SIZE = HEAP_SIZE + HEAP_SIZE_PAREN  # 6K(9K)
+CMS_HEAP_REPORT = CMS_HEAP_SIZE + ', ' + GC_TIME_SECS
+CMS_CONCURRENT_PHASE = '(AS)?CMS-concurrent-(mark|(abortable-)?preclean|sweep|reset)'
+PROMO_FAILED = r'( \(promotion failed\))?'
+CMS_GEN = r'(AS)?CMS( \(concurrent mode failure\))?'
+PARNEW_GEN = '(AS)?ParNew'
+FW_YNG_GEN = '(DefNew|' + PARNEW_GEN + ')' + PROMO_FAILED
+FW_OLD_GEN = '(Tenured|' + CMS_GEN + ')'
+FULL_GC = r'\[Full GC (\(System\) )?'
+
+G1_STATS_VALUE = '[0-9]+[.0-9]+'
+G1_HEAP_SIZE = '[0-9]+[.0-9]+[BKMG]'
+
+_datestamp_re = re.compile(r'^([0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}).([0-9]+)')
+_gc_time_secs_re = re.compile(GC_TIME_SECS)
+_gc_time_re = re.compile(GC_TIME)
+_heap_size_before_re = re.compile(HEAP_SIZE + '->')
+_heap_size_after_re = re.compile('[KM]->' + HEAP_SIZE)
+_heap_size_paren_re = re.compile(HEAP_SIZE_PAREN)
+_heap_size_change_re = re.compile(HEAP_SIZE_CHANGE)
+_awk_number_re = re.compile(r'\s*[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?')
+_gc_name_re = re.compile(r'\[GC[^ ]+ ')
+_gc_name_sub_re = re.compile('GC[^ ]+')
+_g1_remark_sub_re = re.compile(r'GC remark [^\[]+')
+_g1_remark_refproc_re = re.compile(r'\[GC ref-proc, ' + GC_TIME_SECS + r'\]')
+_cms_concurrent_phase_re = re.compile(CMS_CONCURRENT_PHASE + ': ')
+_cms_concurrent_time_re = re.compile('/' + GC_TIME_SECS)
+_cms_split_full_gc_re = re.compile(r'\[(AS)?CMS(' + GC_DATESTAMP + '.*: )?' + TIMESTAMP + r'\[' + CMS_CONCURRENT_PHASE)
+_cms_split_full_gc_time_re = re.compile('.*' + HEAP_SIZE_STATUS + r'\]?, ')
+_secs_suffix_re = re.compile(' secs.*')
+_old_gen_time_re = re.compile(r'.*\[' + FW_OLD_GEN + ': ' + HEAP_SIZE_STATUS + ', ')
+_old_gen_sizes_re = re.compile(r'.*\[' + FW_OLD_GEN + ': ')
+_heap_report_prefix_re = re.compile(HEAP_REPORT + r'\] ')
+_full_gc_time_re = re.compile('.*' + HEAP_SIZE_STATUS + r'\], ')
+_full_gc_young_time_re = re.compile('.*' + HEAP_SIZE_STATUS + ', ')
+_par_old_gen_sizes_re = re.compile(r'.*\[(PS|Par)OldGen: +')
+_heap_size_status_prefix_re = re.compile(HEAP_SIZE_STATUS + r'\] ')
+_last_secs_re = re.compile('.*, ')
+_times_user_re = re.compile('Times: user=')
+_times_sys_re = re.compile('sys=')
+_times_real_re = re.compile('real=')
+_safepoint_re = re.compile('were stopped: ([0-9][0-9.]*) seconds')
+_apptime_re = re.compile('Application time:[\t ]+([0-9][0-9.]*) seconds')
+
+# G1 pause details, with the values extracted by PrintGCStats as groups
+G1_STATS = 'Min: [0-9]+[.0-9]+, Avg: ([0-9]+[.0-9]+), Max: ([0-9]+[.0-9]+), Diff: [0-9]+[.0-9]+'
+G1_STATS_SUM = G1_STATS + ', Sum: [0-9]+[.0-9]+'
+G1_TIME_MS = r'([0-9]+\.[0-9]+) ms'
+# (sub-metric suffix, regex) of the per worker statistics of the parallel phase, reported as avg and max
+G1_PARALLEL_STATS = (
+    ('parallel.gc-worker-start', r'\[GC Worker Start \(ms\): ' + G1_STATS + r'\]'),
+    ('parallel.ext-root-scanning', r'\[Ext Root Scanning \(ms\): ' + G1_STATS_SUM + r'\]'),
+    ('parallel.update-rs', r'\[Update RS \(ms\): ' + G1_STATS_SUM + r'\]'),
+    ('parallel.update-rs.processed-buffers', r'\[Processed Buffers: ' + G1_STATS_SUM + r'\]'),
+    ('parallel.scan-rs', r'\[Scan RS \(ms\): ' + G1_STATS_SUM + r'\]'),
+    ('parallel.object-copy-rs', r'\[Object Copy \(ms\): ' + G1_STATS_SUM + r'\]'),
+    ('parallel.termination', r'\[Termination \(ms\): ' + G1_STATS_SUM + r'\]'),
+    ('parallel.gc-worker-other', r'\[GC Worker Other \(ms\): ' + G1_STATS_SUM + r'\]'),
+    ('parallel.gc-worker-total', r'\[GC Worker Total \(ms\): ' + G1_STATS_SUM + r'\]'),
+    ('parallel.gc-worker-end', r'\[GC Worker End \(ms\): ' + G1_STATS + r'\]'))
+# (sub-metric suffix, regex) of the times of the other phases
+G1_PHASE_TIMES = (
+    ('code-root-fixup', r'\[Code Root Fixup: ' + G1_TIME_MS + r'\]'),
+    ('clear-ct', r'\[Clear CT: ' + G1_TIME_MS + r'\]'),
+    ('other', r'\[Other: ' + G1_TIME_MS + r'\]'),
+    ('other.choose-cset', r'\[Choose CSet: ' + G1_TIME_MS + r'\]'),
+    ('other.ref-proc', r'\[Ref Proc: ' + G1_TIME_MS + r'\]'),
+    ('other.reg-enq', r'\[Ref Enq: ' + G1_TIME_MS + r'\]'),
+    ('other.free-cset', r'\[Free CSet: ' + G1_TIME_MS + r'\]'))
+_g1_parallel_stats = tuple((suffix, re.compile(regex)) for suffix, regex in G1_PARALLEL_STATS)
+_g1_phase_times = tuple((suffix, re.compile(regex)) for suffix, regex in G1_PHASE_TIMES)
+_g1_parallel_time_re = re.compile('Parallel Time: ' + G1_TIME_MS)
+_g1_gc_workers_re = re.compile('GC Workers: ([0-9]+)')
+_g1_heap_sizes = '(' + G1_HEAP_SIZE + r')\((' + G1_HEAP_SIZE + r')\)->(' + G1_HEAP_SIZE + r')\((' + G1_HEAP_SIZE + r')\)'
+_g1_eden_re = re.compile(r'\[Eden: ' + _g1_heap_sizes)
+_g1_survivors_re = re.compile('Survivors: (' + G1_HEAP_SIZE + ')->(' + G1_HEAP_SIZE + ')')
+_g1_heap_re = re.compile('Heap: ' + _g1_heap_sizes)
+_g1_cpu_times_re = re.compile(r'\[Times: user=(' + G1_STATS_VALUE + ') sys=(' + G1_STATS_VALUE + '), real=(' + G1_STATS_VALUE + r') secs\]')
+_g1_no_match_groups = ('', '', '', '')
+
+# Stop-the-world pauses, which are also reported in the GCPause sub-metric
+PAUSE_SUB_METRICS = ('gen0t', 'gen1t', 'g1-pause-young', 'g1-pause-mixed', 'g1-pause-remark', 'g1-pause-cleanup', 'cmsIM', 'cmsRM',
+                     'cmsRS')
+
+
+def awk_number(value):
+  """
+  Convert a string to a number the way awk does: the longest numeric prefix is used and strings without one are 0
+  """
+  if not isinstance(value, basestring):
+    return value
+  try:
+    return float(value)
+  except ValueError:
+    pass
+  match = _awk_number_re.match(value)
+  if not match:
+    return 0.0
+  return float(match.group(0))
+
+
+def _groups(match):
+  """
+  Return the groups of a match, or empty strings when there is no match
+  """
+  return match.groups() if match else _g1_no_match_groups
+
+
+def _secs(match):
+  """
+  Return the seconds of a '0.0517089 secs' match
+  """
+  return float(match.group(0)[:-5]) if match else 0.0
+
+
+def _sub(regex, text):
+  """
+  Remove the first match of regex from text, like awk sub(regex, "", text)
+
+  :return: tuple of the resulting text and the number of substitutions
+  """
+  return regex.subn('', text, 1)
+
+
+class GCLogParser(object):
+  """
+  Parser of the GC logs produced with -XX:+PrintGCDetails -XX:+PrintGCDateStamps. It handles the ParNew/DefNew, CMS,
+  ParallelGC and G1 events of bin/PrintGCStats: each line is assembled into a GC event the way PrintGCStats joins
+  multi-line records, then dispatched to the handler of the first event regex that matches it. The handlers emit
+  (timestamp, value) points into the columns of the requested sub-metrics.
+  """
+
+  def __init__(self, sub_metrics, ts_start=None, ts_end=None):
+    """
+    :param sub_metrics: names of the sub-metrics to emit
+    :param int ts_start: epoch ms timestamp of the first event to parse
+    :param int ts_end: epoch ms timestamp after which parsing stops
+    """
+    self.sub_metrics = set(sub_metrics)
+    self.ts_start = ts_start
+    self.ts_end = ts_end
+    self.columns = {}  # sub-metric name -> (list of epoch ms timestamps, list of values)
+    self.record_pauses = 'GCPause' in self.sub_metrics
+    self.timestamp = None
+    self._timestamp_parser = TimestampParser('%Y-%m-%dT%H:%M:%S')
+    # Heap sizes in MB parsed from the last heap size report and from the last young gen collection
+    self._heap_sizes = [0.0, 0.0, 0.0]
+    self._gen0_sizes = [0.0, 0.0, 0.0]
+    self._parnew_prefix = None
+    self._g1_prefix = None
+    self._split_full_gc_timestamp = None
+    # (hint, regex, handler): the regex is only evaluated for lines which contain the hint substring
+    self.event_handlers = [
+        ('GC remark', re.compile(r'\[GC remark [^\[]+'), self.handle_g1_remark),
+        ('CMS-initial-mark', re.compile(r'\[1 (AS)?CMS-initial-mark: ' + CMS_HEAP_SIZE + r'\] ' + CMS_HEAP_REPORT + r'\]'),
+         self.handle_cms_initial_mark),
+        ('CMS-remark', re.compile(r'\[1 (AS)?CMS-remark: ' + CMS_HEAP_SIZE + r'\] ' + CMS_HEAP_REPORT + r'\]'), self.handle_cms_remark),
+        ('[GC ', re.compile(r'\[GC ' + CMS_HEAP_REPORT + r'\]'), self.handle_cms_verbose_mark),
+        ('CMS-concurrent-', re.compile(r'\[' + CMS_CONCURRENT_PHASE + ': ' + GC_TIME + '/' + GC_TIME_SECS + r'\]'),
+         self.handle_cms_concurrent_phase),
+        ('New', re.compile(r'\[GC.*\[' + FW_YNG_GEN + ': ' + HEAP_REPORT + r'\].*\[' + FW_OLD_GEN + ': ' + HEAP_REPORT + r'\]'),
+         self.handle_young_and_old_gc),
+        ('[Full GC', re.compile(FULL_GC + TIMESTAMP + r'.*\[' + FW_OLD_GEN + ': ' + HEAP_REPORT + r'\] ' + HEAP_SIZE_STATUS +
+                                r', \[((AS)?CMS )?(Perm |Metaspace)*: ' + HEAP_SIZE_STATUS + r'\], ' + GC_TIME_SECS + r'\]'),
+         self.handle_full_gc),
+        ('[Full GC', re.compile(FULL_GC + TIMESTAMP + r'.*\[' + FW_YNG_GEN + ': ' + HEAP_REPORT + r'\] ' + HEAP_REPORT + r'\]'),
+         self.handle_full_gc_young_gen),
+        ('New', re.compile(r'\[GC (\(Allocation Failure\) )?' + TIMESTAMP + r'\[' + FW_YNG_GEN + ': ' + HEAP_REPORT + r'\] ' +
+                           HEAP_REPORT + r'\]'),
+         self.handle_young_gc),
+        ('PSYoungGen', re.compile(FULL_GC + r'\[PSYoungGen: +' + HEAP_SIZE_STATUS + r'\] \[(PS|Par)OldGen: +' + HEAP_SIZE_STATUS +
+                                  r'\] ' + HEAP_SIZE_STATUS + r' \[PSPermGen: +' + HEAP_SIZE_STATUS + r'\], ' + GC_TIME_SECS + r'\]'),
+         self.handle_parallel_full_gc),
+        ('PSYoungGen', re.compile(r'\[GC(--)? \[PSYoungGen: +' + HEAP_SIZE_STATUS + r'\] ' + HEAP_REPORT + r'\]'),
+         self.handle_parallel_young_gc),
+        ('], ', re.compile(r'\[GC.*\[.*\], [0-9][0-9.]* secs\]'), self.handle_generation_gc),
+        ('pause (young)', re.compile(r'\[GC pause \(young\)( \((initial-mark|evacuation failed)\))?, ' + GC_TIME_SECS + r'\]'),
+         self.handle_g1_young_pause),
+        ('pause (mixed)', re.compile(r'\[GC pause \(mixed\), ' + GC_TIME_SECS + r'\]'), self.handle_g1_mixed_pause),
+        ('cleanup', re.compile(r'\[GC cleanup ' + HEAP_SIZE_STATUS + ', ' + GC_TIME_SECS + r'\]'), self.handle_g1_cleanup),
+        (None, re.compile(r'\[(GC(--)?|' + PARNEW_GEN + ') ' + HEAP_REPORT + r'\]'), self.handle_verbose_gc),
+        ('[Full GC', re.compile(FULL_GC + HEAP_REPORT + r'\]'), self.handle_verbose_full_gc),
+        ('were stopped', _safepoint_re, self.handle_safepoint),
+        ('Application time', _apptime_re, self.handle_application_time)
+    ]
+
+  def emit(self, sub_metric, value):
+    """
+    Add a point of the current event to the column of a sub-metric. Stop-the-world pauses are also added to GCPause.
+    """
+    value = awk_number(value)
+    if sub_metric in self.sub_metrics:
+      timestamps, values = self.columns.setdefault(sub_metric, ([], []))
+      timestamps.append(self.timestamp)
+      values.append(value)
+    if self.record_pauses and sub_metric in PAUSE_SUB_METRICS:
+      timestamps, values = self.columns.setdefault('GCPause', ([], []))
+      timestamps.append(self.timestamp)
+      values.append(value)
+
+  def get_datestamp(self, line):
+    """
+    Return the epoch ms timestamp of the -XX:+PrintGCDateStamps date stamp at the start of a line, or None
+    """
+    match = _datestamp_re.match(line)
+    if not match:
+      return None
+    epoch_ms = self._timestamp_parser.parse(match.group(1))
+    if epoch_ms == -1:
+      return None
+    return epoch_ms + int(match.group(2))
+
+  def parse(self, infile):
+    """
+    Parse a GC log file into self.columns
+    """
+    with naarad.compression.open_input(infile) as gc_log:
+      for line in gc_log:
+        if not self.parse_line(line.rstrip('\n')):
+          break
+    return self.columns
+
+  def parse_line(self, line):
+    """
+    Handle a line of a GC log.
+
+    :return: False once a GC event after ts_end is reached, True otherwise
+    """
+    if self._split_full_gc_timestamp is not None:
+      self.handle_split_full_gc(line)
+      return True
+    if '[GC' in line and _gc_name_re.search(line):
+      line = _gc_name_sub_re.sub('GC', line, 1)
+    if ' age ' in line or 'Desired' in line:
+      return True
+    # Young gen collections are split across lines when the tenuring distribution is printed
+    if line.endswith('ParNew'):
+      self._parnew_prefix = line
+      return True
+    if self._parnew_prefix is not None:
+      line = self._parnew_prefix + line
+      self._parnew_prefix = None
+    # G1 pauses are printed on several lines, up to the [Times: ...] line
+    if 'GC pause' in line:
+      self._g1_prefix = line
+      return True
+    if self._g1_prefix is not None:
+      if 'real=' not in line:
+        self._g1_prefix += line
+        return True
+      line = self._g1_prefix + line
+      self._g1_prefix = None
+    timestamp = self.get_datestamp(line)
+    if timestamp is None or (self.ts_start and timestamp < self.ts_start):
+      return True
+    if self.ts_end and timestamp > self.ts_end:
+      return False
+    self.timestamp = timestamp
+    self.dispatch(line)
+    return True
+
+  def dispatch(self, line):
+    """
+    Call the handler of the first GC event regex matching the line
+    """
+    for hint, regex, handler in self.event_handlers:
+      if hint is not None and hint not in line:
+        continue
+      match = regex.search(line)
+      if match:
+        handler(line, match)
+        return
+
+  def parse_heap_sizes(self, text):
+    """
+    Parse the first 8K->4K(96K) heap size report in text into self._heap_sizes, in MB
+
+    :return: position in text after the report, or -1 if the report is incomplete
+    """
+    sizes = self._heap_sizes
+    sizes[0] = sizes[1] = 0.0
+    match = _heap_size_before_re.search(text)
+    if not match:
+      return -1
+    sizes[0] = float(match.group(0)[:-3])
+    if match.group(0)[-3] == 'K':
+      sizes[0] /= 1024.0
+    match = _heap_size_after_re.search(text)
+    if not match:
+      return -1
+    sizes[1] = float(match.group(0)[3:-1])
+    if match.group(0)[0] == 'K':
+      sizes[1] /= 1024.0
+    match = _heap_size_paren_re.search(text)
+    if not match:
+      return -1
+    sizes[2] = float(match.group(0)[1:-2])
+    if match.group(0)[-2] == 'K':
+      sizes[2] /= 1024.0
+    return match.end()
+
+  def emit_heap_sizes(self, text):
+    """
+    Emit the heap occupancy and commit sizes of a heap size report without generation details
+    """
+    if self.parse_heap_sizes(text) < 0:
+      return
+    self.emit('alloc', self._heap_sizes[0] - self._gen0_sizes[1])
+    self.emit('used', self._heap_sizes[0])
+    self.emit('commit', self._heap_sizes[2])
+    self._gen0_sizes[:] = self._heap_sizes
+
+  def emit_gen0_sizes(self, text, allow_old_gen_sizes):
+    """
+    Emit the young gen, allocation, promotion and heap sizes of a young gen collection
+    """
+    end = self.parse_heap_sizes(text)
+    if end < 0:
+      return
+    text = text[end:]
+    heap_sizes = self._heap_sizes
+    gen0_sizes = self._gen0_sizes
+    self.emit('used0', heap_sizes[0])
+    self.emit('used0AfterGC', heap_sizes[1])
+    self.emit('alloc', heap_sizes[0] - gen0_sizes[1])
+    self.emit('commit0', heap_sizes[2])
+    gen0_sizes[:] = heap_sizes
+    # Promotion and occupancy are only available with a second heap size report on the line
+    end = self.parse_heap_sizes(text)
+    if end < 0:
+      return
+    text = text[end:]
+    if allow_old_gen_sizes and _heap_size_change_re.search(text):
+      # The second report is for the old gen and the third one for the overall heap
+      gen1_sizes = list(heap_sizes)
+      self.parse_heap_sizes(text)
+      promoted = heap_sizes[1] - heap_sizes[0] - (gen0_sizes[1] - gen0_sizes[0]) - (gen1_sizes[1] - gen1_sizes[0])
+    else:
+      promoted = heap_sizes[1] - heap_sizes[0] - (gen0_sizes[1] - gen0_sizes[0])
+    self.emit('promo', promoted)
+    self.emit('used', heap_sizes[0])
+    self.emit('usedAfterGC', heap_sizes[1])
+    self.emit('commit', heap_sizes[2])
+    self.emit('commit1', heap_sizes[2] - gen0_sizes[2])
+
+  def emit_old_gen_sizes(self, text, old_gen_re, old_gen_report_re):
+    """
+    Emit the old gen and heap occupancy of a collection of the old gen. The old gen report follows old_gen_re and the
+    heap report follows old_gen_report_re.
+    """
+    text, _ = _sub(old_gen_re, text)
+    self.parse_heap_sizes(text)
+    self.emit('used1', self._heap_sizes[0])
+    self.emit('used1AfterGC', self._heap_sizes[1])
+    text, _ = _sub(old_gen_report_re, text)
+    self.parse_heap_sizes(text)
+    self.emit('used', self._heap_sizes[0])
+    self.emit('usedAfterGC', self._heap_sizes[1])
+
+  def emit_young_gc_times(self, line):
+    """
+    Emit the young gen collection time and the total pause time, the first two times on the line
+    """
+    match = _gc_time_secs_re.search(line)
+    self.emit('gen0', _secs(match))
+    self.emit('gen0t', _secs(_gc_time_secs_re.search(line, match.end())))
+
+  def handle_g1_remark(self, line, match):
+    line = _g1_remark_sub_re.sub('GC remark ', line, 1)
+    fields = line.split()
+    self.emit('g1-pause-remark', fields[-2] if len(fields) > 1 else line)
+    refproc_match = _g1_remark_refproc_re.search(line)
+    fields = refproc_match.group(0).split() if refproc_match else []
+    self.emit('g1-pause-remark.ref-proc', fields[2] if len(fields) > 2 else 0.0)
+
+  def handle_cms_initial_mark(self, line, match):
+    self.emit('cmsIM', _secs(_gc_time_secs_re.search(match.group(0))))
+
+  def handle_cms_remark(self, line, match):
+    self.emit('cmsRM', _secs(_gc_time_secs_re.search(match.group(0))))
+
+  def handle_cms_verbose_mark(self, line, match):
+    self.emit('gen1t', _secs(_gc_time_secs_re.search(line)))
+
+  def handle_cms_concurrent_phase(self, line, match):
+    phase = _cms_concurrent_phase_re.search(line)
+    if '-mark:' in phase.group(0):
+      sub_metric = 'cmsCM'
+    elif '-sweep:' in phase.group(0):
+      sub_metric = 'cmsCS'
+    elif '-preclean:' in phase.group(0):
+      sub_metric = 'cmsCP'
+    else:
+      sub_metric = 'cmsCR'
+    text = line[phase.end():]
+    time_match = _cms_concurrent_time_re.search(text)
+    self.emit(sub_metric, awk_number(text[:time_match.start()] if time_match else ''))
+    # A full GC interrupting a concurrent phase is split across this line and the next one:
+    # 164.092: [Full GC 164.093: [CMS164.341: [CMS-concurrent-mark: 0.302/0.304 secs]
+    # : 26221K->24397K(43704K), 0.8347158 secs] 26285K->24397K(64952K), [CMS Perm : 2794K->2794K(16384K)], 0.8350998 secs]
+    if _cms_split_full_gc_re.search(line):
+      self._split_full_gc_timestamp = self.timestamp
+
+  def handle_split_full_gc(self, line):
+    """
+    Handle the continuation line of a full GC split by a CMS concurrent phase, with the timestamp of the first line
+    """
+    self.timestamp = self._split_full_gc_timestamp
+    self._split_full_gc_timestamp = None
+    line, substitutions = _sub(_cms_split_full_gc_time_re, line)
+    line, count = _sub(_secs_suffix_re, line)
+    if substitutions + count == 2:
+      self.emit('gen1t', awk_number(line))
+
+  def handle_young_and_old_gc(self, line, match):
+    self.emit_young_gc_times(line)
+    self.emit_gen0_sizes(line, True)
+    text, _ = _sub(_old_gen_time_re, line)
+    text, _ = _sub(_secs_suffix_re, text)
+    self.emit('gen1t', awk_number(text))
+    self.emit_old_gen_sizes(line, _old_gen_sizes_re, _heap_report_prefix_re)
+
+  def handle_full_gc(self, line, match):
+    text, _ = _sub(_full_gc_time_re, line)
+    text, _ = _sub(_secs_suffix_re, text)
+    self.emit('gen1t', awk_number(text))
+    self.emit_old_gen_sizes(line, _old_gen_sizes_re, _heap_report_prefix_re)
+
+  def handle_full_gc_young_gen(self, line, match):
+    time_match = _full_gc_young_time_re.search(line)
+    text, _ = _sub(_secs_suffix_re, line[time_match.end():])
+    self.emit('gen1t', awk_number(text))
+
+  def handle_young_gc(self, line, match):
+    self.emit_young_gc_times(line)
+    self.emit_gen0_sizes(line, False)
+    times_match = _times_user_re.search(line)
+    if times_match:
+      text = line[times_match.end():]
+      time_match = _gc_time_re.search(text)
+      self.emit('gen0usr', float(time_match.group(0)) if time_match else 0.0)
+      for sub_metric, regex in (('gen0sys', _times_sys_re), ('gen0real', _times_real_re)):
+        times_match = regex.search(text)
+        if times_match:
+          text = text[times_match.end():]
+          time_match = _gc_time_re.search(text)
+          self.emit(sub_metric, float(time_match.group(0)) if time_match else 0.0)
+
+  def handle_parallel_full_gc(self, line, match):
+    self.emit('gen1t', _secs(_gc_time_secs_re.search(line)))
+    self.emit_old_gen_sizes(line, _par_old_gen_sizes_re, _heap_size_status_prefix_re)
+
+  def handle_parallel_young_gc(self, line, match):
+    self.emit('gen0t', _secs(_gc_time_secs_re.search(line)))
+    self.emit_gen0_sizes(line, False)
+
+  def handle_generation_gc(self, line, match):
+    """
+    [GC[0: 511K->228K(1984K)], 0.0087278 secs] or [GC[1: 308K->230K(1984K)], 0.0212333 secs]
+    """
+    text, _ = _sub(_last_secs_re, line)
+    text, _ = _sub(_secs_suffix_re, text)
+    if '[1: ' in line:
+      self.emit('gen1t', awk_number(text))
+    elif '[0: ' in line:
+      self.emit('gen0', awk_number(text))
+      self.emit_gen0_sizes(line, False)
+
+  def emit_g1_pause(self, line, pause_type):
+    """
+    Emit the pause time and the details of a G1 young or mixed pause. Details missing from the pause are reported as 0.
+    """
+    prefix = 'g1-pause-' + pause_type
+    self.emit(prefix, _secs(_gc_time_secs_re.search(line)))
+    self.emit(prefix + '.parallel', _groups(_g1_parallel_time_re.search(line))[0])
+    self.emit(prefix + '.parallel.gcworkers', _groups(_g1_gc_workers_re.search(line))[0])
+    for suffix, regex in _g1_parallel_stats:
+      stats = _groups(regex.search(line))
+      self.emit(prefix + '.' + suffix + '.avg', stats[0])
+      self.emit(prefix + '.' + suffix + '.max', stats[1])
+    for suffix, regex in _g1_phase_times:
+      self.emit(prefix + '.' + suffix, _groups(regex.search(line))[0])
+    eden = _groups(_g1_eden_re.search(line))
+    self.emit('g1-eden-occupancy-before-gc', eden[0])
+    self.emit('g1-eden-capacity-before-gc', eden[1])
+    self.emit('g1-eden-occupancy-after-gc', eden[2])
+    self.emit('g1-eden-capacity-after-gc', eden[3])
+    survivors = _groups(_g1_survivors_re.search(line))
+    self.emit('g1-survivor-before-gc', survivors[0])
+    self.emit('g1-survivor-after-gc', survivors[1])
+    heap = _groups(_g1_heap_re.search(line))
+    self.emit('g1-heap-occupancy-before-gc', heap[0])
+    self.emit('g1-heap-capacity-before-gc', heap[1])
+    self.emit('g1-heap-occupancy-after-gc', heap[2])
+    self.emit('g1-heap-capacity-after-gc', heap[3])
+    cpu_times = _groups(_g1_cpu_times_re.search(line))
+    self.emit('g1-' + pause_type + '-cpu.usr', cpu_times[0])
+    self.emit('g1-' + pause_type + '-cpu.sys', cpu_times[1])
+    self.emit('g1-' + pause_type + '-cpu.real', cpu_times[2])
+
+  def handle_g1_young_pause(self, line, match):
+    self.emit_g1_pause(line, 'young')
+
+  def handle_g1_mixed_pause(self, line, match):
+    self.emit_g1_pause(line, 'mixed')
+
+  def handle_g1_cleanup(self, line, match):
+    self.emit('g1-pause-cleanup', _secs(_gc_time_secs_re.search(line)))
+
+  def handle_verbose_gc(self, line, match):
+    self.emit('gen0', _secs(_gc_time_secs_re.search(line)))
+    self.emit_heap_sizes(line)
+
+  def handle_verbose_full_gc(self, line, match):
+    self.emit('gen1t', _secs(_gc_time_secs_re.search(line)))
+    self.emit_heap_sizes(line)
+
+  def handle_safepoint(self, line, match):
+    self.emit('safept', float(match.group(1)))
+
+  def handle_application_time(self, line, match):
+    self.emit('apptime', float(match.group(1)))
+
+
+def parse_gc_log(infile, sub_metrics, ts_start=None, ts_end=None):
+  """
+  Parse a GC log file
+
+  :return: dict of sub-metric name to a tuple of the lists of timestamps and values
+  """
+  return GCLogParser(sub_metrics, ts_start, ts_end).parse(infile)
+
+
+def _parse_gc_log_args(args):
+  return parse_gc_log(*args)
+
+
+def parse_gc_logs(infile_list, sub_metrics, ts_start=None, ts_end=None, workers=None):
+  """
+  Parse GC log files, in a pool of worker processes when there are several of them, and merge their columns in the
+  order of infile_list
+
+  :param workers: number of worker processes. Defaults to the number of cpus, files are parsed by the calling process
+    if it is 1
+  :return: dict of sub-metric name to a tuple of the lists of timestamps and values
+  """
+  args = [(infile, sub_metrics, ts_start, ts_end) for infile in infile_list]
+  workers = min(workers or multiprocessing.cpu_count(), len(infile_list))
+  # Daemonic processes, like the workers of the process executor, cannot have children
+  if workers > 1 and not multiprocessing.current_process().daemon:
+    pool = multiprocessing.Pool(processes=workers)
+    try:
+      file_columns = pool.map(_parse_gc_log_args, args)
+      pool.close()
+      pool.join()
+    finally:
+      pool.terminate()
+  else:
+    file_columns = [_parse_gc_log_args(file_args) for file_args in args]
+  columns = {}
+  for infile_columns in file_columns:
+    for sub_metric, (timestamps, values) in infile_columns.items():
+      column = columns.setdefault(sub_metric, ([], []))
+      column[0].extend(timestamps)
+      column[1].extend(values)
+  return columns
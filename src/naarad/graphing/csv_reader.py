@@ -0,0 +1,92 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import logging
+import os
+import warnings
+import numpy
+import naarad.naarad_constants as CONSTANTS
+from naarad.timestamp_parser import LRUCache
+
+logger = logging.getLogger('naarad.graphing.csv_reader')
+
+# parsed csv files by path, along with the inode, mtime and size of the file they were parsed from
+_columns_cache = LRUCache(CONSTANTS.CSV_COLUMNS_CACHE_SIZE)
+
+
+def parse_numeric_csv(csv_file):
+  """
+  Parse a csv file of numbers at once. The file is read in a single buffer, its line ends are turned into commas in
+  place and all its values are parsed together by numpy, so the file content is never copied.
+
+  :param string csv_file: path of the csv file
+  :return: 2-d numpy float64 array with a row per line, or None if the file has something else than numbers or lines
+  with different numbers of columns
+  """
+  with open(csv_file, 'rb') as FH:
+    text = bytearray(os.fstat(FH.fileno()).st_size)
+    FH.readinto(text)
+  # blank lines around the values would be read as empty values
+  begin, end = 0, len(text)
+  while end and chr(text[end - 1]).isspace():
+    end -= 1
+  if not end:
+    return numpy.zeros((0, 2))
+  while chr(text[begin]).isspace():
+    begin += 1
+  first_line_end = text.find('\n', begin, end)
+  column_count = text.count(',', begin, first_line_end if first_line_end >= 0 else end) + 1
+  row_count = 1
+  chars = numpy.frombuffer(text, dtype=numpy.uint8)
+  for start in range(begin, end, CONSTANTS.CSV_PARSE_CHUNK_SIZE):
+    chunk = chars[start:min(start + CONSTANTS.CSV_PARSE_CHUNK_SIZE, end)]
+    line_ends = chunk == ord('\n')
+    row_count += numpy.count_nonzero(line_ends)
+    chunk[line_ends] = ord(',')
+  with warnings.catch_warnings():
+    # numpy warns and stops at the first field which is not a number
+    warnings.simplefilter('ignore')
+    try:
+      values = numpy.fromstring(buffer(text, begin, end - begin), dtype=numpy.float64, sep=',')
+    except ValueError:
+      return None
+  if len(values) != row_count * column_count:
+    return None
+  return values.reshape(row_count, column_count)
+
+
+def read_columns(csv_file):
+  """
+  Read the columns of a csv file of numbers. Files are parsed once with parse_numeric_csv() and the results of the
+  most recently read files are cached, so a series plotted in several charts is only parsed once. A file is parsed
+  again if it changes.
+
+  :param string csv_file: path of the csv file
+  :return: 2-d numpy float64 array with a column per csv column, or None if the file is not a csv file of numbers
+  """
+  stat = os.stat(csv_file)
+  version = (stat.st_ino, stat.st_mtime, stat.st_size)
+  cached_version, columns = _columns_cache.get(csv_file) or (None, None)
+  if cached_version == version:
+    return columns
+  rows = parse_numeric_csv(csv_file)
+  columns = rows.T if rows is not None else None
+  if columns is not None:
+    # cached arrays are shared by all the readers of the file
+    columns.flags.writeable = False
+  _columns_cache.put(csv_file, (version, columns))
+  return columns
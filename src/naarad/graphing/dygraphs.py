@@ -18,6 +18,7 @@ limitations under the License.
 import os
 import random
 import logging
+import naarad.downsampling
 
 logger = logging.getLogger('naarad.graphing.dygraphs')
 
@@ -62,7 +63,11 @@ def graph_csv(output_directory, resource_path, csv_file, plot_title, output_file
 def graph_data(list_of_plots, output_directory, resource_path, output_filename):
   if len(list_of_plots) > 0:
     plot = list_of_plots[0]
-    success, div_file = graph_csv(output_directory=output_directory, resource_path=resource_path, csv_file=plot.input_csv, plot_title=plot.graph_title,
+    # the browser loads the downsampled companion of long series instead of every point
+    csv_file = naarad.downsampling.get_downsampled_csv(plot.input_csv)
+    if not os.path.exists(csv_file):
+      csv_file = plot.input_csv
+    success, div_file = graph_csv(output_directory=output_directory, resource_path=resource_path, csv_file=csv_file, plot_title=plot.graph_title,
                                   output_filename=output_filename, y_label=plot.y_label, precision=None, graph_height=plot.graph_height,
                                   graph_width=plot.graph_width)
     if len(list_of_plots) > 1:
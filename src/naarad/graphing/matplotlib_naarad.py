@@ -15,19 +15,31 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import multiprocessing
 import numpy
 import os
+import threading
 import matplotlib as mpl
 mpl.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import matplotlib.dates as mdates
-from mpl_toolkits.axes_grid1 import host_subplot
-import mpl_toolkits.axisartist as AA
 import logging
 import naarad.naarad_constants as CONSTANTS
+from naarad.graphing.csv_reader import read_columns
+import naarad.downsampling
+import naarad.series_store
 
 logger = logging.getLogger('naarad.graphing.matplotlib')
 
+# Charts are drawn with the object oriented api on a figure reused by each thread, pyplot is not thread-safe
+_thread_state = threading.local()
+# Pool of renderer processes started by start_render_pool(), along with the id of the process which started it and the
+# charts submitted to it as (div file, async result)
+_render_pool = None
+_render_pool_pid = None
+_render_results = []
+
 
 def convert_to_mdate(date_str):
   mdate = mdates.epoch2num(int(date_str) / 1000)
@@ -71,26 +83,108 @@ def curate_plot_list(plots):
   return plots
 
 
-def highlight_region(plt, start_x, end_x):
+def highlight_region(axis, start_x, end_x):
   """
   Highlight a region on the chart between the specified start and end x-co-ordinates.
-  param pyplot plt: matplotlibk pyplot which contains the charts to be highlighted
-  param string start_x : epoch time millis
-  param string end_x : epoch time millis
+  param axis: matplotlib axes of the chart to be highlighted
+  param int start_x : epoch time millis
+  param int end_x : epoch time millis
   """
   start_x = convert_to_mdate(start_x)
   end_x = convert_to_mdate(end_x)
-  plt.axvspan(start_x, end_x, color=CONSTANTS.HIGHLIGHT_COLOR, alpha=CONSTANTS.HIGHLIGHT_ALPHA)
+  axis.axvspan(start_x, end_x, color=CONSTANTS.HIGHLIGHT_COLOR, alpha=CONSTANTS.HIGHLIGHT_ALPHA)
+
+
+def get_figure():
+  """
+  Return the figure of the calling thread, created once and cleared after each chart instead of creating a figure per
+  chart
+  """
+  fig = getattr(_thread_state, 'figure', None)
+  if fig is None:
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    _thread_state.figure = fig
+  fig.clf()
+  return fig
+
+
+def start_render_pool(workers=None):
+  """
+  Start a pool of renderer processes. Until wait_for_render_pool() is called, the charts requested from the process
+  which started the pool are rendered by the pool and graph_data() and graph_data_on_the_same_graph() return without
+  waiting for them. Charts requested from other processes are rendered by the calling thread.
+
+  :param workers: number of renderer processes. Defaults to the number of cpus
+  """
+  global _render_pool, _render_pool_pid
+  _render_pool = multiprocessing.Pool(processes=workers)
+  _render_pool_pid = os.getpid()
+
+
+def wait_for_render_pool():
+  """
+  Wait for all the charts submitted to the render pool and stop it
+
+  :return: set of the div files of the charts which could not be rendered
+  """
+  global _render_pool, _render_pool_pid, _render_results
+  failed_div_files = set()
+  if _render_pool is None:
+    return failed_div_files
+  try:
+    _render_pool.close()
+    for div_file, result in _render_results:
+      try:
+        result.get()
+      except Exception:
+        logger.exception('Failed to render chart: ' + div_file)
+        failed_div_files.add(div_file)
+    _render_pool.join()
+  finally:
+    stop_render_pool()
+  return failed_div_files
+
+
+def stop_render_pool():
+  """
+  Stop the render pool without waiting for the charts submitted to it, e.g. when the analysis failed
+  """
+  global _render_pool, _render_pool_pid, _render_results
+  if _render_pool is not None:
+    _render_pool.terminate()
+  _render_pool = None
+  _render_pool_pid = None
+  _render_results = []
+
+
+def render(render_function, plots, output_directory, resource_path, output_filename):
+  """
+  Render a chart in the render pool if this process started one, in the calling thread otherwise
+
+  :return: tuple of True and the path of the div file of the chart
+  """
+  div_file = os.path.join(output_directory, output_filename + '.div')
+  if _render_pool is not None and _render_pool_pid == os.getpid():
+    _render_results.append((div_file, _render_pool.apply_async(render_function, (plots, output_directory, resource_path, output_filename))))
+  else:
+    render_function(plots, output_directory, resource_path, output_filename)
+  return True, div_file
 
 
 def graph_data(list_of_plots, output_directory, resource_path, output_filename):
   plots = curate_plot_list(list_of_plots)
-  plot_count = len(plots)
-  if plot_count == 0:
+  if len(plots) == 0:
     return False, None
-  graph_height, graph_width, graph_title = get_graph_metadata(list_of_plots)
+  return render(render_graph_data, plots, output_directory, resource_path, output_filename)
+
+
+def render_graph_data(plots, output_directory, resource_path, output_filename):
+  plot_count = len(plots)
+  graph_height, graph_width, graph_title = get_graph_metadata(plots)
   current_plot_count = 0
-  fig, axis = plt.subplots()
+  fig = get_figure()
+  axis = fig.add_subplot(111)
   fig.set_size_inches(graph_width, graph_height)
   if plot_count < 2:
     fig.subplots_adjust(left=CONSTANTS.SUBPLOT_LEFT_OFFSET, bottom=CONSTANTS.SUBPLOT_BOTTOM_OFFSET, right=CONSTANTS.SUBPLOT_RIGHT_OFFSET)
@@ -101,7 +195,8 @@ def graph_data(list_of_plots, output_directory, resource_path, output_filename):
   for plot in plots:
     current_plot_count += 1
     logger.info('Processing: ' + plot.input_csv + ' [ ' + output_filename + ' ]')
-    timestamp, yval = numpy.loadtxt(plot.input_csv, unpack=True, delimiter=',', converters={0: convert_to_mdate})
+    timestamp, yval = naarad.downsampling.downsample(*naarad.series_store.read_series(plot.input_csv), points=plot.plot_points)
+    timestamp = mdates.epoch2num(timestamp // 1000)
     maximum_yvalue = numpy.amax(yval) * (1.0 + CONSTANTS.ZOOM_FACTOR * current_plot_count)
     minimum_yvalue = numpy.amin(yval) * (1.0 - CONSTANTS.ZOOM_FACTOR * current_plot_count)
 
@@ -132,7 +227,7 @@ def graph_data(list_of_plots, output_directory, resource_path, output_filename):
       x_tick.set_fontsize(CONSTANTS.X_TICKS_FONTSIZE)
     if plot.highlight_regions is not None:
       for region in plot.highlight_regions:
-        highlight_region(plt, str(region.start_timestamp), str(region.end_timestamp))
+        highlight_region(current_axis, region.start_timestamp, region.end_timestamp)
   axis.yaxis.grid(True)
   axis.xaxis.grid(True)
   axis.set_title(graph_title)
@@ -141,29 +236,33 @@ def graph_data(list_of_plots, output_directory, resource_path, output_filename):
   axis.xaxis.set_major_formatter(x_date_format)
   plot_file_name = os.path.join(output_directory, output_filename + ".png")
   fig.savefig(plot_file_name)
-  plt.close()
+  fig.clf()
   # Create html fragment to be used for creation of the report
   with open(os.path.join(output_directory, output_filename + '.div'), 'w') as div_file:
     div_file.write('<a name="' + os.path.basename(plot_file_name).replace(".png", "").replace(".diff", "") + '"></a><div class="col-md-12"><img src="' +
                    resource_path + '/' + os.path.basename(plot_file_name) + '" id="' + os.path.basename(plot_file_name) +
                    '" width="100%" height="auto"/></div><div class="col-md-12"><p align="center"><strong>' + os.path.basename(plot_file_name) +
                    '</strong></p></div><hr />')
-  return True, os.path.join(output_directory, output_filename + '.div')
 
 
 def graph_data_on_the_same_graph(list_of_plots, output_directory, resource_path, output_filename):
   """
   graph_data_on_the_same_graph: put a list of plots on the same graph: currently it supports CDF
   """
+  plots = curate_plot_list(list_of_plots)
+  if len(plots) == 0:
+    return False, None
+  return render(render_graph_data_on_the_same_graph, plots, output_directory, resource_path, output_filename)
+
+
+def render_graph_data_on_the_same_graph(plots, output_directory, resource_path, output_filename):
   maximum_yvalue = -float('inf')
   minimum_yvalue = float('inf')
-  plots = curate_plot_list(list_of_plots)
   plot_count = len(plots)
-  if plot_count == 0:
-    return False, None
   graph_height, graph_width, graph_title = get_graph_metadata(plots)
   current_plot_count = 0
-  fig, axis = plt.subplots()
+  fig = get_figure()
+  axis = fig.add_subplot(111)
   fig.set_size_inches(graph_width, graph_height)
   if plot_count < 2:
     fig.subplots_adjust(left=CONSTANTS.SUBPLOT_LEFT_OFFSET, bottom=CONSTANTS.SUBPLOT_BOTTOM_OFFSET, right=CONSTANTS.SUBPLOT_RIGHT_OFFSET)
@@ -174,7 +273,11 @@ def graph_data_on_the_same_graph(list_of_plots, output_directory, resource_path,
   for plot in plots:
     current_plot_count += 1
     logger.info('Processing: ' + plot.input_csv + ' [ ' + output_filename + ' ]')
-    xval, yval = numpy.loadtxt(plot.input_csv, unpack=True, delimiter=',')
+    columns = read_columns(plot.input_csv)
+    if columns is not None:
+      xval, yval = columns[0], columns[1]
+    else:
+      xval, yval = numpy.loadtxt(plot.input_csv, unpack=True, delimiter=',')
     axis.plot(xval, yval, linestyle='-', marker=None, color=get_current_color(current_plot_count), label=plot.plot_label)
     axis.legend()
     maximum_yvalue = max(maximum_yvalue, numpy.amax(yval) * (1.0 + CONSTANTS.ZOOM_FACTOR * current_plot_count))
@@ -189,10 +292,9 @@ def graph_data_on_the_same_graph(list_of_plots, output_directory, resource_path,
   axis.set_title(graph_title)
   plot_file_name = os.path.join(output_directory, output_filename + ".png")
   fig.savefig(plot_file_name)
-  plt.close()
+  fig.clf()
   # Create html fragment to be used for creation of the report
   with open(os.path.join(output_directory, output_filename + '.div'), 'w') as div_file:
     div_file.write('<a name="' + os.path.basename(plot_file_name).replace(".png", "").replace(".diff", "") + '"></a><div class="col-md-12"><img src="' +
                    resource_path + '/' + os.path.basename(plot_file_name) + '" id="' + os.path.basename(plot_file_name) +
                    '" width="100%" height="auto"/></div><div class="col-md-12"><p align=center>' + os.path.basename(plot_file_name) + '<br/></p></div>')
-  return True, os.path.join(output_directory, output_filename + '.div')
@@ -14,12 +14,13 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+import naarad.naarad_constants as CONSTANTS
 
 
 class PlotData:
   """Class to hold details of the metrics to be plotted"""
   def __init__(self, input_csv, csv_column, series_name, y_label, precision, graph_height, graph_width, graph_type, x_label=None, plot_label=None,
-               highlight_regions=None):
+               highlight_regions=None, plot_points=CONSTANTS.DEFAULT_PLOT_POINTS):
     self.input_csv = input_csv
     self.csv_column = csv_column
     self.graph_title = series_name
@@ -37,4 +38,6 @@ class PlotData:
     self.plot_label = plot_label
     self.x_label = x_label
     self.highlight_regions = highlight_regions
+    # maximum number of points drawn for a time series, longer series are downsampled. None to draw every point
+    self.plot_points = plot_points
     return None
@@ -19,6 +19,8 @@ import datetime
 import pygal
 import os
 import logging
+import naarad.downsampling
+import naarad.series_store
 
 logger = logging.getLogger('naarad.graphing.pygal_naarad')
 
@@ -45,14 +47,8 @@ def curate_plot_list(plots):
 def graph_data(list_of_plots, output_directory, resource_path, output_filename):
   date_plot = pygal.DateY(x_label_rotation=20, height=500, width=1200, legend_at_bottom=True, style=pygal.style.BlueStyle)
   for plot in list_of_plots:
-    plot_data = []
-    with open(plot.input_csv, 'r') as csv_data:
-      for line in csv_data:
-        line_data = line.strip('\n').split(',')
-        if '.' in line_data[0]:
-          plot_data.append((datetime.datetime.strptime(line_data[0], '%Y-%m-%d %H:%M:%S.%f'), float(line_data[1])))
-        else:
-          plot_data.append((datetime.datetime.strptime(line_data[0], '%Y-%m-%d %H:%M:%S'), float(line_data[1])))
+    timestamps, values = naarad.downsampling.downsample(*naarad.series_store.read_series(plot.input_csv), points=plot.plot_points)
+    plot_data = [(datetime.datetime.utcfromtimestamp(ts / 1000.0), value) for ts, value in zip(timestamps.tolist(), values.tolist())]
     date_plot.add(plot.graph_title, plot_data)
     date_plot.render_to_file(os.path.join(output_directory, output_filename + '.svg'))
     with open(os.path.join(output_directory, output_filename + '.div'), 'w') as div_file:
@@ -15,25 +15,38 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import httplib
+import json
 import os
+import Queue
 import sys
 import re
+import socket
+import threading
+import time
+import urllib
 import urllib2
+import urlparse
 import logging
 from HTMLParser import HTMLParser
 
+import naarad.compression
+import naarad.download_cache
+import naarad.naarad_constants as CONSTANTS
 import naarad.utils
 
 logger = logging.getLogger('naarad.httpdownload')
+# cache of the downloads of this process, see set_download_cache()
+download_cache = None
 
 
-def handle_single_url(url, outdir, outfile=None):
+def get_output_file(url, outdir, outfile=None):
   """
-  Base function which takes a single url, download it to outdir/outfile
+  Validate a url to download and return the local file to download it to
   :param str url: a full/absolute url, e.g. http://www.cnn.com/log.zip
   :param str outdir: the absolute local directory. e.g. /home/user1/tmp/
   :param str outfile: (optional) filename stored in local directory. If outfile is not given, extract the filename from url
-  :return: the local full path name of downloaded url
+  :return: the local full path name for the url, None if the parameters are incorrect
   """
   if not url or type(url) != str \
      or not outdir or type(outdir) != str:
@@ -52,19 +65,445 @@ def handle_single_url(url, outdir, outfile=None):
   output_file = os.path.join(outdir, outfile)
   if os.path.exists(output_file):
     logger.warn("the %s already exists!" % outfile)
+  return output_file
+
 
-  with open(output_file, "w") as fh:
+def handle_single_url(url, outdir, outfile=None):
+  """
+  Base function which takes a single url, download it to outdir/outfile
+  :param str url: a full/absolute url, e.g. http://www.cnn.com/log.zip
+  :param str outdir: the absolute local directory. e.g. /home/user1/tmp/
+  :param str outfile: (optional) filename stored in local directory. If outfile is not given, extract the filename from url
+  :return: the local full path name of downloaded url
+  """
+  output_file = get_output_file(url, outdir, outfile)
+  if not output_file:
+    return
+  return HTTPDownloader(workers=1).download([(url, output_file)])[0]
+
+
+def set_download_cache(cache_directory, max_size=CONSTANTS.DOWNLOAD_CACHE_MAX_SIZE):
+  """
+  Cache the downloads of this process in a directory, see naarad.download_cache.DownloadCache
+  :param str cache_directory: the cache directory, None to disable the cache
+  :param int max_size: maximum size of the cache in bytes
+  """
+  global download_cache
+  download_cache = naarad.download_cache.DownloadCache(cache_directory, max_size) if cache_directory else None
+
+
+def get_range_validator(response):
+  """
+  :return: the ETag or Last-Modified header of a response which can be sent in If-Range, None if there is none
+  """
+  etag = response.getheader('ETag')
+  if etag and not etag.startswith('W/'):
+    return etag
+  return response.getheader('Last-Modified')
+
+
+class PartialDownload(object):
+  """
+  Download of a url in progress to a .part file. The validator of the response is kept next to the .part file so that
+  an interrupted download is only resumed if the url did not change since.
+  """
+  def __init__(self, url, partial_file, gunzip=False):
+    self.url = url
+    self.partial_file = partial_file
+    self.metadata_file = partial_file + CONSTANTS.PARTIAL_DOWNLOAD_METADATA_SUFFIX
+    self.gunzip = gunzip
+    self.validator = None
     try:
-      response = urllib2.urlopen(url)
-      fh.write(response.read())
-    except urllib2.HTTPError:
-      logger.error("got HTTPError when retrieving %s" % url)
-      return
-    except urllib2.URLError:
-      logger.error("got URLError when retrieving %s" % url)
-      return
+      with open(self.metadata_file) as FH:
+        metadata = json.load(FH)
+      if metadata['url'] == url and os.path.exists(partial_file):
+        self.validator = str(metadata['validator'])
+    except (IOError, ValueError, KeyError):
+      pass
+
+  def get_offset(self):
+    """
+    :return: number of bytes already downloaded which can be resumed
+    """
+    if not self.validator or not os.path.exists(self.partial_file):
+      return 0
+    return os.path.getsize(self.partial_file)
+
+  def open(self, offset):
+    return open(self.partial_file, 'ab' if offset else 'wb')
+
+  def set_validator(self, validator):
+    self.validator = validator
+    if validator:
+      with open(self.metadata_file, 'w') as FH:
+        json.dump({'url': self.url, 'validator': validator}, FH)
+    elif os.path.exists(self.metadata_file):
+      os.remove(self.metadata_file)
+
+  def finish(self, output_file):
+    os.rename(self.partial_file, output_file)
+    self.set_validator(None)
+
+  def clear(self):
+    self.validator = None
+    for file_name in (self.partial_file, self.metadata_file):
+      if os.path.exists(file_name):
+        os.remove(file_name)
+
+
+class DownloadStats(object):
+  """
+  Throughput of the downloads of a run of HTTPDownloader
+  """
+  def __init__(self):
+    self.files = 0
+    self.failures = 0
+    self.retries = 0
+    self.cache_hits = 0
+    self.bytes = 0
+    self.start_time = time.time()
+    self.end_time = None
+    self.lock = threading.Lock()
+
+  def add(self, size=0, failed=False):
+    with self.lock:
+      if failed:
+        self.failures += 1
+      else:
+        self.files += 1
+        self.bytes += size
+
+  def add_cache_hit(self):
+    with self.lock:
+      self.cache_hits += 1
+
+  def add_retry(self):
+    with self.lock:
+      self.retries += 1
+
+  def stop(self):
+    self.end_time = time.time()
+
+  def get_summary(self):
+    elapsed = max((self.end_time or time.time()) - self.start_time, 1e-6)
+    return ('Downloaded %d files (%d from cache, %d failed, %d retries), %.2f MB in %.2f s, %.2f MB/s' %
+            (self.files, self.cache_hits, self.failures, self.retries, self.bytes / 1048576.0, elapsed, self.bytes / 1048576.0 / elapsed))
+
+
+class HTTPDownloader(object):
+  """
+  Download urls with a bounded pool of worker threads. Each worker keeps one keep-alive connection per host, so
+  downloading many files from a report server reuses a handful of connections. Responses are streamed to disk in
+  chunks and gzip Content-Encoding is decoded on the fly. Connection errors and 5xx responses are retried with an
+  exponential backoff. The throughput of each run is logged and kept in stats. With a download cache, urls are
+  requested conditionally and their cached copy is used when they did not change.
+
+  Downloads are written to a .part file which is renamed once complete. Interrupted downloads are resumed with range
+  requests, by the retries of a run or by the next run, and large files are downloaded in parallel segments from
+  servers which support ranges.
+  """
 
-  return output_file
+  def __init__(self, workers=CONSTANTS.HTTP_DOWNLOAD_WORKERS, retries=CONSTANTS.HTTP_DOWNLOAD_RETRIES, chunk_size=CONSTANTS.HTTP_DOWNLOAD_CHUNK_SIZE,
+               timeout=CONSTANTS.HTTP_DOWNLOAD_TIMEOUT, cache=None, segments=CONSTANTS.HTTP_DOWNLOAD_SEGMENTS,
+               segment_min_size=CONSTANTS.HTTP_SEGMENTED_DOWNLOAD_MIN_SIZE):
+    self.workers = workers
+    self.segments = segments
+    self.segment_min_size = segment_min_size
+    self.cache = cache or download_cache
+    self.retries = retries
+    self.chunk_size = chunk_size
+    self.timeout = timeout
+    self.stats = None
+    # proxies of the http_proxy, https_proxy and no_proxy environment variables, as urllib2 would use them
+    self.proxies = urllib.getproxies()
+
+  def download(self, downloads):
+    """
+    Download urls to local files. The local files are created even if their url cannot be downloaded.
+    :param list downloads: list of (url, local file) pairs
+    :return: list of the local files of the downloads, None for the urls which could not be downloaded
+    """
+    self.stats = DownloadStats()
+    results = [None] * len(downloads)
+    download_queue = Queue.Queue()
+    for index, (url, output_file) in enumerate(downloads):
+      download_queue.put((index, url, output_file))
+    workers = [threading.Thread(target=self._work, args=(download_queue, results)) for _ in range(min(self.workers, len(downloads)))]
+    for worker in workers:
+      worker.daemon = True
+      worker.start()
+    for worker in workers:
+      worker.join()
+    self.stats.stop()
+    if downloads:
+      logger.info(self.stats.get_summary())
+    return results
+
+  def _work(self, download_queue, results):
+    # connections of this worker by (scheme, host, port)
+    connections = {}
+    try:
+      while True:
+        try:
+          index, url, output_file = download_queue.get_nowait()
+        except Queue.Empty:
+          return
+        try:
+          results[index] = self._download(connections, url, output_file)
+        except Exception:
+          logger.exception('Failed to download %s', url)
+          self.stats.add(failed=True)
+    finally:
+      for connection in connections.values():
+        connection.close()
+
+  def _download(self, connections, url, output_file):
+    partial_file = output_file + CONSTANTS.PARTIAL_DOWNLOAD_SUFFIX
+    download = PartialDownload(url, partial_file)
+    status, size = self._get(connections, download)
+    if status == 404 and url.endswith('.csv'):
+      # reports written with compressed resources only have the .gz variant of their csv files
+      download = PartialDownload(url + CONSTANTS.GZIP_SUFFIX, partial_file, gunzip=True)
+      status, size = self._get(connections, download)
+    if status != 200:
+      logger.error("got HTTP status %s when retrieving %s" % (status, url))
+      self.stats.add(failed=True)
+      if not os.path.exists(output_file):
+        # urls which cannot be downloaded have always left an empty output file
+        open(output_file, 'w').close()
+      return
+    download.finish(output_file)
+    self.stats.add(size)
+    return output_file
+
+  def _get(self, connections, download):
+    """
+    GET a url into a partial download file, retrying connection errors and 5xx responses. Retries resume the download
+    where it stopped when the server supports range requests.
+    :return: tuple of the last HTTP status, None if the server could not be reached, and the number of bytes received
+    """
+    status = None
+    for attempt in range(self.retries + 1):
+      if attempt > 0:
+        self.stats.add_retry()
+        time.sleep(CONSTANTS.HTTP_DOWNLOAD_BACKOFF * 2 ** (attempt - 1))
+      try:
+        status, size = self._request(connections, download)
+      except (socket.error, httplib.HTTPException) as e:
+        # also raised when the server closed an idle keep-alive connection
+        logger.warning('Error when retrieving %s (attempt %d): %s', download.url, attempt + 1, e)
+        self._close(connections, urlparse.urlsplit(download.url))
+        continue
+      if status < 500:
+        if status != 200:
+          download.clear()
+        return status, size
+      logger.warning('got HTTP status %d when retrieving %s (attempt %d)', status, download.url, attempt + 1)
+    # the partial download is kept to be resumed by the next run
+    return status, 0
+
+  def _request(self, connections, download):
+    url = download.url
+    offset = download.get_offset()
+    for request in range(CONSTANTS.HTTP_DOWNLOAD_MAX_REDIRECTS + 1):
+      parts = urlparse.urlsplit(url)
+      if offset:
+        # ranges are offsets in the encoded content, the rest of a download is requested without compression
+        headers = {'Range': 'bytes=%d-' % offset, 'If-Range': download.validator}
+      else:
+        headers = {'Accept-Encoding': 'gzip'}
+        if self.cache:
+          headers.update(self.cache.get_validators(url))
+      response = self._send(connections, parts, headers)
+      if response.status == 304 and self.cache and not offset:
+        response.read()
+        self._close_if_needed(connections, parts, response)
+        with download.open(0) as FH:
+          if self.cache.copy(url, FH) is None:
+            # evicted since the request, it is requested again without validators
+            raise httplib.HTTPException('%s is no longer cached' % url)
+        self.stats.add_cache_hit()
+        return 200, 0
+      if response.status in (301, 302, 303, 307, 308) and response.getheader('Location'):
+        # the body is read so that the connection can be reused
+        response.read()
+        self._close_if_needed(connections, parts, response)
+        url = urlparse.urljoin(url, response.getheader('Location'))
+        continue
+      if response.status == 416 and offset:
+        # the partial download is already complete or does not match the url any more
+        response.read()
+        self._close_if_needed(connections, parts, response)
+        download.clear()
+        offset = 0
+        continue
+      if response.status not in (200, 206):
+        response.read()
+        self._close_if_needed(connections, parts, response)
+        return response.status, 0
+      if response.status == 200:
+        # the server ignored the range because it does not support ranges or because the url changed
+        offset = 0
+      decoder = None
+      encoded = response.getheader('Content-Encoding') == 'gzip' and not url.endswith(CONSTANTS.GZIP_SUFFIX)
+      # .gz files may be served with a gzip Content-Encoding: their content is the file itself
+      if download.gunzip or encoded:
+        decoder = naarad.compression.GunzipStream()
+      download.set_validator(None if decoder else get_range_validator(response))
+      length = int(response.getheader('Content-Length') or 0)
+      if (not offset and download.validator and self.segments > 1 and length >= self.segment_min_size and
+              response.getheader('Accept-Ranges') == 'bytes'):
+        size = self._download_segments(connections, parts, response, url, download, length)
+      else:
+        size = 0
+        with download.open(offset) as FH:
+          while True:
+            chunk = response.read(self.chunk_size)
+            if not chunk:
+              break
+            size += len(chunk)
+            FH.write(decoder.decompress(chunk) if decoder else chunk)
+          if decoder:
+            FH.write(decoder.flush())
+        self._close_if_needed(connections, parts, response)
+        if length and size < length:
+          # httplib does not report responses which are cut short when they are read in chunks
+          raise httplib.IncompleteRead('', length - size)
+      if self.cache:
+        self.cache.store(url, download.partial_file, response.getheader('ETag'), response.getheader('Last-Modified'))
+      return 200, size
+    logger.error('Too many redirects when retrieving %s', url)
+    return response.status, 0
+
+  def _download_segments(self, connections, parts, response, url, download, length):
+    """
+    Download a large file in segments over parallel connections. The first segment is read from the response, the
+    others are requested with ranges.
+    :return: number of bytes received
+    """
+    segment_size = -(-length // self.segments)
+    with download.open(0) as FH:
+      FH.truncate(length)
+    errors = []
+    threads = [threading.Thread(target=self._download_segment, args=(url, download, start, min(start + segment_size, length) - 1, errors))
+               for start in range(segment_size, length, segment_size)]
+    for thread in threads:
+      thread.daemon = True
+      thread.start()
+    try:
+      with open(download.partial_file, 'r+b') as FH:
+        remaining = segment_size
+        while remaining > 0:
+          chunk = response.read(min(self.chunk_size, remaining))
+          if not chunk:
+            raise httplib.IncompleteRead('', remaining)
+          FH.write(chunk)
+          remaining -= len(chunk)
+    finally:
+      # the rest of the response is not read, its connection cannot be reused
+      self._close(connections, parts)
+      for thread in threads:
+        thread.join()
+    if errors:
+      # a download with missing segments cannot be resumed from its size
+      download.clear()
+      raise httplib.HTTPException('Failed to download a segment of %s: %s' % (url, errors[0]))
+    logger.info('Downloaded %s in %d segments', url, len(threads) + 1)
+    return length
+
+  def _download_segment(self, url, download, first, last, errors):
+    parts = urlparse.urlsplit(url)
+    connections = {}
+    try:
+      response = self._send(connections, parts, {'Range': 'bytes=%d-%d' % (first, last), 'If-Range': download.validator})
+      if response.status != 206 or not (response.getheader('Content-Range') or '').startswith('bytes %d-%d/' % (first, last)):
+        raise httplib.HTTPException('got HTTP status %d and Content-Range %s' % (response.status, response.getheader('Content-Range')))
+      with open(download.partial_file, 'r+b') as FH:
+        FH.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+          chunk = response.read(min(self.chunk_size, remaining))
+          if not chunk:
+            raise httplib.IncompleteRead('', remaining)
+          FH.write(chunk)
+          remaining -= len(chunk)
+    except Exception as e:
+      errors.append(e)
+    finally:
+      self._close(connections, parts)
+
+  def _get_proxy(self, parts):
+    """
+    :return: urlsplit of the proxy to request a url through, None to connect to its server directly
+    """
+    proxy = self.proxies.get(parts.scheme)
+    if not proxy or urllib.proxy_bypass(parts.hostname):
+      return None
+    if '://' not in proxy:
+      proxy = 'http://' + proxy
+    return urlparse.urlsplit(proxy)
+
+  def _get_proxy_headers(self, proxy):
+    if proxy.username is None:
+      return {}
+    credentials = '%s:%s' % (urllib.unquote(proxy.username), urllib.unquote(proxy.password or ''))
+    return {'Proxy-Authorization': 'Basic ' + credentials.encode('base64').replace('\n', '')}
+
+  def _send(self, connections, parts, headers):
+    """
+    Send a GET request of a url on the connection to its server or its proxy.
+    :return: the httplib.HTTPResponse
+    """
+    connection = self._get_connection(connections, parts)
+    proxy = self._get_proxy(parts)
+    if proxy and parts.scheme != 'https':
+      # plain http proxies are sent the absolute url, https urls go through a CONNECT tunnel to the server
+      path = urlparse.urlunsplit((parts.scheme, parts.netloc, parts.path or '/', parts.query, ''))
+      headers = dict(headers, **self._get_proxy_headers(proxy))
+    else:
+      path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+    connection.request('GET', path, headers=headers)
+    return connection.getresponse()
+
+  def _get_connection(self, connections, parts):
+    key = (parts.scheme, parts.hostname, parts.port)
+    if key not in connections:
+      proxy = self._get_proxy(parts)
+      if proxy is None:
+        host, port = parts.hostname, parts.port
+      else:
+        host, port = proxy.hostname, proxy.port
+      if parts.scheme == 'https':
+        connections[key] = httplib.HTTPSConnection(host, port, timeout=self.timeout)
+        if proxy is not None:
+          connections[key].set_tunnel(parts.hostname, parts.port, self._get_proxy_headers(proxy))
+      else:
+        connections[key] = httplib.HTTPConnection(host, port, timeout=self.timeout)
+    return connections[key]
+
+  def _close(self, connections, parts):
+    connection = connections.pop((parts.scheme, parts.hostname, parts.port), None)
+    if connection is not None:
+      connection.close()
+
+  def _close_if_needed(self, connections, parts, response):
+    if response.will_close:
+      self._close(connections, parts)
+
+
+def read_url(url):
+  """
+  Read the response of a url. The response is requested gzip compressed and decompressed here, except for .gz files
+  which some web servers serve with a gzip Content-Encoding: their content is the file itself.
+  :param str url: a full/absolute url
+  :return: response content
+  """
+  request = urllib2.Request(url, headers={'Accept-Encoding': 'gzip'})
+  response = urllib2.urlopen(request)
+  content = response.read()
+  if response.info().get('Content-Encoding') == 'gzip' and not url.endswith(CONSTANTS.GZIP_SUFFIX):
+    content = naarad.compression.gunzip(content)
+  return content
 
 
 def stream_url(url):
@@ -73,9 +512,7 @@ def stream_url(url):
   :return: response content if accessing the URL succeeds, False otherwise
   """
   try:
-    response = urllib2.urlopen(url)
-    response_content = response.read()
-    return response_content
+    return read_url(url)
   except (urllib2.URLError, urllib2.HTTPError) as e:
     logger.error('Unable to access requested URL: %s', url)
     return False
@@ -175,14 +612,15 @@ def download_url_regex(inputs, outdir, regex=".*"):
     if not os.path.exists(outdir):
       os.makedirs(outdir)
 
-  output_files = []
+  downloads = []
   files = get_urls_from_seed(inputs)
   for f in files:
     if re.compile(regex).match(f):
-      output_file = handle_single_url(f, outdir)
-      output_files.append(output_file)
+      output_file = get_output_file(f, outdir)
+      if output_file:
+        downloads.append((f, output_file))
 
-  return output_files
+  return HTTPDownloader().download(downloads)
 
 
 def download_url_list(url_list, outdir):
@@ -191,7 +629,11 @@ def download_url_list(url_list, outdir):
   :param list url_list: list of URLs to download
   :param str outdir: Required. the local directory to put the downloadedfiles.
     If this is not given, then the local file will be the original one, as given in url.
-  :return None
+  :return: list of the local full path names of the urls, None for the urls which could not be downloaded
   """
-  for url in url_list:
-    download_url_single(url, outdir)
+  if not os.path.exists(outdir):
+    os.makedirs(outdir)
+  output_files = [get_output_file(url, outdir) for url in url_list]
+  downloads = [(url, output_file) for url, output_file in zip(url_list, output_files) if output_file]
+  downloaded = iter(HTTPDownloader().download(downloads))
+  return [next(downloaded) if output_file else None for output_file in output_files]
@@ -23,6 +23,7 @@ import os
 import re
 import numpy
 from naarad.metrics.metric import Metric
+import naarad.series_store
 import naarad.utils
 import sys
 
@@ -54,7 +55,7 @@ class ClusterMetric(Metric):
   def collect(self):
     """
     Take a list of metrics, filter all metrics based on hostname, and metric_type
-    For each metric, merge the corresponding csv files into one,update corresponding properties such as csv_column_map.
+    For each metric, merge the corresponding time series into one csv file, update corresponding properties such as csv_column_map.
     Users can specify functions: raw, count (qps), sum (aggregated value), avg (averaged value)
     The timestamp granularity of aggregated submetrics is in seconds (sub-second is not supported)
     """
@@ -74,61 +75,48 @@ class ClusterMetric(Metric):
 
       # Store data points of various aggregation functions
       aggr_data = {}
-      aggr_data['raw'] = []   # Store all the raw values
+      aggr_data['raw'] = []   # Store all the raw lines, along with their epoch ms timestamp
       aggr_data['sum'] = defaultdict(float)   # Store the sum values for each timestamp
       aggr_data['count'] = defaultdict(int)  # Store the count of each timestamp (i.e. qps)
 
       for metric in self.metrics:   # Loop the list to find from all metrics to merge
         if metric.hostname in self.aggr_hosts and \
            cur_column in metric.csv_column_map.values():
-          file_csv = metric.get_csv(cur_column)
-          timestamp_format = None
-          with open(file_csv) as fh:
-            for line in fh:
-              aggr_data['raw'].append(line.rstrip())
-              words = line.split(",")
-              ts = words[0].split('.')[0]   # In case of sub-seconds; we only want the value of seconds;
-              if not timestamp_format or timestamp_format == 'unknown':
-                timestamp_format = naarad.utils.detect_timestamp_format(ts)
-              if timestamp_format == 'unknown':
-                continue
-              ts = naarad.utils.get_standardized_timestamp(ts, timestamp_format)
-              aggr_data['sum'][ts] += float(words[1])
-              aggr_data['count'][ts] += 1
+          # The series is read from the series store of the metric, falling back to its csv file
+          timestamps, values = naarad.series_store.read_series(metric.get_csv(cur_column))
+          for ts, value in zip(timestamps.tolist(), values.tolist()):
+            aggr_data['raw'].append((ts, value))
+            aggr_data['sum'][ts] += value
+            aggr_data['count'][ts] += 1
       # "raw" csv file
       if 'raw' in functions_aggr:
-        out_csv = self.get_csv(cur_column, 'raw')
-        self.csv_files.append(out_csv)
-        with open(out_csv, 'w') as fh:
-          fh.write("\n".join(sorted(aggr_data['raw'])))
+        self.write_csv(self.get_csv(cur_column, 'raw'), sorted(aggr_data['raw']))
 
       # "sum"  csv file
       if 'sum' in functions_aggr:
-        out_csv = self.get_csv(cur_column, 'sum')
-        self.csv_files.append(out_csv)
-        with open(out_csv, 'w') as fh:
-          for (k, v) in sorted(aggr_data['sum'].items()):
-            fh.write(k + "," + str(v) + '\n')
+        self.write_csv(self.get_csv(cur_column, 'sum'), sorted(aggr_data['sum'].items()))
 
       # "avg" csv file
       if 'avg' in functions_aggr:
-        out_csv = self.get_csv(cur_column, 'avg')
-        self.csv_files.append(out_csv)
-        with open(out_csv, 'w') as fh:
-          for (k, v) in sorted(aggr_data['sum'].items()):
-            fh.write(k + "," + str(v / aggr_data['count'][k]) + '\n')
+        self.write_csv(self.get_csv(cur_column, 'avg'), [(k, v / aggr_data['count'][k]) for (k, v) in sorted(aggr_data['sum'].items())])
 
       # "count" csv file (qps)
       if 'count' in functions_aggr:
-        out_csv = self.get_csv(cur_column, 'count')
-        self.csv_files.append(out_csv)
-        with open(out_csv, 'w') as fh:
-          for (k, v) in sorted(aggr_data['count'].items()):
-            fh.write(k + "," + str(v) + '\n')
+        self.write_csv(self.get_csv(cur_column, 'count'), sorted(aggr_data['count'].items()))
 
       gc.collect()
     return True
 
+  def write_csv(self, out_csv, rows):
+    """
+    Write the (timestamp, value) rows of an aggregated sub-metric to its csv file and hand them over for the series store
+    """
+    self.csv_files.append(out_csv)
+    with open(out_csv, 'w') as fh:
+      for (k, v) in rows:
+        fh.write(str(k) + "," + str(v) + '\n')
+    self.csv_rows[out_csv] = rows
+
   def get_csv(self, column, func):
     csv_file = Metric.get_csv(self, column + '.' + func)
     return csv_file
@@ -15,14 +15,10 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-import datetime
 import logging
-import os
-import re
-import sys
-import threading
 
 from naarad.metrics.metric import Metric
+import naarad.gc_log_parser
 import naarad.utils
 from naarad.naarad_constants import important_sub_metrics_import
 
@@ -32,7 +28,6 @@ logger = logging.getLogger('naarad.metrics.GCMetric')
 class GCMetric(Metric):
   """ Class for GC logs, deriving from class Metric """
 
-  bin_path = os.path.dirname(sys.argv[0])
   clock_format = '%Y-%m-%d %H:%M:%S'
   rate_types = ()
   val_types = ('alloc', 'promo', 'used0', 'used1', 'used', 'commit0', 'commit1', 'commit', 'gen0', 'gen0t', 'gen0usr', 'gen0sys', 'gen0real',
@@ -185,19 +180,18 @@ class GCMetric(Metric):
     }
 
   def parse(self):
-    prefix = os.path.join(self.resource_directory, self.label)
-    awk_cmd = os.path.join(self.bin_path, 'PrintGCStats')
     gc_metrics = set(self.val_types) & set(self.sub_metrics)
-    if self.ts_start:
-      awk_cmd += ' -v ts_start="' + naarad.utils.get_standardized_timestamp(self.ts_start, None) + '"'
-    if self.ts_end:
-      awk_cmd += ' -v ts_end="' + naarad.utils.get_standardized_timestamp(self.ts_end, None) + '"'
-    cmd = "{0} -v plot={1} -v splitfiles=1 -v datestamps=1 -v plotcolumns=2 -v splitfileprefix={2} {3}".format(awk_cmd, ','.join(gc_metrics), prefix,
-                                                                                                               ' '.join(self.infile_list))
-    logger.info("Parsing GC metric with cmd: %s", cmd)
-    os.system(cmd)
+    ts_start = naarad.utils.get_standardized_timestamp(self.ts_start, None) if self.ts_start else None
+    ts_end = naarad.utils.get_standardized_timestamp(self.ts_end, None) if self.ts_end else None
+    logger.info('Parsing GC metric %s from %s', self.label, ', '.join(self.infile_list))
+    columns = naarad.gc_log_parser.parse_gc_logs(self.infile_list, gc_metrics, ts_start, ts_end, self.workers)
     for gc_sub_metric in gc_metrics:
+      if gc_sub_metric not in columns:
+        continue
+      timestamps, values = columns[gc_sub_metric]
       outcsv = self.get_csv(gc_sub_metric)
-      if naarad.utils.is_valid_file(outcsv):
-        self.csv_files.append(outcsv)
+      with open(outcsv, 'w') as csv_data:
+        csv_data.writelines('%d,%9.7f\n' % point for point in zip(timestamps, values))
+      self.csv_files.append(outcsv)
+      self.csv_rows[outcsv] = zip(timestamps, values)
     return True
@@ -15,7 +15,10 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import naarad.compression
 import naarad.utils
+from naarad.timestamp_parser import TimestampParser
+from naarad.timezone_converter import TimezoneConverter
 import logging
 import os
 
@@ -50,15 +53,21 @@ class INNOMetric(Metric):
       return self.parse_innotop_mode_b()
 
   def parse_innotop_mode_c(self):
-    with open(self.infile, 'r') as infh:
+    with naarad.compression.open_input(self.infile) as infh:
       headerline = infh.readline()
       columns = headerline.split()[2:]
       outfilehandlers = {}
+      timestamp_parser = TimestampParser()
+      timezone_converter = TimezoneConverter(self.timezone, self.graph_timezone)
       for line in infh:
         l = line.strip().split(' ', 1)
         if len(l) <= 1:
           continue
         ts = l[0].strip().replace('T', ' ')
+        epoch_ts = timestamp_parser.parse(ts)
+        if epoch_ts == -1:
+          continue
+        csv_ts = str(timezone_converter.convert_timestamp(epoch_ts))
         try:
           nameval = l[1].strip().split('\t', 1)
         except IndexError:
@@ -79,10 +88,11 @@ class INNOMetric(Metric):
           if columns[i] not in outfilehandlers[command]:
             outfilehandlers[command][columns[i]] = open(self.get_csv_C(command, columns[i]), 'w')
             self.csv_files.append(self.get_csv_C(command, columns[i]))
-          ts = naarad.utils.reconcile_timezones(ts, self.timezone, self.graph_timezone)
-          outfilehandlers[command][columns[i]].write(ts + ',')
+            self.csv_rows[self.get_csv_C(command, columns[i])] = []
+          outfilehandlers[command][columns[i]].write(csv_ts + ',')
           outfilehandlers[command][columns[i]].write(words[i])
           outfilehandlers[command][columns[i]].write('\n')
+          self.csv_rows[self.get_csv_C(command, columns[i])].append((csv_ts, words[i]))
       for command in outfilehandlers:
         for column in outfilehandlers[command]:
           outfilehandlers[command][column].close()
@@ -90,7 +100,7 @@ class INNOMetric(Metric):
 
   def parse_innotop_mode_b(self):
     """ Generic parsing method for all other modes """
-    with open(self.infile, 'r') as infh:
+    with naarad.compression.open_input(self.infile) as infh:
       # Pre processing to figure out different headers
       max_row_quot = 0
       valrow = -1
@@ -127,6 +137,8 @@ class INNOMetric(Metric):
           break
       # infh.seek(0)
       # Real Processing
+      timestamp_parser = TimestampParser()
+      timezone_converter = TimezoneConverter(self.timezone, self.graph_timezone)
       for line in infh:
         l = line.strip().split(' ', 1)
         if len(l) <= 1:
@@ -135,6 +147,10 @@ class INNOMetric(Metric):
         if not ts == last_ts:
           last_ts = ts
           valrow = -1
+        epoch_ts = timestamp_parser.parse(ts)
+        if epoch_ts == -1:
+          continue
+        csv_ts = str(timezone_converter.convert_timestamp(epoch_ts))
         try:
           words = l[1].strip().split('\t')
         except IndexError:
@@ -160,16 +176,15 @@ class INNOMetric(Metric):
             # Converting -- to 0, seen this for buf_pool_hit_rate
             if words[i] == "--":
               words[i] = "0"
-            ts = naarad.utils.reconcile_timezones(ts, self.timezone, self.graph_timezone)
             # Calculating check point age
             if self.metric_type == "INNOTOP-I":
               if column == "log_seq_no":
                 log_seq_no = int(words[i])
               elif column == "log_flushed_to":
                 check_pt_age = log_seq_no - int(words[i])
-                tup = [ts, str(check_pt_age)]
+                tup = [csv_ts, str(check_pt_age)]
                 data["check_pt_age"].append(tup)
-            tup = [ts, words[i]]
+            tup = [csv_ts, words[i]]
             data[column].append(tup)
     # Post Proc, writing the different out files
     for column in data:
@@ -179,11 +194,12 @@ class INNOMetric(Metric):
         for tup in data[column]:
           outfh.write(','.join(tup))
           outfh.write('\n')
+      self.csv_rows[csvfile] = data[column]
     return True
 
   def parse_innotop_mode_m(self):
     """ Special parsing method for Innotop "Replication Status" results (innotop --mode M)"""
-    with open(self.infile, 'r') as infh:
+    with naarad.compression.open_input(self.infile) as infh:
       # Pre processing to figure out different headers
       max_row_quot = 0
       valrow = -1
@@ -218,6 +234,8 @@ class INNOMetric(Metric):
       infh.seek(0)
       is_bad_line = False
       outfilehandlers = {}
+      timestamp_parser = TimestampParser()
+      timezone_converter = TimezoneConverter(self.timezone, self.graph_timezone)
       for line in infh:
         l = line.strip().split(' ', 1)
         # Blank line
@@ -227,6 +245,10 @@ class INNOMetric(Metric):
         if ts != last_ts:
           last_ts = ts
           valrow = -1
+        epoch_ts = timestamp_parser.parse(ts)
+        if epoch_ts == -1:
+          continue
+        csv_ts = str(timezone_converter.convert_timestamp(epoch_ts))
         nameval = l[1].strip().split('\t', 1)
         try:
           words = nameval[1].split('\t')
@@ -253,10 +275,11 @@ class INNOMetric(Metric):
           if columns[i] not in outfilehandlers[command]:
             outfilehandlers[command][columns[i]] = open(self.get_csv_C(command, columns[i]), 'w')
             self.csv_files.append(self.get_csv_C(command, columns[i]))
-          ts = naarad.utils.reconcile_timezones(ts, self.timezone, self.graph_timezone)
-          outfilehandlers[command][columns[i]].write(ts + ',')
+            self.csv_rows[self.get_csv_C(command, columns[i])] = []
+          outfilehandlers[command][columns[i]].write(csv_ts + ',')
           outfilehandlers[command][columns[i]].write(words[i])
           outfilehandlers[command][columns[i]].write('\n')
+          self.csv_rows[self.get_csv_C(command, columns[i])].append((csv_ts, words[i]))
       for command in outfilehandlers:
         for column in outfilehandlers[command]:
           outfilehandlers[command][column].close()
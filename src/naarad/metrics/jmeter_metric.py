@@ -16,16 +16,24 @@ limitations under the License.
 """
 
 from collections import defaultdict
-import gc
+import csv
+import itertools
 import logging
 import os
-from xml.etree import ElementTree
+try:
+  from xml.etree import cElementTree as ElementTree
+except ImportError:
+  from xml.etree import ElementTree
 import numpy
-import heapq
 from naarad.metrics.metric import Metric
 from naarad.graphing.plot_data import PlotData as PD
+import naarad.compression
 import naarad.utils
+from naarad.streaming_stats import StreamingStats
+from naarad.timestamp_parser import TimestampParser
+from naarad.timezone_converter import TimezoneConverter
 import naarad.naarad_imports
+import naarad.naarad_constants as CONSTANTS
 from naarad.naarad_constants import important_sub_metrics_import
 
 
@@ -72,6 +80,7 @@ class JmeterMetric(Metric):
     if other_options:
       for (key, val) in other_options.iteritems():
         setattr(self, key, val)
+    self.exact_percentiles_threshold = int(self.exact_percentiles_threshold)
 
   def get_csv(self, transaction_name, column):
     col = naarad.utils.sanitize_string(column)
@@ -86,9 +95,9 @@ class JmeterMetric(Metric):
 
     if transaction_name == '__overall_summary__':
       transaction_name = 'Overall_Summary'
-    csv = os.path.join(self.resource_directory, self.label + '.' + transaction_name + '.' + col + '.csv')
-    self.csv_column_map[csv] = transaction_name + '.' + col
-    return csv
+    csv_file = os.path.join(self.resource_directory, self.label + '.' + transaction_name + '.' + col + '.csv')
+    self.csv_column_map[csv_file] = transaction_name + '.' + col
+    return csv_file
 
   def aggregate_count_over_time(self, metric_store, line_data, transaction_list, aggregate_timestamp):
     """
@@ -97,7 +106,7 @@ class JmeterMetric(Metric):
     :param dict metric_store: The metric store used to store all the parsed jmeter log data
     :param dict line_data: dict with the extracted k:v from the log line
     :param list transaction_list: list of transaction to be used for storing the metrics from given line
-    :param string aggregate_timestamp: timestamp used for storing the raw data. This accounts for aggregation time period
+    :param int aggregate_timestamp: timestamp used for storing the raw data. This accounts for aggregation time period
     :return: None
     """
     for transaction in transaction_list:
@@ -112,29 +121,47 @@ class JmeterMetric(Metric):
         qps[aggregate_timestamp] = 1
     return None
 
-  def aggregate_values_over_time(self, metric_store, line_data, transaction_list, metric_list, aggregate_timestamp):
+  def aggregate_values_over_time(self, metric_store, stats_store, line_data, transaction_list, metric_list, aggregate_timestamp):
     """
-    Organize and store the data from the log line into the metric store by metric type, transaction, timestamp
+    Organize and store the data from the log line into the metric store by metric type, transaction, timestamp. Only a
+    [sum, count] pair is kept per timestamp, the distribution of the values is tracked in the stats store.
 
     :param dict metric_store: The metric store used to store all the parsed jmeter log data
+    :param dict stats_store: StreamingStats by metric and transaction. Overall_Summary stats are merged from the
+    transaction stats once parsing is done, so only the first transaction of transaction_list is added to it
     :param dict line_data: dict with the extracted k:v from the log line
     :param list transaction_list: list of transaction to be used for storing the metrics from given line
     :param list metric_list: list of metrics to extract from the log line
-    :param string aggregate_timestamp: timestamp used for storing the raw data. This accounts for aggregation time period
+    :param int aggregate_timestamp: timestamp used for storing the raw data. This accounts for aggregation time period
     :return: None
     """
     for metric in metric_list:
+      value = float(line_data.get(metric))
       for transaction in transaction_list:
-        metric_data = reduce(defaultdict.__getitem__, [metric, transaction, aggregate_timestamp], metric_store)
-        metric_data.append(float(line_data.get(metric)))
+        bucket = metric_store[metric][transaction][aggregate_timestamp]
+        if bucket:
+          bucket[0] += value
+          bucket[1] += 1
+        else:
+          bucket.extend([value, 1])
+      self.get_transaction_stats(stats_store, metric, transaction_list[0]).add(value)
     return None
 
+  def get_transaction_stats(self, stats_store, metric, transaction):
+    """
+    Return the StreamingStats of a metric and transaction from the stats store, creating it if needed
+    """
+    metric_stats = stats_store[metric]
+    if transaction not in metric_stats:
+      metric_stats[transaction] = StreamingStats(self.exact_percentiles_threshold)
+    return metric_stats[transaction]
+
   def average_values_for_plot(self, metric_store, data, averaging_factor):
     """
     Create the time series for the various metrics, averaged over the aggregation period being used for plots
 
     :param dict metric_store: The metric store used to store all the parsed jmeter log data
-    :param dict data: Dict with all the metric data to be output to csv
+    :param dict data: Dict with all the metric data to be output to csv, as (timestamp, value) rows
     :param float averaging_factor: averaging factor to be used for calculating the average per second metrics
     :return: None
     """
@@ -142,15 +169,15 @@ class JmeterMetric(Metric):
       for transaction, time_store in transaction_store.items():
         for time_stamp, metric_data in sorted(time_store.items()):
           if metric in ['t', 'by']:
-            data[self.get_csv(transaction, metric)].append(','.join([str(time_stamp), str(sum(map(float, metric_data)) / float(len(metric_data)))]))
+            data[self.get_csv(transaction, metric)].append((time_stamp, str(metric_data[0] / float(metric_data[1]))))
             if metric == 'by':
-              metric_store['thr'][transaction][time_stamp] = sum(map(float, metric_data)) / float(averaging_factor * 1024 * 1024 / 8.0)
-              data[self.get_csv(transaction, 'thr')].append(','.join([str(time_stamp), str(metric_store['thr'][transaction][time_stamp])]))
+              metric_store['thr'][transaction][time_stamp] = metric_data[0] / float(averaging_factor * 1024 * 1024 / 8.0)
+              data[self.get_csv(transaction, 'thr')].append((time_stamp, str(metric_store['thr'][transaction][time_stamp])))
           elif metric in ['qps', 'eqps']:
-            data[self.get_csv(transaction, metric)].append(','.join([str(time_stamp), str(metric_data / float(averaging_factor))]))
+            data[self.get_csv(transaction, metric)].append((time_stamp, str(metric_data / float(averaging_factor))))
     return None
 
-  def calculate_key_stats(self, metric_store):
+  def calculate_key_stats(self, metric_store, stats_store):
     """
     Calculate key statistics for given data and store in the class variables calculated_stats and calculated_percentiles
     calculated_stats:
@@ -158,6 +185,7 @@ class JmeterMetric(Metric):
     calculated_percentiles:
       range(5,101,5), 99
     :param dict metric_store: The metric store used to store all the parsed jmeter log data
+    :param dict stats_store: StreamingStats of the ResponseTime and ResponseSize values by metric and transaction
     :return: none
     """
     stats_to_calculate = ['mean', 'std', 'median', 'min', 'max']  # TODO: get input from user
@@ -165,11 +193,8 @@ class JmeterMetric(Metric):
     percentiles_to_calculate.append(99)
     for transaction in metric_store['t'].keys():
       transaction_key = transaction + '.' + 'ResponseTime'
-      # For ResponseTime and ResponseSize, each timestamp has a list of values associated with it.
-      # Using heapq.merge to merge all the lists into a single list to be passed to numpy.
       self.calculated_stats[transaction_key], self.calculated_percentiles[transaction_key] = \
-          naarad.utils.calculate_stats(list(heapq.merge(*metric_store['t'][transaction].values())),
-                                   stats_to_calculate, percentiles_to_calculate)
+          stats_store['t'][transaction].get_stats(stats_to_calculate, percentiles_to_calculate)
       self.update_summary_stats(transaction_key)
       transaction_key = transaction + '.' + 'qps'
       if len(metric_store['qps'][transaction].values()) > 0:
@@ -179,8 +204,7 @@ class JmeterMetric(Metric):
         self.update_summary_stats(transaction_key)
       transaction_key = transaction + '.' + 'ResponseSize'
       self.calculated_stats[transaction_key], self.calculated_percentiles[transaction_key] = \
-          naarad.utils.calculate_stats(list(heapq.merge(*metric_store['by'][transaction].values())),
-                                       stats_to_calculate, percentiles_to_calculate)
+          stats_store['by'][transaction].get_stats(stats_to_calculate, percentiles_to_calculate)
       self.update_summary_stats(transaction_key)
       if 'eqps' in metric_store.keys() and transaction in metric_store['eqps'].keys():
         transaction_key = transaction + '.' + 'ErrorsPerSecond'
@@ -207,51 +231,238 @@ class JmeterMetric(Metric):
       if not file_status:
         return False
 
-    status = self.parse_xml_jtl(self.aggregation_granularity)
-    gc.collect()
-    return status
+    return self.parse_jtl(self.aggregation_granularity)
 
   def _sanitize_label(self, raw_label):
     return raw_label.replace('/', '_').replace('?', '_')
 
-  def parse_xml_jtl(self, granularity):
+  def is_csv_jtl(self, input_file):
+    """
+    Tell whether a JTL file was written in CSV format, JTL files in XML format start with an XML declaration or element
+
+    :param string input_file: path of the JTL file
+    :return: True for a CSV JTL file, False for an XML one
+    """
+    with naarad.compression.open_input(input_file) as jtl_file:
+      head = jtl_file.read(4096)
+    return not head.lstrip('\xef\xbb\xbf \t\r\n').startswith('<')
+
+  def iter_samples(self, input_file):
     """
-    Parse Jmeter workload output in XML format and extract overall and per transaction data and key statistics
+    Iterate over the httpSample and sample elements of a JTL file as they are read. Each element is cleared once the
+    caller is done with it, so that memory use does not grow with the size of the file.
+
+    :param string input_file: path of the XML JTL file
+    :return: generator of the sample elements which are direct children of the root element
+    """
+    depth = 0
+    root = None
+    with naarad.compression.open_input(input_file) as jtl_file:
+      for event, element in ElementTree.iterparse(jtl_file, events=('start', 'end')):
+        if event == 'start':
+          depth += 1
+          if root is None:
+            root = element
+          continue
+        depth -= 1
+        if depth == 1:
+          if element.tag in ('httpSample', 'sample'):
+            yield element
+          root.clear()
+
+  def parse_jtl(self, granularity):
+    """
+    Parse Jmeter workload output in XML or CSV format and extract overall and per transaction data and key statistics
 
     :param string granularity: The time period over which to aggregate and average the raw data. Valid values are 'hour', 'minute' or 'second'
     :return: status of the metric parse
     """
     data = defaultdict(list)
     processed_data = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+    stats_store = defaultdict(dict)
+    aggregate_timestamp, averaging_factor = self.get_aggregation_timestamp(0, granularity)
+    timezone_converter = TimezoneConverter(self.timezone, self.graph_timezone)
     for input_file in self.infile_list:
       logger.info('Processing : %s', input_file)
-      timestamp_format = None
-      tree = ElementTree.parse(input_file)
-      samples = tree.findall('./httpSample') + tree.findall('./sample')
-      for sample in samples:
-        if not timestamp_format or timestamp_format == 'unknown':
-          timestamp_format = naarad.utils.detect_timestamp_format(sample.get('ts'))
-        if timestamp_format == 'unknown':
-          continue
-        ts = naarad.utils.get_standardized_timestamp(sample.get('ts'), timestamp_format)
-        if ts == -1:
-          continue
-        ts = naarad.utils.reconcile_timezones(ts, self.timezone, self.graph_timezone)
-        aggregate_timestamp, averaging_factor = self.get_aggregation_timestamp(ts, granularity)
-        self.aggregate_count_over_time(processed_data, sample, [self._sanitize_label(sample.get('lb')), 'Overall_Summary'], aggregate_timestamp)
-        self.aggregate_values_over_time(processed_data, sample, [self._sanitize_label(sample.get('lb')), 'Overall_Summary'], ['t', 'by'], aggregate_timestamp)
-        logger.info('Finished parsing : %s', input_file)
+      if self.is_csv_jtl(input_file):
+        status = self.parse_csv_jtl(input_file, granularity, processed_data, stats_store, timezone_converter)
+      else:
+        status = self.parse_xml_jtl(input_file, granularity, processed_data, stats_store, timezone_converter)
+      if not status:
+        return False
+      logger.info('Finished parsing : %s', input_file)
+    for metric_stats in stats_store.values():
+      overall_stats = StreamingStats(self.exact_percentiles_threshold)
+      for transaction_stats in metric_stats.values():
+        overall_stats.merge(transaction_stats)
+      metric_stats['Overall_Summary'] = overall_stats
     logger.info('Processing metrics for output to csv')
     self.average_values_for_plot(processed_data, data, averaging_factor)
     logger.info('Writing time series csv')
-    for csv in data.keys():
-      self.csv_files.append(csv)
-      with open(csv, 'w') as csvf:
-        csvf.write('\n'.join(sorted(data[csv])))
+    # Lines are already in timestamp order, sorting them as strings would misorder epochs of different lengths
+    for csv_file in data.keys():
+      self.csv_files.append(csv_file)
+      with open(csv_file, 'w') as csvf:
+        csvf.write('\n'.join(str(ts) + ',' + value for ts, value in data[csv_file]))
+      self.csv_rows[csv_file] = data[csv_file]
     logger.info('Processing raw data for stats')
-    self.calculate_key_stats(processed_data)
+    self.calculate_key_stats(processed_data, stats_store)
     return True
 
+  def parse_xml_jtl(self, input_file, granularity, metric_store, stats_store, timezone_converter):
+    """
+    Parse a Jmeter workload output file in XML format into the metric and stats stores
+
+    :param string input_file: path of the XML JTL file
+    :param string granularity: The time period over which to aggregate and average the raw data
+    :param dict metric_store: The metric store used to store all the parsed jmeter log data
+    :param dict stats_store: StreamingStats by metric and transaction
+    :param TimezoneConverter timezone_converter: converter of the sample timestamps to graph_timezone
+    :return: status of the parse
+    """
+    timestamp_parser = TimestampParser()
+    for sample in self.iter_samples(input_file):
+      ts = timestamp_parser.parse(sample.get('ts'))
+      if ts == -1:
+        continue
+      ts = timezone_converter.convert_timestamp(ts)
+      aggregate_timestamp, averaging_factor = self.get_aggregation_timestamp(ts, granularity)
+      transaction_list = [self._sanitize_label(sample.get('lb')), 'Overall_Summary']
+      self.aggregate_count_over_time(metric_store, sample, transaction_list, aggregate_timestamp)
+      self.aggregate_values_over_time(metric_store, stats_store, sample, transaction_list, ['t', 'by'], aggregate_timestamp)
+    return True
+
+  def parse_csv_jtl(self, input_file, granularity, metric_store, stats_store, timezone_converter):
+    """
+    Parse a Jmeter workload output file in CSV format into the metric and stats stores. Columns are located with the
+    header line, or with the default Jmeter columns for files without one. Rows are read in chunks of
+    CONSTANTS.JMETER_CSV_CHUNK_SIZE, and each chunk is aggregated at once by aggregate_csv_chunk()
+
+    :param string input_file: path of the CSV JTL file
+    :param string granularity: The time period over which to aggregate and average the raw data
+    :param dict metric_store: The metric store used to store all the parsed jmeter log data
+    :param dict stats_store: StreamingStats by metric and transaction
+    :param TimezoneConverter timezone_converter: converter of the sample timestamps to graph_timezone
+    :return: status of the parse
+    """
+    timestamp_parser = TimestampParser()
+    with naarad.compression.open_input(input_file) as csv_file:
+      first_line = csv_file.readline()
+      try:
+        delimiter = csv.Sniffer().sniff(first_line, delimiters=',\t;|').delimiter
+      except csv.Error:
+        delimiter = ','
+      first_row = next(csv.reader([first_line], delimiter=delimiter), [])
+      if 'timeStamp' in first_row and 'elapsed' in first_row:
+        columns = first_row
+        rows = csv.reader(csv_file, delimiter=delimiter)
+      else:
+        columns = list(CONSTANTS.JMETER_CSV_DEFAULT_COLUMNS)
+        rows = itertools.chain([first_row], csv.reader(csv_file, delimiter=delimiter))
+      missing_columns = [column for column in ('timeStamp', 'elapsed', 'bytes', 'success', 'label') if column not in columns]
+      if missing_columns:
+        logger.error('Columns %s are missing in CSV JTL file %s', ', '.join(missing_columns), input_file)
+        return False
+      column_indexes = [columns.index(column) for column in ('timeStamp', 'elapsed', 'bytes', 'success', 'label')]
+      row_length = max(column_indexes) + 1
+      while True:
+        chunk = list(itertools.islice(rows, CONSTANTS.JMETER_CSV_CHUNK_SIZE))
+        if not chunk:
+          break
+        chunk = [row for row in chunk if len(row) >= row_length]
+        if chunk:
+          self.aggregate_csv_chunk(chunk, column_indexes, timestamp_parser, granularity, metric_store, stats_store, timezone_converter)
+    return True
+
+  def parse_csv_timestamps(self, values, timestamp_parser):
+    """
+    Convert the timeStamp column of a chunk of CSV rows to epoch ms. Epoch timestamps, which Jmeter writes by default,
+    are converted by numpy at once
+
+    :param list values: timestamp strings
+    :param TimestampParser timestamp_parser: timestamp parser of the file
+    :return: numpy int64 array of epoch ms timestamps, -1 for timestamps which cannot be parsed
+    """
+    if not timestamp_parser.ts_format:
+      timestamp_parser.parse(values[0])
+    if timestamp_parser.ts_format in ('epoch', 'epoch_ms'):
+      try:
+        timestamps = numpy.array(values, dtype=numpy.int64)
+        if timestamp_parser.ts_format == 'epoch':
+          timestamps *= 1000
+        return timestamps
+      except ValueError:
+        pass
+    return numpy.array([timestamp_parser.parse(value) for value in values], dtype=numpy.int64)
+
+  def aggregate_csv_chunk(self, rows, column_indexes, timestamp_parser, granularity, metric_store, stats_store, timezone_converter):
+    """
+    Aggregate a chunk of CSV JTL rows into the metric and stats stores. The timeStamp, elapsed, bytes, success and
+    label columns are loaded into numpy arrays, then counts and sums per label and aggregate timestamp are computed with
+    numpy.bincount over combined (label, timestamp) keys, so that the stores are only updated once per key
+
+    :param list rows: list of CSV rows
+    :param list column_indexes: indexes of the timeStamp, elapsed, bytes, success and label columns
+    :param TimestampParser timestamp_parser: timestamp parser of the file
+    :param string granularity: The time period over which to aggregate and average the raw data
+    :param dict metric_store: The metric store used to store all the parsed jmeter log data
+    :param dict stats_store: StreamingStats by metric and transaction
+    :param TimezoneConverter timezone_converter: converter of the sample timestamps to graph_timezone
+    :return: None
+    """
+    ts_index, elapsed_index, bytes_index, success_index, label_index = column_indexes
+    timestamps = self.parse_csv_timestamps([row[ts_index] for row in rows], timestamp_parser)
+    valid = timestamps != -1
+    values = {
+        't': numpy.array([row[elapsed_index] for row in rows], dtype=numpy.float64)[valid],
+        'by': numpy.array([row[bytes_index] for row in rows], dtype=numpy.float64)[valid]
+    }
+    success = numpy.array([row[success_index] == 'true' for row in rows], dtype=bool)[valid]
+    # Labels are coded in order of appearance, a chunk only has a handful of distinct labels
+    label_codes = {}
+    codes = numpy.array([label_codes.setdefault(row[label_index], len(label_codes)) for row in rows], dtype=numpy.int64)[valid]
+    if not len(codes):
+      return None
+    label_names = sorted(label_codes, key=label_codes.get)
+    label_codes = codes
+    aggregate_timestamps = self.get_aggregation_timestamps(timezone_converter.convert(timestamps[valid]), granularity)[0]
+    bucket_timestamps, bucket_codes = numpy.unique(aggregate_timestamps, return_inverse=True)
+    transactions = [self._sanitize_label(label_name) for label_name in label_names] + ['Overall_Summary']
+    bucket_timestamps = bucket_timestamps.tolist()
+    # Each row is counted once under its label and once under Overall_Summary
+    keys = numpy.concatenate([label_codes * len(bucket_timestamps) + bucket_codes, len(label_names) * len(bucket_timestamps) + bucket_codes])
+    key_count = len(transactions) * len(bucket_timestamps)
+    counts = numpy.bincount(keys, minlength=key_count)
+    success_counts = numpy.bincount(keys, weights=numpy.tile(success, 2), minlength=key_count).astype(numpy.int64).tolist()
+    sums = dict((metric, numpy.bincount(keys, weights=numpy.tile(metric_values, 2), minlength=key_count).tolist())
+                for metric, metric_values in values.items())
+    nonzero_keys = numpy.flatnonzero(counts).tolist()
+    counts = counts.tolist()
+    for key in nonzero_keys:
+      transaction = transactions[key // len(bucket_timestamps)]
+      aggregate_timestamp = bucket_timestamps[key % len(bucket_timestamps)]
+      for metric, metric_sums in sums.items():
+        bucket = metric_store[metric][transaction][aggregate_timestamp]
+        if bucket:
+          bucket[0] += metric_sums[key]
+          bucket[1] += counts[key]
+        else:
+          bucket.extend([metric_sums[key], counts[key]])
+      for qps_metric, count in (('qps', success_counts[key]), ('eqps', counts[key] - success_counts[key])):
+        if count:
+          qps = metric_store[qps_metric][transaction]
+          qps[aggregate_timestamp] = qps.get(aggregate_timestamp, 0) + count
+    # Overall_Summary stats are merged from the transaction stats once parsing is done
+    order = numpy.argsort(label_codes, kind='mergesort')
+    boundaries = numpy.cumsum(numpy.bincount(label_codes, minlength=len(label_names))).tolist()
+    for metric, metric_values in values.items():
+      sorted_values = metric_values[order]
+      start = 0
+      for transaction, end in zip(transactions, boundaries):
+        self.get_transaction_stats(stats_store, metric, transaction).add_values(sorted_values[start:end])
+        start = end
+    return None
+
   def calculate_stats(self):
     stats_csv = self.get_stats_csv()
     imp_metric_stats_csv = self.get_important_sub_metrics_csv()
@@ -299,7 +510,7 @@ class JmeterMetric(Metric):
         transaction_name = ' '.join(csv_filename.split('.')[1:-2])
         plot = PD(input_csv=out_csv, csv_column=1, series_name=transaction_name,
                   y_label=self.sub_metric_description[column] + ' (' + self.sub_metric_units[column] + ')', precision=None, graph_height=500, graph_width=1200,
-                  graph_type='line')
+                  graph_type='line', plot_points=self.plot_points)
         if transaction_name in plot_data:
           plot_data[transaction_name].append(plot)
         else:
@@ -25,6 +25,7 @@ import json
 import time
 from datetime import date
 from naarad.metrics.metric import Metric
+import naarad.compression
 import naarad.utils
 import naarad.naarad_constants as CONSTANTS
 
@@ -96,7 +97,7 @@ class LinkedInAndroidRumMetric(Metric):
     nus_update_time_file = self.get_csv('nus_update_time')
     for input_file in self.infile_list:
       # get Android RUM input data: for each line, generate (timestamp, launch_time, nus_update_time)
-      with open(input_file, 'r') as inf:
+      with naarad.compression.open_input(input_file) as inf:
         for line in inf:
           try:
             data = json.loads(line)
@@ -111,8 +112,10 @@ class LinkedInAndroidRumMetric(Metric):
     with open(launch_time_file, 'w') as launchtimef:
       with open(nus_update_time_file, 'w') as nusupdatetimef:
         for ts in sorted(results.iterkeys()):
-          launchtimef.write(naarad.utils.get_standardized_timestamp(ts, 'epoch_ms') + ',' + results[ts][0] + '\n')
-          nusupdatetimef.write(naarad.utils.get_standardized_timestamp(ts, 'epoch_ms') + ',' + results[ts][1] + '\n')
+          launchtimef.write(str(ts) + ',' + results[ts][0] + '\n')
+          nusupdatetimef.write(str(ts) + ',' + results[ts][1] + '\n')
     self.csv_files.append(launch_time_file)
     self.csv_files.append(nus_update_time_file)
+    self.csv_rows[launch_time_file] = [(ts, results[ts][0]) for ts in sorted(results.iterkeys())]
+    self.csv_rows[nus_update_time_file] = [(ts, results[ts][1]) for ts in sorted(results.iterkeys())]
     return True
@@ -21,9 +21,16 @@ import logging
 import os
 import re
 from naarad.graphing.plot_data import PlotData as PD
+import naarad.compression
 import naarad.utils
+from naarad.timestamp_parser import TimestampParser
+from naarad.timezone_converter import TimezoneConverter
 import naarad.httpdownload
 import naarad.naarad_constants as CONSTANTS
+import naarad.downsampling
+import naarad.series_store
+import naarad.tiles
+from naarad.streaming_stats import StreamingStats
 import datetime
 import heapq
 from luminol import anomaly_detector, correlator
@@ -56,6 +63,10 @@ class Metric(object):
     self.percentiles_files = []
     self.column_csv_map = {}
     self.csv_column_map = {}
+    # (timestamp, value) rows of the csv files written by parse() and calc(), saved to the series store without reading
+    # the csv files back
+    self.csv_rows = {}
+    self.series_store_saved = False
     self.sub_metric_description = defaultdict(lambda: 'None')  # the description of the submetrics.
     self.sub_metric_unit = defaultdict(lambda: 'None')      # the unit of the submetrics.  The plot will have the Y-axis being: Metric name (Unit)
     self.important_sub_metrics = important_sub_metrics
@@ -67,6 +78,8 @@ class Metric(object):
     self.summary_stats = defaultdict(dict)
     self.status = CONSTANTS.OK
     self.ignore = False
+    # Number of worker processes of the pools started to analyze the metric, None for the number of cpus
+    self.workers = None
     self.timezone = "PDT"
     self.options = None
     self.sub_metrics = None   # users can specify what sub_metrics to process/plot;
@@ -77,6 +90,13 @@ class Metric(object):
     self.summary_html_content_enabled = True
     self.anomaly_detection_metrics = anomaly_detection_metrics
     self.anomalies = {}
+    # streaming aggregation keeps per-bucket sums/counts and a quantile sketch instead of every raw value
+    self.streaming_aggregation = False
+    self.exact_percentiles_threshold = CONSTANTS.DEFAULT_EXACT_PERCENTILES_THRESHOLD
+    # time series longer than this are downsampled for the charts and the client charting page
+    self.plot_points = CONSTANTS.DEFAULT_PLOT_POINTS
+    # whether long series get a tile pyramid for the client charting page, None until a report which loads them is known
+    self.tiles = None
     for (key, val) in rule_strings.iteritems():
       naarad.utils.set_sla(self, self.label, key, val)
     if other_options:
@@ -91,6 +111,24 @@ class Metric(object):
 
       self.titles = dict(zip(self.columns, self.titles_string.split(','))) if self.columns and self.titles_string else None
       self.ylabels = dict(zip(self.columns, self.ylabels_string.split(','))) if self.columns and self.ylabels_string else None
+      if isinstance(self.streaming_aggregation, str):
+        self.streaming_aggregation = self.streaming_aggregation.strip().lower() in ('1', 'true', 'yes')
+      self.exact_percentiles_threshold = int(self.exact_percentiles_threshold)
+      self.parse_plot_options()
+
+  def parse_plot_options(self):
+    """
+    Validate the plot options set from the config, invalid ones are replaced by their default
+    """
+    plot_points = ' '.join(self.plot_points) if isinstance(self.plot_points, list) else str(self.plot_points).strip()
+    if plot_points.isdigit() and int(plot_points) >= CONSTANTS.MIN_PLOT_POINTS:
+      self.plot_points = int(plot_points)
+    else:
+      logger.error('Invalid plot_points %s specified for metric %s. Will default to %d', plot_points, self.label, CONSTANTS.DEFAULT_PLOT_POINTS)
+      self.plot_points = CONSTANTS.DEFAULT_PLOT_POINTS
+    if isinstance(self.tiles, (list, str)):
+      tiles = ' '.join(self.tiles) if isinstance(self.tiles, list) else self.tiles
+      self.tiles = tiles.strip().lower() in ('1', 'true', 'yes')
 
   def name_to_index(self, name):
     index = None
@@ -117,27 +155,31 @@ class Metric(object):
     return False
 
   def collect_local(self, infile):
-    return os.path.exists(infile)
+    return naarad.compression.input_exists(infile)
 
   def collect(self):
     # self.infile_list can be of several formats: for instance a local dir (e.g., /path/a.log) or an http url;
     # decide the case based on self.infile_list;
     # self.access is optional, can be removed.
     collected_files = []
+    urls = [infile for infile in self.infile_list if infile.startswith("http://") or infile.startswith("https://")]
+    for url in urls:
+      if not naarad.utils.is_valid_url(url):
+        logger.error("The given url of {0} is invalid.\n".format(url))
+        return False
+    # urls are downloaded all at once by a pool of connections
+    downloaded_files = dict(zip(urls, naarad.httpdownload.download_url_list(urls, os.path.join(self.outdir, self.label)) if urls else []))
     for infile in self.infile_list:
-      if infile.startswith("http://") or infile.startswith("https://"):
-        if naarad.utils.is_valid_url(infile):
-          http_download_dir = os.path.join(self.outdir, self.label)
-          output_file = naarad.httpdownload.download_url_single(infile, http_download_dir)
-          if output_file:
-            collected_files.append(output_file)
-          else:
-            return False
+      if infile in downloaded_files:
+        if downloaded_files[infile]:
+          collected_files.append(downloaded_files[infile])
         else:
-          logger.error("The given url of {0} is invalid.\n".format(infile))
           return False
       else:
         file_matches = glob.glob(infile)
+        if not file_matches and naarad.compression.find_archive_member(infile):
+          # members of tar archives are read straight from the archive
+          file_matches = [infile]
         if len(file_matches) == 0:
           return False
         for file_name in file_matches:
@@ -186,18 +228,32 @@ class Metric(object):
     """
     Return a timestamp from the raw epoch time based on the granularity preferences passed in.
 
-    :param string timestamp: timestamp from the log line
+    :param int timestamp: epoch ms timestamp from the log line
     :param string granularity: aggregation granularity used for plots.
-    :return: string aggregate_timestamp: timestamp used for metrics aggregation in all functions
+    :return: int aggregate_timestamp: timestamp used for metrics aggregation in all functions
     """
     if granularity is None or granularity.lower() == 'none':
-      return int(timestamp), 1
+      return timestamp, 1
     elif granularity == 'hour':
-      return (int(timestamp) / (3600 * 1000)) * 3600 * 1000, 3600
+      return (timestamp / (3600 * 1000)) * 3600 * 1000, 3600
     elif granularity == 'minute':
-      return (int(timestamp) / (60 * 1000)) * 60 * 1000, 60
+      return (timestamp / (60 * 1000)) * 60 * 1000, 60
     else:
-      return (int(timestamp) / 1000) * 1000, 1
+      return (timestamp / 1000) * 1000, 1
+
+  def get_aggregation_timestamps(self, timestamps, granularity='second'):
+    """
+    Vectorized get_aggregation_timestamp() for a whole array of timestamps
+
+    :param numpy.array timestamps: int64 array of epoch ms timestamps
+    :param string granularity: aggregation granularity used for plots.
+    :return: int64 array of the aggregate timestamps and the averaging factor
+    """
+    aggregate_timestamp, averaging_factor = self.get_aggregation_timestamp(0, granularity)
+    if granularity is None or granularity.lower() == 'none':
+      return timestamps, averaging_factor
+    period = averaging_factor * 1000
+    return timestamps // period * period, averaging_factor
 
   def aggregate_count_over_time(self, metric_store, groupby_name, aggregate_timestamp):
     """
@@ -205,7 +261,7 @@ class Metric(object):
 
     :param dict metric_store: The metric store used to store all the parsed the log data
     :param string groupby_name: the group name that the log line belongs to
-    :param string aggregate_timestamp: timestamp used for storing the raw data. This accounts for aggregation time period
+    :param int aggregate_timestamp: timestamp used for storing the raw data. This accounts for aggregation time period
     :return: None
     """
     all_qps = metric_store['qps']
@@ -216,7 +272,7 @@ class Metric(object):
       qps[aggregate_timestamp] = 1
     return None
 
-  def aggregate_values_over_time(self, metric_store, data, groupby_name, column_name, aggregate_timestamp):
+  def aggregate_values_over_time(self, metric_store, data, groupby_name, column_name, aggregate_timestamp, stats_store=None):
     """
     Organize and store the data from the log line into the metric store by metric type, transaction, timestamp
 
@@ -224,9 +280,26 @@ class Metric(object):
     :param string data: column data in the log line
     :param string groupby_name: the group that the data belongs to
     :param string column_name: the column name of the data
-    :param string aggregate_timestamp: timestamp used for storing the raw data. This accounts for aggregation time period
+    :param int aggregate_timestamp: timestamp used for storing the raw data. This accounts for aggregation time period
+    :param dict stats_store: StreamingStats by column and group. When specified (streaming aggregation), the metric store
+    only keeps a [sum, count] pair per timestamp instead of the raw data
     :return: None
     """
+    if stats_store is not None:
+      value = float(data)
+      groups = [groupby_name, 'Overall_summary'] if self.groupby else [groupby_name]
+      for group in groups:
+        bucket = metric_store[column_name][group][aggregate_timestamp]
+        if bucket:
+          bucket[0] += value
+          bucket[1] += 1
+        else:
+          bucket.extend([value, 1])
+      # Overall_summary stats are merged from the group stats once parsing is done
+      if groupby_name not in stats_store[column_name]:
+        stats_store[column_name][groupby_name] = StreamingStats(self.exact_percentiles_threshold)
+      stats_store[column_name][groupby_name].add(value)
+      return None
     # To add overall_summary one
     if self.groupby:
       metric_data = reduce(defaultdict.__getitem__, [column_name, 'Overall_summary', aggregate_timestamp], metric_store)
@@ -240,7 +313,7 @@ class Metric(object):
     Create the time series for the various metrics, averaged over the aggregation period being used for plots
 
     :param dict metric_store: The metric store used to store all the parsed log data
-    :param dict data: Dict with all the metric data to be output to csv
+    :param dict data: Dict with all the metric data to be output to csv, as (timestamp, value) rows
     :param float averaging_factor: averaging factor to be used for calculating the average per second metrics
     :return: None
     """
@@ -249,45 +322,72 @@ class Metric(object):
         for time_stamp, column_data in sorted(time_store.items()):
           if column in ['qps']:
             if self.groupby:
-              data[self.get_csv(column, group)].append(','.join([str(time_stamp), str(column_data / float(averaging_factor))]))
+              data[self.get_csv(column, group)].append((time_stamp, str(column_data / float(averaging_factor))))
             else:
-              data[self.get_csv(column)].append(','.join([str(time_stamp), str(column_data / float(averaging_factor))]))
+              data[self.get_csv(column)].append((time_stamp, str(column_data / float(averaging_factor))))
           else:
+            if self.streaming_aggregation:
+              average = column_data[0] / float(column_data[1])
+            else:
+              average = sum(map(float, column_data)) / float(len(column_data))
             if self.groupby:
-              data[self.get_csv(column, group)].append(','.join([str(time_stamp), str(sum(map(float, column_data)) / float(len(column_data)))]))
+              data[self.get_csv(column, group)].append((time_stamp, str(average)))
             else:
-              data[self.get_csv(column)].append(','.join([str(time_stamp), str(sum(map(float, column_data)) / float(len(column_data)))]))
+              data[self.get_csv(column)].append((time_stamp, str(average)))
     return None
 
+  def read_timestamped_lines(self, infile, timezone_converter):
+    """
+    Generate the timestamp and words of the valid lines of a file. Timestamps are converted to the graph timezone
+    CONSTANTS.TIMEZONE_CONVERSION_CHUNK_SIZE lines at a time
+
+    :param file infile: file object to read lines from
+    :param TimezoneConverter timezone_converter: converter from the metric timezone to the graph timezone
+    :return: generator of (int epoch ms timestamp, list of words)
+    """
+    timestamp_parser = TimestampParser()
+    timestamps = []
+    lines_words = []
+    for line in infile:
+      if self.sep is None or self.sep == '':
+        words = line.strip().split()
+      else:
+        words = line.strip().split(self.sep)
+      if len(words) == 0:
+        continue
+      if len(words) <= len(self.columns):  # NOTE: len(self.columns) is always one less than len(words) since we assume the very first column is timestamp
+        logger.warning("WARNING: Number of columns given in config is more than number of columns present in line {0}\n", line)
+        continue
+      ts = timestamp_parser.parse(words[0])
+      if ts == -1:
+        continue
+      if not timezone_converter.enabled:
+        yield ts, words
+        continue
+      timestamps.append(ts)
+      lines_words.append(words)
+      if len(timestamps) >= CONSTANTS.TIMEZONE_CONVERSION_CHUNK_SIZE:
+        for item in zip(timezone_converter.convert(timestamps).tolist(), lines_words):
+          yield item
+        timestamps = []
+        lines_words = []
+    if timestamps:
+      for item in zip(timezone_converter.convert(timestamps).tolist(), lines_words):
+        yield item
+
   def parse(self):
     processed_data = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+    stats_store = defaultdict(dict) if self.streaming_aggregation else None
     data = defaultdict(list)
     groupby_idxes = None
     averaging_factor = None
     if self.groupby:
       groupby_idxes = self.get_groupby_indexes(self.groupby)
+    timezone_converter = TimezoneConverter(self.timezone, self.graph_timezone)
     for input_file in self.infile_list:
       logger.info("Working on " + input_file)
-      timestamp_format = None
-      with open(input_file, 'r') as infile:
-        for line in infile:
-          if self.sep is None or self.sep == '':
-            words = line.strip().split()
-          else:
-            words = line.strip().split(self.sep)
-          if len(words) == 0:
-            continue
-          if len(words) <= len(self.columns):  # NOTE: len(self.columns) is always one less than len(words) since we assume the very first column is timestamp
-            logger.warning("WARNING: Number of columns given in config is more than number of columns present in line {0}\n", line)
-            continue
-          if not timestamp_format or timestamp_format == 'unknown':
-            timestamp_format = naarad.utils.detect_timestamp_format(words[0])
-          if timestamp_format == 'unknown':
-            continue
-          ts = naarad.utils.get_standardized_timestamp(words[0], timestamp_format)
-          if ts == -1:
-            continue
-          ts = naarad.utils.reconcile_timezones(ts, self.timezone, self.graph_timezone)
+      with naarad.compression.open_input(input_file) as infile:
+        for ts, words in self.read_timestamped_lines(infile, timezone_converter):
           if self.ts_out_of_range(ts):
             continue
           if self.groupby:
@@ -303,27 +403,37 @@ class Metric(object):
               if i + 1 in groupby_idxes:
                 continue
               else:
-                self.aggregate_values_over_time(processed_data, words[i + 1], groupby_names, self.columns[i], aggregate_timestamp)
+                self.aggregate_values_over_time(processed_data, words[i + 1], groupby_names, self.columns[i], aggregate_timestamp, stats_store)
           else:
             groupby_names = 'DEFAULT'
             aggregate_timestamp, averaging_factor = self.get_aggregation_timestamp(ts, self.aggregation_granularity)
             self.aggregate_count_over_time(processed_data, groupby_names, aggregate_timestamp)
             for i in range(len(self.columns)):
-              self.aggregate_values_over_time(processed_data, words[i + 1], groupby_names, self.columns[i], aggregate_timestamp)
+              self.aggregate_values_over_time(processed_data, words[i + 1], groupby_names, self.columns[i], aggregate_timestamp, stats_store)
     # Post processing, putting data in csv files
     self.average_values_for_plot(processed_data, data, averaging_factor)
+    # Lines are already in timestamp order, sorting them as strings would misorder epochs of different lengths
     for csv in data.keys():
       self.csv_files.append(csv)
       with open(csv, 'w') as fh:
-        fh.write('\n'.join(sorted(data[csv])))
-    self.calc_key_stats(processed_data)
+        fh.write('\n'.join(str(ts) + ',' + value for ts, value in data[csv]))
+      self.csv_rows[csv] = data[csv]
+    if self.groupby and stats_store:
+      for groups_stats in stats_store.values():
+        overall_stats = StreamingStats(self.exact_percentiles_threshold)
+        for group_stats in groups_stats.values():
+          overall_stats.merge(group_stats)
+        groups_stats['Overall_summary'] = overall_stats
+    self.calc_key_stats(processed_data, stats_store)
     return True
 
-  def calc_key_stats(self, metric_store):
+  def calc_key_stats(self, metric_store, stats_store=None):
     """
     Calculate stats such as percentile and mean
 
     :param dict metric_store: The metric store used to store all the parsed log data
+    :param dict stats_store: StreamingStats by column and group, used instead of the raw data in the metric store for
+    streaming aggregation
     :return: None
     """
     stats_to_calculate = ['mean', 'std', 'min', 'max']  # TODO: get input from user
@@ -337,6 +447,9 @@ class Metric(object):
           column_name = column
         if column.startswith('qps'):
           self.calculated_stats[column_name], self.calculated_percentiles[column_name] = naarad.utils.calculate_stats(data, stats_to_calculate, percentiles_to_calculate)
+        elif stats_store is not None:
+          self.calculated_stats[column_name], self.calculated_percentiles[column_name] = stats_store[column][group].get_stats(stats_to_calculate,
+                                                                                                                             percentiles_to_calculate)
         else:
           self.calculated_stats[column_name], self.calculated_percentiles[column_name] = naarad.utils.calculate_stats(list(heapq.merge(*data)), stats_to_calculate,
                                                                                                             percentiles_to_calculate)
@@ -390,6 +503,47 @@ class Metric(object):
           FH.write(str(percentile) + ',' + str(round(percentile_data[percentile], 2)) + '\n')
         self.percentiles_files.append(percentiles_csv_file)
 
+  def get_series_store_file(self):
+    return os.path.join(self.resource_directory, self.label + CONSTANTS.SERIES_STORE_SUFFIX)
+
+  def save_series_store(self):
+    """
+    Save the time series of all the csv files of the metric to its series store, from which stats, anomaly detection,
+    graphs and aggregate metrics read them. The rows handed over in csv_rows are used as is, only the csv files written
+    by other means are read back. Series longer than plot_points also get a downsampled csv file, and a tile pyramid
+    for the client charting page if tiles is set.
+    """
+    series = {}
+    for csv_file in self.csv_files:
+      if csv_file in self.csv_rows:
+        series[csv_file] = naarad.series_store.to_arrays(self.csv_rows[csv_file], csv_file)
+      elif os.path.exists(csv_file):
+        series[csv_file] = naarad.series_store.read_csv(csv_file)
+      else:
+        continue
+      naarad.downsampling.write_downsampled_csv(csv_file, series[csv_file][0], series[csv_file][1], self.plot_points)
+      if self.tiles:
+        naarad.tiles.write_tiles(csv_file, series[csv_file][0], series[csv_file][1], self.plot_points)
+    naarad.series_store.write_store(self.get_series_store_file(), series)
+    self.csv_rows = {}
+    self.series_store_saved = True
+
+  def get_time_series(self, csv_file):
+    """
+    Return the time series of a csv file of the metric, from csv_rows before the series store is saved and from the
+    series store after. Csv files in neither are read from disk.
+
+    :param string csv_file: path of the csv file
+    :return: tuple of numpy int64 timestamps array and numpy float64 values array
+    """
+    if csv_file in self.csv_rows:
+      return naarad.series_store.to_arrays(self.csv_rows[csv_file], csv_file)
+    if self.series_store_saved:
+      store = naarad.series_store.open_store(self.get_series_store_file())
+      if store is not None and csv_file in store:
+        return store.get(csv_file)
+    return naarad.series_store.read_csv(csv_file)
+
   def calculate_other_metric_stats(self):
     stats_to_calculate = ['mean', 'std', 'min', 'max']  # TODO: get input from user
     percentiles_to_calculate = range(0, 101, 1)  # TODO: get input from user
@@ -402,22 +556,11 @@ class Metric(object):
     with open(metric_stats_csv_file, 'w') as FH_W:
       with open(imp_metric_stats_csv_file, 'w') as FH_W_IMP:
         for csv_file in self.csv_files:
-          data = []
-          value_error = False
           if not os.path.getsize(csv_file):
             continue
           column = self.csv_column_map[csv_file]
           percentile_csv_file = self.get_percentiles_csv_from_data_csv(csv_file)
-          with open(csv_file, 'r') as FH:
-            for line in FH:
-              words = line.split(',')
-              try:
-                data.append(float(words[1]))
-              except ValueError:
-                if not value_error:
-                  logger.error("Cannot convert to float. Some data is ignored in file " + csv_file)
-                  value_error = True
-                continue
+          timestamps, data = self.get_time_series(csv_file)
           self.calculated_stats[column], self.calculated_percentiles[column] = naarad.utils.calculate_stats(data, stats_to_calculate, percentiles_to_calculate)
           with open(percentile_csv_file, 'w') as FH_P:
             for percentile in sorted(self.calculated_percentiles[column].iterkeys()):
@@ -463,33 +606,31 @@ class Metric(object):
       old_metric_csv = self.get_csv(old_metric)
       new_metric_csv = self.get_csv(newmetric)
       self.csv_files.append(new_metric_csv)
+      timestamps, values = self.get_time_series(old_metric_csv)
+      rows = []
+      old_ts = None
       old_val = None
-      with open(old_metric_csv, 'r') as FH:
-        with open(new_metric_csv, 'w') as NEW_FH:
-          for line in FH:
-            w = line.split(',')
-            ts = w[0]
-            val = w[1]
-            if not old_val:
-              old_ts = ts
-              old_val = val
-              continue
-            if calc_type == 'rate':
-              # Multiply rate by 1000 since timestamp is in ms
-              ts_diff = naarad.utils.convert_to_unixts(ts) - naarad.utils.convert_to_unixts(old_ts)
-              if ts_diff != 0:
-                new_metric_val = 1000 * (float(val) - float(old_val)) / ts_diff
-              else:
-                new_metric_val = 0
-                logger.warn("rate calculation encountered zero timestamp difference")
-            elif calc_type == 'diff':
-              new_metric_val = (float(val) - float(old_val))
-            old_ts = ts
-            old_val = val
-            NEW_FH.write(ts)
-            NEW_FH.write(',')
-            NEW_FH.write(str(new_metric_val))
-            NEW_FH.write('\n')
+      for ts, val in zip(timestamps.tolist(), values.tolist()):
+        if old_val is None:
+          old_ts = ts
+          old_val = val
+          continue
+        if calc_type == 'rate':
+          # Multiply rate by 1000 since timestamp is in ms
+          ts_diff = ts - old_ts
+          if ts_diff != 0:
+            new_metric_val = 1000 * (val - old_val) / ts_diff
+          else:
+            new_metric_val = 0
+            logger.warn("rate calculation encountered zero timestamp difference")
+        elif calc_type == 'diff':
+          new_metric_val = val - old_val
+        old_ts = ts
+        old_val = val
+        rows.append((ts, new_metric_val))
+      with open(new_metric_csv, 'w') as NEW_FH:
+        NEW_FH.writelines(str(ts) + ',' + str(new_metric_val) + '\n' for ts, new_metric_val in rows)
+      self.csv_rows[new_metric_csv] = rows
 
   def plot_timeseries(self, graphing_library='matplotlib'):
     """
@@ -510,7 +651,7 @@ class Metric(object):
         transaction_name = ' '.join(csv_filename.split('.')[1:-2])
         plot = PD(input_csv=out_csv, csv_column=1, series_name=transaction_name + '.' + column,
                   y_label=column + ' (' + self.sub_metric_description[column] + ')', precision=None, graph_height=500, graph_width=1200, graph_type='line',
-                  highlight_regions=highlight_regions)
+                  highlight_regions=highlight_regions, plot_points=self.plot_points)
         if transaction_name in plot_data:
           plot_data[transaction_name].append(plot)
         else:
@@ -537,10 +678,11 @@ class Metric(object):
           graph_title += ' (' + self.sub_metric_description[column] + ')'
         if self.sub_metric_unit and column in self.sub_metric_unit.keys():
           plot_data = [PD(input_csv=out_csv, csv_column=1, series_name=graph_title, y_label=column + ' (' + self.sub_metric_unit[column] + ')',
-                          precision=None, graph_height=600, graph_width=1200, graph_type='line', highlight_regions=highlight_regions)]
+                          precision=None, graph_height=600, graph_width=1200, graph_type='line', highlight_regions=highlight_regions,
+                          plot_points=self.plot_points)]
         else:
           plot_data = [PD(input_csv=out_csv, csv_column=1, series_name=graph_title, y_label=column, precision=None, graph_height=600, graph_width=1200,
-                          graph_type='line', highlight_regions=highlight_regions)]
+                          graph_type='line', highlight_regions=highlight_regions, plot_points=self.plot_points)]
         graphed, div_file = Metric.graphing_modules[graphing_library].graph_data(plot_data, self.resource_directory, self.resource_path, graph_title)
         if graphed:
           self.plot_files.append(div_file)
@@ -605,16 +747,46 @@ class Metric(object):
     """
     if not self.anomaly_detection_metrics or len(self.anomaly_detection_metrics) <= 0:
       return
+    series = {}
     for submetric in self.anomaly_detection_metrics:
       csv_file = self.get_csv(submetric)
       if naarad.utils.is_valid_file(csv_file):
-        detector = anomaly_detector.AnomalyDetector(csv_file)
-        anomalies = detector.get_anomalies()
-        if len(anomalies) <= 0:
-          return
-        self.anomalies[submetric] = anomalies
-        anomaly_csv_file = os.path.join(self.resource_directory, self.label + '.' + submetric + '.anomalies.csv')
-        with open(anomaly_csv_file, 'w') as FH:
-          for anomaly in anomalies:
-            FH.write(",".join([str(anomaly.anomaly_score), str(anomaly.start_timestamp), str(anomaly.end_timestamp), str(anomaly.exact_timestamp)]))
-            FH.write('\n')
+        series[submetric] = self.get_time_series(csv_file)
+    for submetric, anomalies in anomaly_detector.detect_anomalies(series, self.workers).items():
+      if len(anomalies) <= 0:
+        continue
+      self.anomalies[submetric] = anomalies
+      anomaly_csv_file = os.path.join(self.resource_directory, self.label + '.' + submetric + '.anomalies.csv')
+      with open(anomaly_csv_file, 'w') as FH:
+        for anomaly in anomalies:
+          FH.write(",".join([str(anomaly.anomaly_score), str(anomaly.start_timestamp), str(anomaly.end_timestamp), str(anomaly.exact_timestamp)]))
+          FH.write('\n')
+
+  def get_result_state(self):
+    """
+    Return the state produced by analyzing this metric (csv/plot files, stats, percentiles, slas and anomalies) as a
+    picklable dict. Used to ship results back from a worker process when metrics are analyzed with the process executor
+    :return: dict of attribute name to value
+    """
+    state = {}
+    for attribute in CONSTANTS.METRIC_RESULT_ATTRIBUTES:
+      state[attribute] = getattr(self, attribute, None)
+    state['sla_map'] = dict((label, dict((sub_metric, dict(slas)) for sub_metric, slas in sub_metrics.items()))
+                            for label, sub_metrics in self.sla_map.items())
+    state['summary_stats'] = dict(self.summary_stats)
+    return state
+
+  def set_result_state(self, state):
+    """
+    Update this metric with the state returned by get_result_state() of its copy in a worker process
+    :param state: dict of attribute name to value
+    """
+    for attribute in CONSTANTS.METRIC_RESULT_ATTRIBUTES:
+      if attribute in state:
+        setattr(self, attribute, state[attribute])
+    self.sla_map = defaultdict(lambda: defaultdict(lambda: defaultdict(None)))
+    for label, sub_metrics in state['sla_map'].items():
+      for sub_metric, slas in sub_metrics.items():
+        self.sla_map[label][sub_metric].update(slas)
+    self.summary_stats = defaultdict(dict)
+    self.summary_stats.update(state['summary_stats'])
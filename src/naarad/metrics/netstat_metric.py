@@ -18,7 +18,9 @@ limitations under the License.
 from collections import defaultdict
 import logging
 from naarad.metrics.metric import Metric
+import naarad.compression
 import naarad.utils
+from naarad.timestamp_parser import TimestampParser
 
 logger = logging.getLogger('naarad.metrics.NetstatMetric')
 
@@ -182,7 +184,7 @@ class NetstatMetric(Metric):
     :param data: The dictionary containing all data
     :param col: The sub-metric name e.g. 'host1_port1.host2_port2.SendQ'
     :param value: integer
-    :param ts: timestamp
+    :param ts: epoch ms timestamp
     :return: None
     """
     if col in self.column_csv_map:
@@ -190,7 +192,7 @@ class NetstatMetric(Metric):
     else:
       out_csv = self.get_csv(col)   # column_csv_map[] is assigned in get_csv()
       data[out_csv] = []
-    data[out_csv].append(ts + "," + value)
+    data[out_csv].append((ts, value))
 
   def parse(self):
     """
@@ -201,8 +203,8 @@ class NetstatMetric(Metric):
     data = {}  # stores the data of each sub-metric
     for infile in self.infile_list:
       logger.info('Processing : %s', infile)
-      timestamp_format = None
-      with open(infile) as fh:
+      timestamp_parser = TimestampParser()
+      with naarad.compression.open_input(infile) as fh:
         for line in fh:
           if 'ESTABLISHED' not in line:
             continue
@@ -210,11 +212,9 @@ class NetstatMetric(Metric):
           if len(words) < 8 or words[2] != 'tcp':
             continue
           ts = words[0] + " " + words[1]
-          if not timestamp_format or timestamp_format == 'unknown':
-            timestamp_format = naarad.utils.detect_timestamp_format(ts)
-          if timestamp_format == 'unknown':
+          ts = timestamp_parser.parse(ts)
+          if ts == -1:
             continue
-          ts = naarad.utils.get_standardized_timestamp(ts, timestamp_format)
           if self.ts_out_of_range(ts):
             continue
           # filtering based on user input; (local socket, remote socket, pid/process)
@@ -225,6 +225,8 @@ class NetstatMetric(Metric):
     # post processing, putting data in csv files;
     for csv in data.keys():
       self.csv_files.append(csv)
+      rows = sorted(data[csv])
       with open(csv, 'w') as fh:
-        fh.write('\n'.join(sorted(data[csv])))
+        fh.write('\n'.join(str(ts) + ',' + value for ts, value in rows))
+      self.csv_rows[csv] = rows
     return True
@@ -21,7 +21,9 @@ import os
 import re
 
 from naarad.metrics.metric import Metric
+import naarad.compression
 import naarad.utils
+from naarad.timestamp_parser import TimestampParser
 from naarad.naarad_constants import important_sub_metrics_import
 
 logger = logging.getLogger('naarad.metrics.ProcInterruptsMetric')
@@ -150,8 +152,8 @@ class ProcInterruptsMetric(Metric):
     data = {}
     for input_file in self.infile_list:
       logger.info('Processing : %s', input_file)
-      timestamp_format = None
-      with open(input_file, 'r') as infile:
+      timestamp_parser = TimestampParser()
+      with naarad.compression.open_input(input_file) as infile:
         # Get the header for this file
         cpus = self.find_header(infile)
         if len(cpus) == 0:  # Make sure we have header otherwise go to next file
@@ -172,7 +174,7 @@ class ProcInterruptsMetric(Metric):
               outcsv = self.get_csv('AGGREGATE', eth)
               if outcsv not in data:
                 data[outcsv] = []
-              data[outcsv].append(ts + ',' + str(eth_data[eth]))
+              data[outcsv].append((ts, eth_data[eth]))
             eth_data = {}
             continue
 
@@ -182,11 +184,9 @@ class ProcInterruptsMetric(Metric):
 
           # Process timestamp or determine timestamp
           ts = words[0] + " " + words[1]
-          if not timestamp_format or timestamp_format == 'unknown':
-            timestamp_format = naarad.utils.detect_timestamp_format(ts)
-          if timestamp_format == 'unknown':
+          ts = timestamp_parser.parse(ts)
+          if ts == -1:
             continue
-          ts = naarad.utils.get_standardized_timestamp(ts, timestamp_format)
           if self.ts_out_of_range(ts):  # See if time is in range
             continue
 
@@ -215,7 +215,7 @@ class ProcInterruptsMetric(Metric):
               data[outcsv] = []
               datum = 0  # First data point is set to 0
             # Store data point
-            data[outcsv].append(ts + ',' + str(datum))
+            data[outcsv].append((ts, datum))
 
             # Deal with accumulating aggregate data for Ethernet
             m = re.search("(?P<eth>eth\d)", device)
@@ -228,6 +228,8 @@ class ProcInterruptsMetric(Metric):
     # Post processing, putting data in csv files
     for csv in data.keys():
       self.csv_files.append(csv)
+      rows = sorted(data[csv])
       with open(csv, 'w') as csvf:
-        csvf.write('\n'.join(sorted(data[csv])))
+        csvf.write('\n'.join(str(ts) + ',' + str(datum) for ts, datum in rows))
+      self.csv_rows[csv] = rows
     return True
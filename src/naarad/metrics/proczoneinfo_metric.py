@@ -23,7 +23,9 @@ import os
 import re
 import numpy
 from naarad.metrics.metric import Metric
+import naarad.compression
 import naarad.utils
+from naarad.timestamp_parser import TimestampParser
 
 logger = logging.getLogger('naarad.metrics.ProcZoneinfoMetric')
 
@@ -78,18 +80,16 @@ class ProcZoneinfoMetric(Metric):
     data = {}  # stores the data of each column
     for input_file in self.infile_list:
       logger.info('Processing : %s', input_file)
-      timestamp_format = None
-      with open(input_file) as fh:
+      timestamp_parser = TimestampParser()
+      with naarad.compression.open_input(input_file) as fh:
         for line in fh:
           words = line.replace(',', ' ').split()           # [0] is day; [1] is seconds; [2...] is field names:;
           if len(words) < 3:
             continue
           ts = words[0] + " " + words[1]
-          if not timestamp_format or timestamp_format == 'unknown':
-            timestamp_format = naarad.utils.detect_timestamp_format(ts)
-          if timestamp_format == 'unknown':
+          ts = timestamp_parser.parse(ts)
+          if ts == -1:
             continue
-          ts = naarad.utils.get_standardized_timestamp(ts, timestamp_format)
           if self.ts_out_of_range(ts):
             continue
           if words[2] == 'Node':  # Node 0 zone      DMA
@@ -120,10 +120,12 @@ class ProcZoneinfoMetric(Metric):
           else:
             out_csv = self.get_csv(col)   # column_csv_map[] is assigned in get_csv()
             data[out_csv] = []
-          data[out_csv].append(ts + "," + cur_value)
+          data[out_csv].append((ts, cur_value))
     # post processing, putting data in csv files;
     for csv in data.keys():
       self.csv_files.append(csv)
+      rows = sorted(data[csv])
       with open(csv, 'w') as fh:
-        fh.write('\n'.join(sorted(data[csv])))
+        fh.write('\n'.join(str(ts) + ',' + value for ts, value in rows))
+      self.csv_rows[csv] = rows
     return status
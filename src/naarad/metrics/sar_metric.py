@@ -20,7 +20,10 @@ import logging
 import os
 
 from naarad.metrics.metric import Metric
+import naarad.compression
 import naarad.utils
+from naarad.timestamp_parser import TimestampParser
+from naarad.timezone_converter import TimezoneConverter
 from naarad.naarad_constants import important_sub_metrics_import
 
 logger = logging.getLogger('naarad.metrics.SARMetric')
@@ -77,8 +80,8 @@ class SARMetric(Metric):
       os.makedirs(self.resource_directory)
     data = {}
     for input_file in self.infile_list:
-      timestamp_format = None
-      with open(input_file, 'r') as infile:
+      timestamp_parser = TimestampParser()
+      with naarad.compression.open_input(input_file) as infile:
         line = infile.readline()
         # Pre-processing
         try:
@@ -125,11 +128,9 @@ class SARMetric(Metric):
               new_datetime = old_datetime + datetime.timedelta(days=1)
               date = new_datetime.strftime("%Y-%m-%d")
           datetimestamp = date + ' ' + ts
-          if not timestamp_format or timestamp_format == 'unknown':
-            timestamp_format = naarad.utils.detect_timestamp_format(datetimestamp)
-          if timestamp_format == 'unknown':
+          datetimestamp = timestamp_parser.parse(datetimestamp)
+          if datetimestamp == -1:
             continue
-          datetimestamp = naarad.utils.get_standardized_timestamp(datetimestamp, timestamp_format)
           last_ts = ts
           if self.ts_out_of_range(datetimestamp):
             continue
@@ -145,19 +146,22 @@ class SARMetric(Metric):
             if not naarad.utils.is_number(words[ts_end_index]):
               continue
             device = None
-          datetimestamp = naarad.utils.reconcile_timezones(datetimestamp, self.timezone, self.graph_timezone)
           for i in range(columnstart, len(words)):
             if self.options and columns[i] not in self.options:
               continue
             outcsv = self.get_csv(columns[i], device)
             if outcsv in data:
-              data[outcsv].append(datetimestamp + ',' + words[i])
+              data[outcsv].append((datetimestamp, words[i]))
             else:
               data[outcsv] = []
-              data[outcsv].append(datetimestamp + ',' + words[i])
-    # Post processing, putting data in csv files
+              data[outcsv].append((datetimestamp, words[i]))
+    # Post processing, converting timestamps to the graph timezone and putting data in csv files
+    timezone_converter = TimezoneConverter(self.timezone, self.graph_timezone)
     for csv in data.keys():
       self.csv_files.append(csv)
+      timestamps = timezone_converter.convert([ts for ts, value in data[csv]]).tolist()
+      series = sorted(zip(timestamps, [value for ts, value in data[csv]]))
       with open(csv, 'w') as csvf:
-        csvf.write('\n'.join(sorted(data[csv])))
+        csvf.write('\n'.join(str(ts) + ',' + value for ts, value in series))
+      self.csv_rows[csv] = series
     return True
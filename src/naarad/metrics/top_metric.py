@@ -20,6 +20,7 @@ import os
 import re
 import logging
 from naarad.metrics.metric import Metric
+import naarad.compression
 import naarad.utils
 
 logger = logging.getLogger('naarad.metrics.top_metric')
@@ -91,7 +92,7 @@ class TopMetric(Metric):
       else:
         out_csv = self.get_csv(col)   # column_csv_map[] is assigned in get_csv()
         self.data[out_csv] = []
-      self.data[out_csv].append(self.ts + "," + value)
+      self.data[out_csv].append((self.ts, value))
 
   def process_top_line(self, words):
     """
@@ -246,7 +247,7 @@ class TopMetric(Metric):
       if not file_status:
         return False
 
-      with open(infile) as fh:
+      with naarad.compression.open_input(infile) as fh:
         for line in fh:
           words = line.split()
           if not words:
@@ -281,7 +282,8 @@ class TopMetric(Metric):
     for out_csv in self.data.keys():    # All sub_metrics
       self.csv_files.append(out_csv)
       with open(out_csv, 'w') as fh:
-        fh.write('\n'.join(self.data[out_csv]))
+        fh.write('\n'.join(str(ts) + ',' + value for ts, value in self.data[out_csv]))
+      self.csv_rows[out_csv] = self.data[out_csv]
 
     gc.collect()
     return status
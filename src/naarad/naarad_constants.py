@@ -19,6 +19,69 @@ NAARAD_LOG = 'naarad.log'
 
 # Metric Constants
 DEFAULT_SUMMARY_STATS = ['mean', 'std', 'p50', 'p75', 'p90', 'p95', 'p99', 'min', 'max']
+# Streaming aggregation: percentiles stay exact up to this many values per sub-metric, a quantile sketch is used after
+DEFAULT_EXACT_PERCENTILES_THRESHOLD = 10000
+QUANTILE_SKETCH_COMPRESSION = 100
+# Number of second-resolution timestamps whose epoch value is cached by the timestamp parser
+TIMESTAMP_CACHE_SIZE = 4096
+# Timezone abbreviations accepted for timezone/graph_timezone in addition to IANA zone names
+TIMEZONE_ALIASES = {
+    'PDT': 'US/Pacific',
+    'PST': 'US/Pacific'
+}
+# Number of timestamps converted to graph_timezone at once when parsing
+TIMEZONE_CONVERSION_CHUNK_SIZE = 10000
+# Number of rows of a CSV JTL file read and aggregated at once by the Jmeter metric
+JMETER_CSV_CHUNK_SIZE = 100000
+# Columns of the CSV JTL files written by Jmeter with its default settings, used when a file has no header line
+JMETER_CSV_DEFAULT_COLUMNS = ('timeStamp', 'elapsed', 'label', 'responseCode', 'responseMessage', 'threadName', 'dataType', 'success',
+                              'failureMessage', 'bytes', 'sentBytes', 'grpThreads', 'allThreads', 'URL', 'Latency', 'IdleTime', 'Connect')
+# Suffix of the columnar binary store holding the time series of all the csv files of a metric
+SERIES_STORE_SUFFIX = '.series.npz'
+# Number of parsed csv files of numbers kept in memory for the charts, and bytes of a file scanned at once to parse it
+CSV_COLUMNS_CACHE_SIZE = 64
+CSV_PARSE_CHUNK_SIZE = 1024 ** 2
+# Time series longer than this many points are downsampled for plotting, configurable per metric with plot_points
+DEFAULT_PLOT_POINTS = 4000
+# Smallest plot_points accepted: the first and last points of a series are always kept
+MIN_PLOT_POINTS = 2
+# Suffix of the downsampled companion of a time series csv file, loaded by the client charting page
+DOWNSAMPLED_CSV_SUFFIX = '.ds.csv'
+# Tile pyramid of long time series for the client charting page: resolutions of the levels in ms, number of buckets
+# per chunk file, and names of the tiles directory and of its index
+TILE_RESOLUTIONS = (1000, 10000, 60000, 600000)
+TILE_CHUNK_POINTS = 2000
+TILES_DIRECTORY_SUFFIX = '.tiles'
+TILE_INDEX_FILE = 'index.json'
+# Encodings of the compressed copies of the csv resources written by the report when compress_resources is set
+GZIP_ENCODING = 'gzip'
+BROTLI_ENCODING = 'br'
+GZIP_SUFFIX = '.gz'
+BROTLI_SUFFIX = '.br'
+GZIP_COMPRESSION_LEVEL = 6
+# Compressed inputs are decompressed as they are read in chunks of this many bytes. Inputs can be members of tar
+# archives with these suffixes
+DECOMPRESSION_CHUNK_SIZE = 262144
+TAR_ARCHIVE_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz', '.tar.zst')
+# HTTP downloads: number of worker threads, retries of failed requests and seconds to wait before the first retry
+# (doubled for each retry), size of the chunks streamed to disk, socket timeout in seconds and redirects to follow
+HTTP_DOWNLOAD_WORKERS = 8
+HTTP_DOWNLOAD_RETRIES = 3
+HTTP_DOWNLOAD_BACKOFF = 0.5
+HTTP_DOWNLOAD_CHUNK_SIZE = 65536
+HTTP_DOWNLOAD_TIMEOUT = 60
+HTTP_DOWNLOAD_MAX_REDIRECTS = 5
+# Files of at least this many bytes are downloaded in this many parallel segments from servers which support ranges
+HTTP_SEGMENTED_DOWNLOAD_MIN_SIZE = 64 * 1024 ** 2
+HTTP_DOWNLOAD_SEGMENTS = 4
+# Suffixes of the file of a download in progress and of the validator of its url, used to resume it
+PARTIAL_DOWNLOAD_SUFFIX = '.part'
+PARTIAL_DOWNLOAD_METADATA_SUFFIX = '.json'
+# Download cache of http inputs enabled with --cache_dir: maximum size in bytes, and suffixes of the validators of
+# each entry and of the files being written
+DOWNLOAD_CACHE_MAX_SIZE = 10 * 1024 ** 3
+DOWNLOAD_CACHE_METADATA_SUFFIX = '.json'
+DOWNLOAD_CACHE_TEMPORARY_SUFFIX = '.tmp'
 important_sub_metrics_import = {
     'GC': ('GCPause', 'used', 'cmsIM', 'cmsCM', 'gen0t', 'g1-pause-young', 'g1-pause-mixed', 'g1-pause-remark', 'g1-pause-cleanup'),
     'LINKEDINANDROIDRUM': ('launch_time', 'nus_update_time'),
@@ -59,6 +122,17 @@ TEMPLATE_DIFF_CLIENT_CHARTING = 'default_diff_client_charting_page.html'
 TEMPLATE_DIFF_PAGE = 'default_diff_page.html'
 SUBMETRIC_HEADER = 'sub_metric'
 
+# Executor Constants
+THREAD_EXECUTOR = 'thread'
+PROCESS_EXECUTOR = 'process'
+SUPPORTED_EXECUTORS = (THREAD_EXECUTOR, PROCESS_EXECUTOR)
+DEFAULT_EXECUTOR = THREAD_EXECUTOR
+# Metric attributes sent back from a worker process once a metric has been analyzed
+METRIC_RESULT_ATTRIBUTES = ('infile_list', 'outdir', 'graph_timezone', 'csv_files', 'plot_files', 'stats_files',
+                            'important_stats_files', 'percentiles_files', 'column_csv_map', 'csv_column_map',
+                            'calculated_stats', 'calculated_percentiles', 'sla_list', 'status', 'summary_charts',
+                            'anomalies')
+
 # Graphing constants
 DEFAULT_GRAPHING_LIBRARY = 'matplotlib'
 
@@ -104,6 +178,8 @@ SUPPORTED_FILENAME_MAPPING = {
     'gc.log': 'GC',
     'perf-results.xml': 'JMETER',
     'perf-result.xml': 'JMETER',
+    'perf-results.jtl': 'JMETER',
+    'perf-result.jtl': 'JMETER',
     'proc.vmstat.out': 'PROCVMSTAT',
     'procvmstat.out': 'PROCVMSTAT',
     'proc.meminfo.out': 'PROCMEMINFO',
@@ -23,6 +23,7 @@ import logging
 import os
 import shutil
 from collections import defaultdict
+import naarad.compression
 import naarad.httpdownload
 import naarad.utils
 import naarad.naarad_constants as CONSTANTS
@@ -199,7 +200,7 @@ class Diff(object):
       else:
         for filename in report.datasource:
           try:
-            shutil.copy(os.path.join(os.path.join(report.location, self.resource_path), filename + '.csv'), report.local_location)
+            naarad.compression.copy_resource(os.path.join(os.path.join(report.location, self.resource_path), filename + '.csv'), report.local_location)
           except IOError as exeption:
             continue
     return True
@@ -235,7 +236,7 @@ class Diff(object):
       else:
         for filename in report.cdf_datasource:
           try:
-            shutil.copy(os.path.join(os.path.join(report.location, self.resource_path), filename + '.csv'), report.local_location)
+            naarad.compression.copy_resource(os.path.join(os.path.join(report.location, self.resource_path), filename + '.csv'), report.local_location)
           except IOError as exeption:
             continue
     return True
@@ -269,7 +270,7 @@ class Diff(object):
         naarad.httpdownload.download_url_list(map(lambda x: report.remote_location + '/' + self.resource_path + '/' + x, report.stats), report.local_location)
       else:
           for filename in report.stats:
-            shutil.copy(os.path.join(os.path.join(report.location, self.resource_path), filename), report.local_location)
+            naarad.compression.copy_resource(os.path.join(os.path.join(report.location, self.resource_path), filename), report.local_location)
     return True
 
   def plot_diff(self, graphing_library='matplotlib'):
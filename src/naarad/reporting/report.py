@@ -19,6 +19,7 @@ from jinja2 import Environment, FileSystemLoader
 import logging
 import os
 import shutil
+import naarad.compression
 import naarad.utils
 import naarad.naarad_constants as CONSTANTS
 import naarad.resources
@@ -48,6 +49,11 @@ class Report(object):
     self.client_charting_template = CONSTANTS.TEMPLATE_CLIENT_CHARTING
     self.diff_client_charting_template = CONSTANTS.TEMPLATE_DIFF_CLIENT_CHARTING
     self.diff_page_template = CONSTANTS.TEMPLATE_DIFF_PAGE
+    # encodings of the compressed copies which replace the csv resources once the report is written, e.g. ['gzip', 'br'],
+    # see naarad.compression.compress_file()
+    self.compress_resources = None
+    # whether the metrics write tile pyramids of their long series, which the client charting page loads
+    self.tiles = True
     if other_options:
       for (key, val) in other_options.iteritems():
         setattr(self, key, val)
@@ -114,7 +120,9 @@ class Report(object):
                                                                                                     timeseries_data=sorted(timeseries_csv_list),
                                                                                                     percentiles_data=sorted(percentiles_csv_list),
                                                                                                     summary_enabled=summary_enabled,
-                                                                                                    resource_path=self.resource_path) + '\n'
+                                                                                                    resource_path=self.resource_path,
+                                                                                                    tiles=self.tiles,
+                                                                                                    compressed_resources=bool(self.compress_resources)) + '\n'
     client_charting_html += template_environment.get_template(self.footer_template).render()
     with open(os.path.join(self.resource_directory, CONSTANTS.PLOTS_CSV_LIST_FILE), 'w') as FH:
       FH.write(','.join(sorted(timeseries_csv_list)))
@@ -198,4 +206,6 @@ class Report(object):
       with open(os.path.join(self.resource_directory, CONSTANTS.STATS_CSV_LIST_FILE), 'w') as stats_file:
         stats_file.write(','.join(stats_files))
 
+    if self.compress_resources:
+      naarad.compression.compress_resources(self.resource_directory, self.compress_resources)
     return True
@@ -12,6 +12,15 @@ null
 ];
 var resourcesPrefix = "resources/";
 var resourcesSuffix = ".csv";
+var downsampledSuffix = ".ds.csv";
+var tilesSuffix = ".tiles/";
+var gzipSuffix = ".gz";
+var tileIndexFile = "index.json";
+// set by the client charting page of reports written without tile pyramids, or with compressed csv resources
+var tilesEnabled = true;
+var compressedResources = false;
+// most points a chart loads from the tile pyramid of a series for the range it shows
+var tileTargetPoints = 2000;
 
 function switchDiffTable(metric)
 {
@@ -29,21 +38,222 @@ function plot(selector_id, reset_selector_id, div_id, colorset_id, advanced_sour
 {
     var chart_data_selector = document.getElementById(selector_id);
     var csvURL = chart_data_selector.options[chart_data_selector.selectedIndex].value;
-    var xhr = new XMLHttpRequest();
     var anomaliesURL = csvURL.replace('.csv', '.anomalies.csv');
-    var anomalies = [];
-    var chartObject = timeseriesChartsList[chartIndex];
+    fetchText(anomaliesURL, function(text) {
+        var anomalies = text != null ? text.replace(/\n$/, '').split('\n') : [];
+        loadChartData(csvURL, function(chart_data, tiles) {
+            plotWithAnomalies(selector_id, reset_selector_id, div_id, colorset_id, advanced_source, url_div, anomalies, chart_data, tiles);
+        });
+    });
+}
+
+// Call back with the content of a resource, or null if it cannot be loaded. Reports written with compressed resources
+// only have the .gz variant of their csv files: it is loaded directly when the page says so, and else when the csv
+// file is not found, e.g. for the reports compared by a diff page.
+function fetchText(url, callback)
+{
+    if(!/\.csv$/.test(url)) {
+        requestResource(url, 'text', callback);
+    } else if(compressedResources) {
+        fetchGzipText(url + gzipSuffix, callback);
+    } else {
+        requestResource(url, 'text', function(text) {
+            if(text != null) {
+                callback(text);
+            } else {
+                fetchGzipText(url + gzipSuffix, callback);
+            }
+        });
+    }
+}
+
+function fetchGzipText(url, callback)
+{
+    requestResource(url, 'arraybuffer', function(buffer) {
+        if(buffer == null) {
+            callback(null);
+        } else {
+            gunzip(buffer, callback);
+        }
+    });
+}
+
+function requestResource(url, responseType, callback)
+{
+    var xhr = new XMLHttpRequest();
     xhr.onreadystatechange = function() {
         if(xhr.readyState == xhr.DONE) {
-            anomalies = xhr.responseText.replace(/\n$/, '').split('\n');
-            plotWithAnomalies(selector_id, reset_selector_id, div_id, colorset_id, advanced_source, url_div, anomalies);
+            var size = xhr.response ? (responseType == 'arraybuffer' ? xhr.response.byteLength : xhr.response.length) : 0;
+            // status is 0 for pages opened from the file system
+            if((xhr.status == 200 || xhr.status == 0) && size > 0) {
+                callback(xhr.response);
+            } else {
+                callback(null);
+            }
         }
     }
-    xhr.open('GET', anomaliesURL, true);
-    xhr.send(null);
+    try {
+        xhr.open('GET', url, true);
+        xhr.responseType = responseType;
+        xhr.send(null);
+    } catch(e) {
+        callback(null);
+    }
+}
+
+// Decompress a .gz resource, which is used as is if the web server already decompressed it
+function gunzip(buffer, callback)
+{
+    var bytes = new Uint8Array(buffer);
+    if(bytes.length < 2 || bytes[0] != 0x1f || bytes[1] != 0x8b) {
+        callback(new TextDecoder().decode(bytes));
+        return;
+    }
+    if(typeof DecompressionStream === 'undefined') {
+        callback(null);
+        return;
+    }
+    var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+    new Response(stream).text().then(callback, function() {
+        callback(null);
+    });
 }
 
-function plotWithAnomalies(selector_id, reset_selector_id, div_id, colorset_id, advanced_source, url_div, anomalies)
+// Long time series have a tile pyramid and a downsampled companion csv which are charted instead of the full
+// resolution csv. The callback gets the coarsest level of the tile pyramid along with the state of the tiles of the
+// chart, or else the content of the downsampled csv, or else the content of the full resolution csv, or else its url.
+function loadChartData(csvURL, callback)
+{
+    if(!tilesEnabled) {
+        loadSeriesData(csvURL, callback);
+        return;
+    }
+    var tiles = {url: csvURL.replace(/\.csv$/, tilesSuffix), cache: {}};
+    fetchText(tiles.url + tileIndexFile, function(text) {
+        if(text != null) {
+            tiles.index = JSON.parse(text);
+            var coarsest = tiles.index.levels[tiles.index.levels.length - 1];
+            tiles.key = coarsest.resolution + ":";
+            loadTileChunks(tiles, coarsest, coarsest.chunks, function(rows) {
+                tiles.overview = rows;
+                callback(rows, tiles);
+            });
+        } else {
+            loadSeriesData(csvURL, callback);
+        }
+    });
+}
+
+// Call back with the content of the downsampled csv of a series, or else of its full resolution csv, or else its url
+function loadSeriesData(csvURL, callback)
+{
+    fetchText(csvURL.replace(/\.csv$/, downsampledSuffix), function(text) {
+        if(text != null) {
+            callback(text, null);
+            return;
+        }
+        fetchText(csvURL, function(text) {
+            callback(text != null ? text : csvURL, null);
+        });
+    });
+}
+
+// Load chunks of a level of a tile pyramid and call back with their rows, chunks are only fetched once per chart
+function loadTileChunks(tiles, level, chunks, callback)
+{
+    var pending = chunks.length;
+    var loaded = [];
+    if(pending == 0) {
+        callback([]);
+        return;
+    }
+    chunks.forEach(function(chunk, i) {
+        var url = tiles.url + level.resolution + "." + chunk + ".csv";
+        var chunkLoaded = function(rows) {
+            tiles.cache[url] = rows;
+            loaded[i] = rows;
+            pending--;
+            if(pending == 0) {
+                callback([].concat.apply([], loaded));
+            }
+        };
+        if(url in tiles.cache) {
+            chunkLoaded(tiles.cache[url]);
+        } else {
+            fetchText(url, function(text) {
+                chunkLoaded(parseTileRows(text));
+            });
+        }
+    });
+}
+
+// Tile rows are timestamp,min,avg,max which dygraphs draws as a line with a min/max band (customBars)
+function parseTileRows(text)
+{
+    var rows = [];
+    if(text == null) {
+        return rows;
+    }
+    var lines = text.replace(/\n$/, '').split('\n');
+    for(var i = 0; i < lines.length; i++) {
+        var fields = lines[i].split(",");
+        rows.push([parseInt(fields[0]), [parseFloat(fields[1]), parseFloat(fields[2]), parseFloat(fields[3])]]);
+    }
+    return rows;
+}
+
+// Chart the finest level of the tile pyramid which fits the range with at most tileTargetPoints points. Only the
+// chunks of the range are loaded, the coarsest level is kept for the rest of the chart.
+function refineTiles(chart, range)
+{
+    var tiles = chart.tiles;
+    if(!tiles) {
+        return;
+    }
+    var levels = tiles.index.levels;
+    var level = levels[levels.length - 1];
+    for(var i = 0; range && i < levels.length - 1; i++) {
+        if((range[1] - range[0]) / levels[i].resolution <= tileTargetPoints) {
+            level = levels[i];
+            break;
+        }
+    }
+    var span = level.resolution * tiles.index.chunk_points;
+    var chunks = [];
+    if(level != levels[levels.length - 1]) {
+        var first = Math.floor(range[0] / span);
+        var last = Math.floor(range[1] / span);
+        chunks = level.chunks.filter(function(chunk) {
+            return chunk >= first && chunk <= last;
+        });
+    }
+    var key = level.resolution + ":" + chunks.join(",");
+    if(key == tiles.key) {
+        return;
+    }
+    tiles.key = key;
+    if(chunks.length == 0) {
+        chart.updateOptions({file: tiles.overview});
+        return;
+    }
+    loadTileChunks(tiles, level, chunks, function(rows) {
+        // the range changed while the chunks were loading
+        if(tiles.key != key) {
+            return;
+        }
+        var start = chunks[0] * span;
+        var end = (chunks[chunks.length - 1] + 1) * span;
+        var before = tiles.overview.filter(function(row) {
+            return row[0] < start;
+        });
+        var after = tiles.overview.filter(function(row) {
+            return row[0] >= end;
+        });
+        chart.updateOptions({file: before.concat(rows, after)});
+    });
+}
+
+function plotWithAnomalies(selector_id, reset_selector_id, div_id, colorset_id, advanced_source, url_div, anomalies, chart_data, tiles)
 {
   document.getElementById(reset_selector_id).selectedIndex=0;
   var chartIndex = parseInt(selector_id.split("-")[2]);
@@ -57,7 +267,7 @@ function plotWithAnomalies(selector_id, reset_selector_id, div_id, colorset_id,
   var div_height = document.getElementById(div_id).clientHeight;
   var blockRedraw = false;
   var initial = true;
-  var chart_1 = new Dygraph(document.getElementById(div_id), chart_data_source,
+  var chart_1 = new Dygraph(document.getElementById(div_id), chart_data || chart_data_source,
   {
     height : window.screen.height*0.75/2,
     width : div_width,
@@ -83,6 +293,7 @@ function plotWithAnomalies(selector_id, reset_selector_id, div_id, colorset_id,
     labels: [ "Time", chart_data_title],
     labelsDiv: "labels-" + div_id,
     dateWindow: syncRange,
+    customBars: tiles != null,
     underlayCallback: function(canvas, area, chart_1) {
         for(var i=0; i<anomalies.length; i++)
         {
@@ -111,14 +322,25 @@ function plotWithAnomalies(selector_id, reset_selector_id, div_id, colorset_id,
             });
         }
       }
+      for (var i = 0; i < timeseriesChartsList.length; i++)
+      {
+        if (timeseriesChartsList[i] != null)
+        {
+            refineTiles(timeseriesChartsList[i], syncRange);
+        }
+      }
     updateShareUrl();
     blockRedraw = false;
     }
   }
   );
+  // the data of the chart may be the content of a downsampled csv or tiles, the share url has the csv url
+  chart_1.csvURL = chart_data_source;
+  chart_1.tiles = tiles;
   chartsList[chartIndex] = chart_1;
   timeseriesChartsList[chartIndex] = chart_1;
   cdfChartsList[chartIndex] = null;
+  refineTiles(chart_1, syncRange);
   updateShareUrl();
 }
 
@@ -131,28 +353,31 @@ function plotCdf(selector_id, reset_selector_id, div_id, colorset_id, advanced_s
   var chart_data_title = "" ;
   chart_data_source = chart_data_selector.options[chart_data_selector.selectedIndex].value;
   chart_data_title = chart_data_selector.options[chart_data_selector.selectedIndex].text;
-  document.getElementById(url_div).innerHTML = "<a href=" + chart_data_source + " class=\"btn btn-primary btn-csv\" target=\"_blank\">Download CSV</a>"
+  document.getElementById(url_div).innerHTML = "<a href=\"javascript:downloadResource('" + chart_data_source + "');\" class=\"btn btn-primary btn-csv\" target=\"_blank\">Download CSV</a>"
   var div_width = document.getElementById(div_id).clientWidth;
   var div_height = document.getElementById(div_id).clientHeight;
-  chart_1 = new Dygraph(document.getElementById(div_id), chart_data_source,
-  {
-    axes : {
-      y : {
-            drawGrid: true
-          }
-    },
-    legend: 'always',
-    xlabel: "Percentiles",
-    colors: colorSets[colorset_id],
-    labels: [ "Percentiles", chart_data_title],
-    labelsDiv: "labels-" + div_id
-  }
-  );
-  chart_1.resize(div_width, window.screen.height*0.75/2);
-  chartsList[chartIndex] = chart_1;
-  cdfChartsList[chartIndex] = chart_1;
-  timeseriesChartsList[chartIndex] = null;
-  updateShareUrl();
+  fetchText(chart_data_source, function(chart_data) {
+    chart_1 = new Dygraph(document.getElementById(div_id), chart_data || chart_data_source,
+    {
+      axes : {
+        y : {
+              drawGrid: true
+            }
+      },
+      legend: 'always',
+      xlabel: "Percentiles",
+      colors: colorSets[colorset_id],
+      labels: [ "Percentiles", chart_data_title],
+      labelsDiv: "labels-" + div_id
+    }
+    );
+    chart_1.resize(div_width, window.screen.height*0.75/2);
+    chart_1.csvURL = chart_data_source;
+    chartsList[chartIndex] = chart_1;
+    cdfChartsList[chartIndex] = chart_1;
+    timeseriesChartsList[chartIndex] = null;
+    updateShareUrl();
+  });
 }
 
 function addChart(container_div)
@@ -236,7 +461,7 @@ function saveChartState()
   {
         if (chartsList[i] != null)
         {
-           chartState += chartsList[i].file_ + "," ;
+           chartState += (chartsList[i].csvURL || chartsList[i].file_) + "," ;
         }
   } 
   chartState = chartState.replace(/,$/,"");
@@ -385,13 +610,12 @@ function resetFilter(timeseriesSelector, cdfSelector, filterId)
 
 function convertCSVTimeStamp(csvURL)
 {
-    var xhr = new XMLHttpRequest();
     var csvData = '';
     var url = csvURL.split("/");
     var fileName = url[url.length - 1];
-    xhr.onreadystatechange = function() {
-        if(xhr.readyState == xhr.DONE) {
-            var lines = xhr.responseText.split("\n");
+    fetchText(csvURL, function(text) {
+        if(text != null) {
+            var lines = text.split("\n");
             for(var i=0; i< lines.length; i++)
             {
                 var lineData = lines[i].split(",");
@@ -404,9 +628,17 @@ function convertCSVTimeStamp(csvURL)
             }
             download(csvData,fileName, 'text/csv');
         }
-    }
-    xhr.open('GET', csvURL, true);
-    xhr.send(null);
+    });
+}
+
+function downloadResource(csvURL)
+{
+    var url = csvURL.split("/");
+    fetchText(csvURL, function(text) {
+        if(text != null) {
+            download(text, url[url.length - 1], 'text/csv');
+        }
+    });
 }
 
 function download(content, filename, contentType)
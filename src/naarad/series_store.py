@@ -0,0 +1,207 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import logging
+import os
+import struct
+import threading
+import zipfile
+import numpy
+from naarad.graphing.csv_reader import read_columns
+import naarad.naarad_constants as CONSTANTS
+from naarad.timestamp_parser import TimestampParser
+
+logger = logging.getLogger('naarad.series_store')
+
+# opened stores by path, along with the inode and mtime of the file they were opened from
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def to_arrays(rows, csv_file):
+  """
+  Convert the (timestamp, value) rows of a time series to numpy arrays. Rows which cannot be converted are ignored.
+
+  :param list rows: (timestamp, value) pairs, with timestamps in epoch ms. Both can be strings, formatted timestamps are parsed
+  :param string csv_file: path of the csv file the rows are written to, used for logging
+  :return: tuple of numpy int64 timestamps array and numpy float64 values array
+  """
+  try:
+    timestamps = numpy.array([row[0] for row in rows], dtype=numpy.int64)
+    values = numpy.array([row[1] for row in rows], dtype=numpy.float64)
+    return timestamps, values
+  except (ValueError, TypeError, IndexError):
+    pass
+  timestamps = []
+  values = []
+  timestamp_parser = TimestampParser()
+  for row in rows:
+    try:
+      value = float(row[1])
+    except (ValueError, TypeError, IndexError):
+      continue
+    try:
+      timestamp = int(row[0])
+    except TypeError:
+      continue
+    except ValueError:
+      # csv files written by other tools may have formatted timestamps
+      timestamp = timestamp_parser.parse(row[0].strip())
+      if timestamp == -1:
+        continue
+    timestamps.append(timestamp)
+    values.append(value)
+  if len(values) < len(rows):
+    logger.error("Cannot convert to float. Some data is ignored in file " + csv_file)
+  return numpy.array(timestamps, dtype=numpy.int64), numpy.array(values, dtype=numpy.float64)
+
+
+def read_csv(csv_file):
+  """
+  Read a time series from a csv file with epoch ms timestamps in the first column and values in the second one
+  """
+  columns = read_columns(csv_file)
+  if columns is not None and len(columns) >= 2:
+    return columns[0].astype(numpy.int64), columns[1]
+  with open(csv_file, 'r') as FH:
+    return to_arrays([line.split(',', 2) for line in FH], csv_file)
+
+
+def write_store(store_file, series):
+  """
+  Write the time series of a metric to a store file. The file is an uncompressed npz archive holding the names of the
+  csv files, the offsets of their series and the timestamps and values of all of them concatenated in two arrays.
+
+  :param string store_file: path of the store file
+  :param dict series: csv file path to (timestamps, values) tuple
+  :return: None
+  """
+  names = sorted(series.keys())
+  offsets = numpy.zeros(len(names) + 1, dtype=numpy.int64)
+  for index, name in enumerate(names):
+    offsets[index + 1] = offsets[index] + len(series[name][0])
+  timestamps = numpy.concatenate([numpy.asarray(series[name][0], dtype=numpy.int64) for name in names] or [numpy.zeros(0, dtype=numpy.int64)])
+  values = numpy.concatenate([numpy.asarray(series[name][1], dtype=numpy.float64) for name in names] or [numpy.zeros(0)])
+  # Written under a temporary name and renamed so that readers in other processes never see a partial file
+  tmp_store_file = store_file + '.tmp'
+  with open(tmp_store_file, 'wb') as FH:
+    numpy.savez(FH, names=numpy.array([os.path.basename(name) for name in names], dtype=str), offsets=offsets, timestamps=timestamps,
+                values=values)
+  os.rename(tmp_store_file, store_file)
+
+
+def _map_array(store_file, zip_file, name):
+  """
+  Memory-map an array stored uncompressed in an npz archive
+
+  :return: read-only numpy memmap, or a numpy array read from the archive if the array is compressed or empty
+  """
+  info = zip_file.getinfo(name + '.npy')
+  if info.compress_type == zipfile.ZIP_STORED and info.file_size:
+    with open(store_file, 'rb') as FH:
+      FH.seek(info.header_offset)
+      local_header = FH.read(30)
+      name_length, extra_length = struct.unpack('<HH', local_header[26:30])
+      FH.seek(info.header_offset + 30 + name_length + extra_length)
+      version = numpy.lib.format.read_magic(FH)
+      if version == (1, 0):
+        shape, fortran_order, dtype = numpy.lib.format.read_array_header_1_0(FH)
+      else:
+        shape, fortran_order, dtype = numpy.lib.format.read_array_header_2_0(FH)
+      offset = FH.tell()
+    if numpy.prod(shape):
+      return numpy.memmap(store_file, dtype=dtype, mode='r', offset=offset, shape=shape, order='F' if fortran_order else 'C')
+  with zip_file.open(name + '.npy') as FH:
+    return numpy.lib.format.read_array(FH)
+
+
+class SeriesStore(object):
+  """
+  Read-only view of a store file. Timestamps and values are memory-mapped, the series returned are slices of them so
+  nothing is copied or parsed when they are read.
+  """
+
+  def __init__(self, store_file):
+    self.store_file = store_file
+    with zipfile.ZipFile(store_file) as zip_file:
+      names = _map_array(store_file, zip_file, 'names').tolist()
+      offsets = _map_array(store_file, zip_file, 'offsets').tolist()
+      self.timestamps = _map_array(store_file, zip_file, 'timestamps')
+      self.values = _map_array(store_file, zip_file, 'values')
+    self.index = dict((name, (offsets[i], offsets[i + 1])) for i, name in enumerate(names))
+
+  def __contains__(self, csv_file):
+    return os.path.basename(csv_file) in self.index
+
+  def get(self, csv_file):
+    """
+    :param string csv_file: path of the csv file
+    :return: tuple of int64 timestamps and float64 values arrays, or None if the store does not have the csv file
+    """
+    if csv_file not in self:
+      return None
+    start, end = self.index[os.path.basename(csv_file)]
+    return self.timestamps[start:end], self.values[start:end]
+
+
+def open_store(store_file):
+  """
+  Return the SeriesStore of a store file, opened once per process and reopened when the file is rewritten
+
+  :return: SeriesStore or None if the file does not exist
+  """
+  try:
+    stat = os.stat(store_file)
+  except OSError:
+    return None
+  # store files are replaced by a rename, so a rewritten store always has a new inode
+  version = (stat.st_ino, stat.st_mtime)
+  with _stores_lock:
+    store, store_version = _stores.get(store_file, (None, None))
+    if store is None or store_version != version:
+      store = SeriesStore(store_file)
+      _stores[store_file] = (store, version)
+    return store
+
+
+def find_store(csv_file):
+  """
+  Find the store holding a csv file. The store of a metric is named after its label, which is a prefix of the names of
+  its csv files
+
+  :return: SeriesStore or None
+  """
+  directory, csv_filename = os.path.split(csv_file)
+  words = csv_filename.split('.')
+  for i in range(len(words) - 1, 0, -1):
+    store = open_store(os.path.join(directory, '.'.join(words[:i]) + CONSTANTS.SERIES_STORE_SUFFIX))
+    if store is not None and csv_file in store:
+      return store
+  return None
+
+
+def read_series(csv_file):
+  """
+  Read a time series, from the store of the metric which wrote the csv file if there is one or from the csv file itself
+
+  :param string csv_file: path of the csv file
+  :return: tuple of numpy int64 timestamps array and numpy float64 values array
+  """
+  store = find_store(csv_file)
+  if store is not None:
+    return store.get(csv_file)
+  return read_csv(csv_file)
@@ -0,0 +1,271 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import logging
+import math
+import numpy
+import naarad.utils
+import naarad.naarad_constants as CONSTANTS
+
+logger = logging.getLogger('naarad.streaming_stats')
+
+
+class QuantileSketch(object):
+  """
+  Mergeable quantile sketch (merging t-digest). Values are summarized as a bounded number of weighted centroids, small
+  near the tails and larger around the median, so memory use is O(compression) whatever the number of values added.
+  """
+
+  def __init__(self, compression=CONSTANTS.QUANTILE_SKETCH_COMPRESSION):
+    self.compression = compression
+    self.count = 0
+    self.min = None
+    self.max = None
+    self._centroids = []   # sorted list of [mean, weight]
+    self._buffer = []
+    self._buffer_size = 5 * compression
+
+  def add(self, value, weight=1):
+    """
+    Add a value to the sketch
+    :param float value: value to add
+    :param int weight: number of occurrences of the value
+    """
+    self._buffer.append([value, weight])
+    self.count += weight
+    if self.min is None or value < self.min:
+      self.min = value
+    if self.max is None or value > self.max:
+      self.max = value
+    if len(self._buffer) >= self._buffer_size:
+      self._compress()
+
+  def add_values(self, values, weights):
+    """
+    Add an array of values to the sketch at once
+    :param values: list or numpy array of values to add
+    :param weights: list or numpy array of the number of occurrences of each value
+    """
+    values = numpy.asarray(values, dtype=numpy.float64)
+    if len(values) == 0:
+      return
+    self._buffer.extend([value, weight] for value, weight in zip(values.tolist(), numpy.asarray(weights).tolist()))
+    self.count += int(numpy.sum(weights))
+    if self.min is None or values.min() < self.min:
+      self.min = float(values.min())
+    if self.max is None or values.max() > self.max:
+      self.max = float(values.max())
+    if len(self._buffer) >= self._buffer_size:
+      self._compress()
+
+  def merge(self, other):
+    """
+    Merge the values summarized by another sketch into this one
+    :param QuantileSketch other: sketch to merge
+    """
+    if other.count == 0:
+      return
+    other._compress()
+    self._buffer.extend([mean, weight] for mean, weight in other._centroids)
+    self.count += other.count
+    if self.min is None or other.min < self.min:
+      self.min = other.min
+    if self.max is None or other.max > self.max:
+      self.max = other.max
+    self._compress()
+
+  def _compress(self):
+    if not self._buffer:
+      return
+    centroids = sorted(self._centroids + self._buffer)
+    self._buffer = []
+    merged = [list(centroids[0])]
+    weight_so_far = 0
+    for mean, weight in centroids[1:]:
+      current = merged[-1]
+      new_weight = current[1] + weight
+      q = (weight_so_far + new_weight / 2.0) / self.count
+      if new_weight <= 4 * self.count * q * (1 - q) / self.compression:
+        current[0] += (mean - current[0]) * weight / new_weight
+        current[1] = new_weight
+      else:
+        weight_so_far += current[1]
+        merged.append([mean, weight])
+    self._centroids = merged
+
+  def quantile(self, q):
+    """
+    Estimate the value at quantile q. Ranks are interpolated linearly between centroids in the same way as
+    numpy.percentile interpolates between values, so results are exact while every centroid holds a single value.
+    :param float q: quantile between 0 and 1
+    :return: estimated value or None if the sketch is empty
+    """
+    if self.count == 0:
+      return None
+    self._compress()
+    rank = q * (self.count - 1)
+    previous_rank, previous_value = 0.0, self.min
+    weight_so_far = 0
+    for mean, weight in self._centroids:
+      centroid_rank = weight_so_far + (weight - 1) / 2.0
+      if rank <= centroid_rank:
+        return self._interpolate(rank, previous_rank, previous_value, centroid_rank, mean)
+      previous_rank, previous_value = centroid_rank, mean
+      weight_so_far += weight
+    return self._interpolate(rank, previous_rank, previous_value, self.count - 1, self.max)
+
+  @staticmethod
+  def _interpolate(rank, left_rank, left_value, right_rank, right_value):
+    if right_rank <= left_rank:
+      return right_value
+    return left_value + (right_value - left_value) * (rank - left_rank) / (right_rank - left_rank)
+
+
+class StreamingStats(object):
+  """
+  Incrementally computes count, mean, std, min, max and percentiles of a stream of values in bounded memory. Values are
+  kept as-is until more than exact_threshold have been added, so that small inputs still get exact percentiles; after
+  that percentiles are estimated with a QuantileSketch.
+  """
+
+  stats_aliases = {
+      'avg': 'mean',
+      'standard_deviation': 'std'
+  }
+
+  def __init__(self, exact_threshold=CONSTANTS.DEFAULT_EXACT_PERCENTILES_THRESHOLD, compression=CONSTANTS.QUANTILE_SKETCH_COMPRESSION):
+    self.exact_threshold = exact_threshold
+    self.count = 0
+    self.mean = 0.0
+    self.min = None
+    self.max = None
+    self._m2 = 0.0
+    self.values = []
+    self.sketch = QuantileSketch(compression)
+
+  def add(self, value):
+    self.count += 1
+    delta = value - self.mean
+    self.mean += delta / self.count
+    self._m2 += delta * (value - self.mean)
+    if self.min is None or value < self.min:
+      self.min = value
+    if self.max is None or value > self.max:
+      self.max = value
+    if self.values is not None:
+      self.values.append(value)
+      if len(self.values) > self.exact_threshold:
+        self._switch_to_sketch()
+    else:
+      self.sketch.add(value)
+
+  def add_values(self, values):
+    """
+    Add an array of values at once. Count, mean and variance of the array are computed with numpy and combined with
+    the current ones the same way merge() does
+    :param values: list or numpy array of values to add
+    """
+    values = numpy.asarray(values, dtype=numpy.float64)
+    if len(values) == 0:
+      return
+    values_mean = float(values.mean())
+    values_min = float(values.min())
+    values_max = float(values.max())
+    count = self.count + len(values)
+    delta = values_mean - self.mean
+    self.mean += delta * len(values) / count
+    self._m2 += ((values - values_mean) ** 2).sum() + delta * delta * self.count * len(values) / count
+    self.count = count
+    if self.min is None or values_min < self.min:
+      self.min = values_min
+    if self.max is None or values_max > self.max:
+      self.max = values_max
+    if self.values is not None:
+      self.values.extend(values.tolist())
+      if len(self.values) > self.exact_threshold:
+        self._switch_to_sketch()
+    else:
+      self.sketch.add_values(*numpy.unique(values, return_counts=True))
+
+  def merge(self, other):
+    """
+    Merge the values summarized by another StreamingStats into this one
+    :param StreamingStats other: stats to merge
+    """
+    if other.count == 0:
+      return
+    count = self.count + other.count
+    delta = other.mean - self.mean
+    self.mean += delta * other.count / count
+    self._m2 += other._m2 + delta * delta * self.count * other.count / count
+    self.count = count
+    if self.min is None or other.min < self.min:
+      self.min = other.min
+    if self.max is None or other.max > self.max:
+      self.max = other.max
+    if self.values is not None and other.values is not None and len(self.values) + len(other.values) <= self.exact_threshold:
+      self.values.extend(other.values)
+      return
+    self._switch_to_sketch()
+    if other.values is not None:
+      for value in other.values:
+        self.sketch.add(value)
+    else:
+      self.sketch.merge(other.sketch)
+
+  def _switch_to_sketch(self):
+    if self.values is None:
+      return
+    self.sketch.add_values(*numpy.unique(self.values, return_counts=True))
+    self.values = None
+
+  def is_exact(self):
+    return self.values is not None
+
+  def get_stats(self, stats_to_calculate=['mean', 'std'], percentiles_to_calculate=[]):
+    """
+    Return the stats in the same form as naarad.utils.calculate_stats()
+    :param list stats_to_calculate: List of strings with statistics to calculate
+    :param list percentiles_to_calculate: List of ints or floats that defines which percentiles to calculate
+    :return: tuple of dictionaries containing calculated statistics and percentiles
+    """
+    if self.values is not None:
+      return naarad.utils.calculate_stats(self.values, stats_to_calculate, percentiles_to_calculate)
+    calculated_stats = {}
+    calculated_percentiles = {}
+    if self.count == 0:
+      return calculated_stats, calculated_percentiles
+    for stat in stats_to_calculate:
+      stat_name = self.stats_aliases.get(stat, stat)
+      if stat_name == 'mean':
+        calculated_stats[stat] = self.mean
+      elif stat_name == 'std':
+        calculated_stats[stat] = math.sqrt(self._m2 / self.count)
+      elif stat_name == 'median':
+        calculated_stats[stat] = self.sketch.quantile(0.5)
+      elif stat_name == 'min':
+        calculated_stats[stat] = self.min
+      elif stat_name == 'max':
+        calculated_stats[stat] = self.max
+      else:
+        logger.error("Unsupported stat : " + str(stat))
+    for percentile in percentiles_to_calculate:
+      if isinstance(percentile, float) or isinstance(percentile, int):
+        calculated_percentiles[percentile] = self.sketch.quantile(percentile / 100.0)
+      else:
+        logger.error("Unsupported percentile requested (should be int or float): " + str(percentile))
+    return calculated_stats, calculated_percentiles
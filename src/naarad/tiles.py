@@ -0,0 +1,90 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import logging
+import os
+import shutil
+import numpy
+import naarad.naarad_constants as CONSTANTS
+
+logger = logging.getLogger('naarad.tiles')
+
+
+def aggregate(timestamps, values, resolution):
+  """
+  Aggregate a time series in buckets of the given resolution
+
+  :param timestamps: numpy array of epoch ms timestamps
+  :param values: numpy array of values
+  :param int resolution: bucket width in ms
+  :return: tuple of numpy arrays of the bucket start timestamps and of the minimum, average and maximum of each bucket
+  """
+  timestamps = numpy.asarray(timestamps, dtype=numpy.int64)
+  values = numpy.asarray(values, dtype=numpy.float64)
+  if len(timestamps) > 1 and numpy.any(timestamps[1:] < timestamps[:-1]):
+    order = numpy.argsort(timestamps, kind='mergesort')
+    timestamps = timestamps[order]
+    values = values[order]
+  buckets, starts, counts = numpy.unique(timestamps // resolution * resolution, return_index=True, return_counts=True)
+  if not len(buckets):
+    return buckets, values, values, values
+  return (buckets, numpy.minimum.reduceat(values, starts), numpy.add.reduceat(values, starts) / counts,
+          numpy.maximum.reduceat(values, starts))
+
+
+def get_tiles_directory(csv_file):
+  return os.path.splitext(csv_file)[0] + CONSTANTS.TILES_DIRECTORY_SUFFIX
+
+
+def write_tiles(csv_file, timestamps, values, points=CONSTANTS.DEFAULT_PLOT_POINTS, resolutions=CONSTANTS.TILE_RESOLUTIONS,
+                chunk_points=CONSTANTS.TILE_CHUNK_POINTS):
+  """
+  Write the tile pyramid of a time series csv file for the client charting page. Each level of the pyramid has the
+  minimum, average and maximum of the series in buckets of one of the resolutions, and is split in chunk files of
+  chunk_points buckets so that the page only loads the chunks of the range it shows. Levels which would not have fewer
+  points than the level below are skipped, except the coarsest one. The tiles are written in a directory next to the
+  csv file along with an index of the levels and their chunks.
+
+  :param string csv_file: path of the full resolution csv file
+  :param int points: series with no more points than this are small enough to be charted at once and get no tiles
+  :return: path of the tiles directory or None if no tiles were written
+  """
+  if points is None or len(values) <= points:
+    return None
+  tiles_directory = get_tiles_directory(csv_file)
+  if os.path.exists(tiles_directory):
+    shutil.rmtree(tiles_directory)
+  os.makedirs(tiles_directory)
+  levels = []
+  previous_count = None
+  for index, resolution in enumerate(sorted(resolutions)):
+    buckets, minimums, averages, maximums = aggregate(timestamps, values, resolution)
+    if previous_count is not None and len(buckets) >= previous_count and index < len(resolutions) - 1:
+      continue
+    previous_count = len(buckets)
+    chunks, chunk_starts = numpy.unique(buckets // (resolution * chunk_points), return_index=True)
+    chunk_ends = numpy.append(chunk_starts[1:], len(buckets))
+    rows = zip(buckets.tolist(), minimums.tolist(), averages.tolist(), maximums.tolist())
+    for chunk, start, end in zip(chunks.tolist(), chunk_starts.tolist(), chunk_ends.tolist()):
+      with open(os.path.join(tiles_directory, '%d.%d.csv' % (resolution, chunk)), 'w') as FH:
+        FH.writelines('%d,%r,%r,%r\n' % row for row in rows[start:end])
+    levels.append({'resolution': resolution, 'chunks': chunks.tolist()})
+  with open(os.path.join(tiles_directory, CONSTANTS.TILE_INDEX_FILE), 'w') as FH:
+    json.dump({'chunk_points': chunk_points, 'levels': levels}, FH)
+  logger.info('Wrote %d tile levels of %s in %s', len(levels), csv_file, tiles_directory)
+  return tiles_directory
@@ -0,0 +1,189 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import calendar
+from collections import OrderedDict
+import datetime
+import logging
+import re
+import threading
+# datetime.strptime lazily imports _strptime, which is not thread safe: import it before any parser thread uses strptime
+import _strptime
+import naarad.naarad_constants as CONSTANTS
+
+logger = logging.getLogger('naarad.timestamp_parser')
+
+# Supported timestamp formats, in the order they are tried
+TIME_FORMATS = (
+    ('epoch', re.compile(r'^[0-9]{10}$')),
+    ('epoch_ms', re.compile(r'^[0-9]{13}$')),
+    ('epoch_fraction', re.compile(r'^[0-9]{10}\.[0-9]{3,9}$')),
+    ('%Y-%m-%d %H:%M:%S', re.compile(r'^[0-9]{4}-[0-1][0-9]-[0-3][0-9] [0-2][0-9]:[0-5][0-9]:[0-5][0-9]$')),
+    ('%Y-%m-%dT%H:%M:%S', re.compile(r'^[0-9]{4}-[0-1][0-9]-[0-3][0-9]T[0-2][0-9]:[0-5][0-9]:[0-5][0-9]$')),
+    ('%Y-%m-%d_%H:%M:%S', re.compile(r'^[0-9]{4}-[0-1][0-9]-[0-3][0-9]_[0-2][0-9]:[0-5][0-9]:[0-5][0-9]$')),
+    ('%Y-%m-%d %H:%M:%S.%f', re.compile(r'^[0-9]{4}-[0-1][0-9]-[0-3][0-9] [0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]+$')),
+    ('%Y-%m-%dT%H:%M:%S.%f', re.compile(r'^[0-9]{4}-[0-1][0-9]-[0-3][0-9]T[0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]+$')),
+    ('%Y-%m-%d_%H:%M:%S.%f', re.compile(r'^[0-9]{4}-[0-1][0-9]-[0-3][0-9]_[0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]+$')),
+    ('%Y%m%d %H:%M:%S', re.compile(r'^[0-9]{4}[0-1][0-9][0-3][0-9] [0-2][0-9]:[0-5][0-9]:[0-5][0-9]$')),
+    ('%Y%m%dT%H:%M:%S', re.compile(r'^[0-9]{4}[0-1][0-9][0-3][0-9]T[0-2][0-9]:[0-5][0-9]:[0-5][0-9]$')),
+    ('%Y%m%d_%H:%M:%S', re.compile(r'^[0-9]{4}[0-1][0-9][0-3][0-9]_[0-2][0-9]:[0-5][0-9]:[0-5][0-9]$')),
+    ('%Y%m%d %H:%M:%S.%f', re.compile(r'^[0-9]{4}[0-1][0-9][0-3][0-9] [0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]+$')),
+    ('%Y%m%dT%H:%M:%S.%f', re.compile(r'^[0-9]{4}[0-1][0-9][0-3][0-9]T[0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]+$')),
+    ('%Y%m%d_%H:%M:%S.%f', re.compile(r'^[0-9]{4}[0-1][0-9][0-3][0-9]_[0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]+$')),
+    ('%H:%M:%S', re.compile(r'^[0-2][0-9]:[0-5][0-9]:[0-5][0-9]$')),
+    ('%H:%M:%S.%f', re.compile(r'^[0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]+$')),
+    ('%Y-%m-%dT%H:%M:%S.%f%z', re.compile(r'^[0-9]{4}-[0-1][0-9]-[0-3][0-9]T[0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]+[+-][0-9]{4}$'))
+)
+
+# Formats with a fixed width YYYY-mm-dd?HH:MM:SS prefix, parsed by hand instead of through strptime
+FAST_PATH_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d_%H:%M:%S',
+                     '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%d_%H:%M:%S.%f')
+_TIME_FORMAT_REGEXES = dict(TIME_FORMATS)
+
+
+class LRUCache(object):
+  """
+  Thread safe dict-like cache that holds the maxsize most recently used entries
+  """
+
+  def __init__(self, maxsize):
+    self.maxsize = maxsize
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key):
+    with self._lock:
+      value = self._entries.pop(key, None)
+      if value is not None:
+        self._entries[key] = value
+      return value
+
+  def put(self, key, value):
+    with self._lock:
+      self._entries.pop(key, None)
+      self._entries[key] = value
+      if len(self._entries) > self.maxsize:
+        self._entries.popitem(last=False)
+
+  def __len__(self):
+    return len(self._entries)
+
+
+# epoch seconds by (second-resolution timestamp prefix, format)
+_epoch_seconds_cache = LRUCache(CONSTANTS.TIMESTAMP_CACHE_SIZE)
+
+
+def detect_timestamp_format(timestamp):
+  """
+  Given an input timestamp string, determine what format is it likely in.
+
+  :param string timestamp: the timestamp string for which we need to determine format
+  :return: best guess timestamp format
+  """
+  for time_format, time_format_regex in TIME_FORMATS:
+    if time_format_regex.match(timestamp):
+      return time_format
+  return 'unknown'
+
+
+def _get_epoch_seconds(timestamp, ts_format):
+  """
+  Return the epoch seconds of a timestamp string without a sub-second part, through the LRU cache
+  """
+  epoch_seconds = _epoch_seconds_cache.get((timestamp, ts_format))
+  if epoch_seconds is None:
+    if ts_format in FAST_PATH_FORMATS:
+      if not _TIME_FORMAT_REGEXES[ts_format].match(timestamp):
+        raise ValueError('time data %s does not match format %s' % (timestamp, ts_format))
+      dt_obj = datetime.datetime(int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]), int(timestamp[11:13]), int(timestamp[14:16]),
+                                 int(timestamp[17:19]))
+    else:
+      dt_obj = datetime.datetime.strptime(timestamp, ts_format)
+    epoch_seconds = calendar.timegm(dt_obj.utctimetuple())
+    _epoch_seconds_cache.put((timestamp, ts_format), epoch_seconds)
+  return epoch_seconds
+
+
+def _get_milliseconds(fraction):
+  """
+  Return the milliseconds of a sub-second part, read the way strptime reads %f
+  """
+  if len(fraction) > 6 or not fraction.isdigit():
+    raise ValueError('unconverted data remains: ' + fraction)
+  return int(fraction.ljust(6, '0')) / 1000
+
+
+def parse_timestamp(timestamp, ts_format, get_epoch_seconds=_get_epoch_seconds):
+  """
+  Return the epoch ms of a timestamp string in the given format. Timestamps are split into a second-resolution prefix,
+  whose epoch seconds are cached, and a sub-second part that is converted by hand.
+
+  :param string timestamp: timestamp string
+  :param string ts_format: format as returned by detect_timestamp_format()
+  :param get_epoch_seconds: function returning the epoch seconds of a second-resolution prefix
+  :return: int epoch ms or -1 if the timestamp cannot be parsed
+  """
+  try:
+    if ts_format == 'unknown':
+      logger.error('Unable to determine timestamp format for : %s', timestamp)
+      return -1
+    elif ts_format == 'epoch':
+      return int(timestamp) * 1000
+    elif ts_format == 'epoch_ms':
+      return int(timestamp)
+    elif ts_format == 'epoch_fraction':
+      return int(timestamp[:10]) * 1000 + int(timestamp[11:])
+    if ts_format in ('%H:%M:%S', '%H:%M:%S.%f'):
+      timestamp = str(datetime.date.today()) + ' ' + timestamp
+      ts_format = '%Y-%m-%d ' + ts_format
+    if ts_format.endswith('.%f'):
+      timestamp, fraction = timestamp.rsplit('.', 1)
+      return get_epoch_seconds(timestamp, ts_format[:-3]) * 1000 + _get_milliseconds(fraction)
+    return get_epoch_seconds(timestamp, ts_format) * 1000
+  except ValueError:
+    return -1
+
+
+class TimestampParser(object):
+  """
+  Timestamp parser for the lines of a single file. The timestamp format is detected from the first timestamp and
+  locked for the rest of the file. Consecutive lines usually share the same second, so the epoch seconds of the last
+  second-resolution prefix are kept on top of the shared LRU cache.
+  """
+
+  def __init__(self, ts_format=None):
+    self.ts_format = ts_format
+    self._last_prefix = None
+    self._last_epoch_seconds = None
+
+  def _get_epoch_seconds(self, timestamp, ts_format):
+    if timestamp != self._last_prefix:
+      self._last_epoch_seconds = _get_epoch_seconds(timestamp, ts_format)
+      self._last_prefix = timestamp
+    return self._last_epoch_seconds
+
+  def parse(self, timestamp):
+    """
+    Return the standardized int epoch ms timestamp, or -1 when the format cannot be detected or the timestamp does not
+    match the locked format
+    """
+    if not self.ts_format:
+      ts_format = detect_timestamp_format(timestamp)
+      if ts_format == 'unknown':
+        return -1
+      self.ts_format = ts_format
+    return parse_timestamp(timestamp, self.ts_format, self._get_epoch_seconds)
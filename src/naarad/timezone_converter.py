@@ -0,0 +1,127 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import bisect
+import calendar
+import datetime
+import logging
+import threading
+import numpy
+import pytz
+import naarad.naarad_constants as CONSTANTS
+
+logger = logging.getLogger('naarad.timezone_converter')
+
+# utc offset tables by zone name
+_offset_tables = {}
+_offset_tables_lock = threading.Lock()
+
+
+def get_timezone(name):
+  """
+  Return the pytz timezone for an IANA zone name or one of the CONSTANTS.TIMEZONE_ALIASES abbreviations
+  """
+  return pytz.timezone(CONSTANTS.TIMEZONE_ALIASES.get(name, name))
+
+
+def is_valid_timezone(name):
+  try:
+    get_timezone(name)
+  except pytz.UnknownTimeZoneError:
+    return False
+  return True
+
+
+def _to_epoch_ms(dt):
+  return calendar.timegm(dt.timetuple()) * 1000
+
+
+def _get_offset_table(tz):
+  """
+  Return the utc offset table of a timezone, computed once from its DST transitions and cached
+
+  :param tz: pytz timezone
+  :return: tuple of numpy int64 arrays (utc transition times, local transition times, utc offsets) in epoch ms. The
+  utc offset at index i applies from the transition at index i to the next one
+  """
+  with _offset_tables_lock:
+    table = _offset_tables.get(tz.zone)
+    if table is None:
+      if hasattr(tz, '_utc_transition_times'):
+        transitions = numpy.array([_to_epoch_ms(transition) for transition in tz._utc_transition_times], dtype=numpy.int64)
+        offsets = numpy.array([int(info[0].total_seconds()) * 1000 for info in tz._transition_info], dtype=numpy.int64)
+      else:
+        transitions = numpy.array([_to_epoch_ms(datetime.datetime.min)], dtype=numpy.int64)
+        offsets = numpy.array([int(tz.utcoffset(datetime.datetime.min).total_seconds()) * 1000], dtype=numpy.int64)
+      # Local times are resolved the way pytz localize(is_dst=False) does: the ambiguous hour after a DST end and the
+      # skipped hour of a DST start both use the standard time offset
+      table = (transitions, transitions + offsets, offsets)
+      _offset_tables[tz.zone] = table
+    return table
+
+
+class TimezoneConverter(object):
+  """
+  Convert epoch ms timestamps read as local time of ts_timezone to local time of graph_timezone. Both timestamps are
+  expressed as epoch ms of the wall clock time, the way timestamps without timezone are parsed.
+  Offsets are looked up in the DST transition tables of both zones, so that a whole series can be converted at once.
+  """
+
+  def __init__(self, ts_timezone, graph_timezone):
+    self.enabled = False
+    if not graph_timezone:
+      return
+    ts_tz = get_timezone(ts_timezone)
+    graph_tz = get_timezone(graph_timezone)
+    if ts_tz.zone == graph_tz.zone:
+      return
+    self.enabled = True
+    _, self._ts_local_transitions, self._ts_offsets = _get_offset_table(ts_tz)
+    self._graph_transitions, _, self._graph_offsets = _get_offset_table(graph_tz)
+    self._ts_local_transitions_list = self._ts_local_transitions.tolist()
+    self._ts_offsets_list = self._ts_offsets.tolist()
+    self._graph_transitions_list = self._graph_transitions.tolist()
+    self._graph_offsets_list = self._graph_offsets.tolist()
+
+  def convert(self, timestamps):
+    """
+    Convert a series of timestamps
+
+    :param timestamps: list or numpy array of epoch ms timestamps
+    :return: numpy int64 array of epoch ms timestamps in graph_timezone
+    """
+    timestamps = numpy.asarray(timestamps, dtype=numpy.int64)
+    if not self.enabled:
+      return timestamps
+    indexes = numpy.searchsorted(self._ts_local_transitions, timestamps, side='right') - 1
+    utc_timestamps = timestamps - self._ts_offsets[numpy.maximum(indexes, 0)]
+    indexes = numpy.searchsorted(self._graph_transitions, utc_timestamps, side='right') - 1
+    return utc_timestamps + self._graph_offsets[numpy.maximum(indexes, 0)]
+
+  def convert_timestamp(self, timestamp):
+    """
+    Convert a single timestamp
+
+    :param int timestamp: epoch ms timestamp
+    :return: int epoch ms timestamp in graph_timezone
+    """
+    if not self.enabled:
+      return timestamp
+    index = bisect.bisect_right(self._ts_local_transitions_list, timestamp) - 1
+    utc_timestamp = timestamp - self._ts_offsets_list[max(index, 0)]
+    index = bisect.bisect_right(self._graph_transitions_list, utc_timestamp) - 1
+    return utc_timestamp + self._graph_offsets_list[max(index, 0)]
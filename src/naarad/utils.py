@@ -21,10 +21,9 @@ import ConfigParser
 import datetime
 import imp
 import logging
+import multiprocessing
 import numpy
 import os
-import pytz
-from pytz import timezone
 import re
 import sys
 import time
@@ -35,6 +34,9 @@ from naarad.metrics.sar_metric import SARMetric
 from naarad.metrics.metric import Metric
 from naarad.graphing.plot_data import PlotData
 from naarad.run_steps.local_cmd import Local_Cmd
+import naarad.compression
+import naarad.timestamp_parser
+import naarad.timezone_converter
 import naarad.naarad_constants as CONSTANTS
 
 logger = logging.getLogger('naarad.utils')
@@ -143,14 +145,16 @@ def get_run_time_period(run_steps):
   """
   init_ts_start = get_standardized_timestamp('now', None)
   ts_start = init_ts_start
-  ts_end = '0'
+  ts_end = 0
   for run_step in run_steps:
     if run_step.ts_start and run_step.ts_end:
-      if run_step.ts_start < ts_start:
-        ts_start = run_step.ts_start
-      if run_step.ts_end > ts_end:
-        ts_end = run_step.ts_end
-  if ts_end == '0':
+      run_step_ts_start = get_standardized_timestamp(run_step.ts_start, None)
+      run_step_ts_end = get_standardized_timestamp(run_step.ts_end, None)
+      if run_step_ts_start < ts_start:
+        ts_start = run_step_ts_start
+      if run_step_ts_end > ts_end:
+        ts_end = run_step_ts_end
+  if ts_end == 0:
     ts_end = None
   if ts_start == init_ts_start:
     ts_start = None
@@ -277,6 +281,8 @@ def parse_metric_section(config_obj, section, metric_classes, metrics, aggregate
   if config_obj.has_option(section, 'calc_metrics'):
     new_metric.calc_metrics = config_obj.get(section, 'calc_metrics')
   new_metric.precision = precision
+  # metric classes set the options of their section in different ways
+  new_metric.parse_plot_options()
   return new_metric
 
 
@@ -298,6 +304,32 @@ def parse_global_section(config_obj, section):
   return ts_start, ts_end
 
 
+def parse_executor_options(config_obj, section):
+  """
+  Parse the executor and workers options from the specified section of the config
+  :param config_obj: ConfigParser object
+  :param section: Section name
+  :return: executor ('thread' or 'process') and number of workers. None is returned for options that are not specified
+  """
+  executor = None
+  workers = None
+  if config_obj.has_option(section, 'executor'):
+    executor = config_obj.get(section, 'executor').strip().lower()
+    config_obj.remove_option(section, 'executor')
+    if executor not in CONSTANTS.SUPPORTED_EXECUTORS:
+      logger.error('Unsupported executor %s specified. Supported executors are: %s', executor, ','.join(CONSTANTS.SUPPORTED_EXECUTORS))
+      executor = None
+  if config_obj.has_option(section, 'workers'):
+    workers = config_obj.get(section, 'workers')
+    config_obj.remove_option(section, 'workers')
+    if workers.isdigit() and int(workers) > 0:
+      workers = int(workers)
+    else:
+      logger.error('Invalid number of workers %s specified. Will default to the number of cpus', workers)
+      workers = None
+  return executor, workers
+
+
 def parse_run_step_section(config_obj, section):
   """
   Parse a RUN-STEP section in the config to return a Run_Step object
@@ -368,7 +400,7 @@ def parse_graph_section(config_obj, section, outdir_default, indir_default):
     indir_default = config_obj.get(section, 'input_dir')
   if config_obj.has_option(section, 'graph_timezone'):
     graph_timezone = config_obj.get(section, 'graph_timezone')
-    if graph_timezone not in ("UTC", "PST", "PDT"):
+    if not naarad.timezone_converter.is_valid_timezone(graph_timezone):
       logger.warn('Unsupported timezone ' + graph_timezone + ' specified in option graph_timezone. Will use UTC instead')
       graph_timezone = "UTC"
   return graphing_library, crossplots, outdir_default, indir_default, graph_timezone
@@ -402,32 +434,24 @@ def parse_report_section(config_obj, section):
     report_kwargs['diff_client_charting_template'] = config_obj.get(section, 'diff_client_charting_template')
   if config_obj.has_option(section, 'diff_page_template'):
     report_kwargs['diff_page_template'] = config_obj.get(section, 'diff_page_template')
+  if config_obj.has_option(section, 'compress_resources'):
+    report_kwargs['compress_resources'] = config_obj.get(section, 'compress_resources').split()
+  if config_obj.has_option(section, 'tiles'):
+    report_kwargs['tiles'] = config_obj.get(section, 'tiles').strip().lower() in ('1', 'true', 'yes')
   return report_kwargs
 
 
 def reconcile_timezones(begin_ts, ts_timezone, graph_timezone):
-  if not graph_timezone:
-    return begin_ts
-  # Converting timestamp strings to be in timezone: graph_timezone
-  # We only support UTC and PDT
-  if graph_timezone != ts_timezone:
-    utc = pytz.utc
-    pst = timezone('US/Pacific')
-    if graph_timezone == "UTC":
-      # Assume timezone is PDT
-      try:
-        dt = pst.localize(datetime.datetime.strptime(begin_ts, "%Y-%m-%d %H:%M:%S"))
-      except ValueError:
-        dt = pst.localize(datetime.datetime.strptime(begin_ts, "%Y-%m-%d %H:%M:%S.%f"))
-      begin_ts = dt.astimezone(utc).strftime("%Y-%m-%d %H:%M:%S.%f")
-    else:
-      # Assume timezone is UTC since graph_timezone is PDT
-      try:
-        dt = utc.localize(datetime.datetime.strptime(begin_ts, "%Y-%m-%d %H:%M:%S"))
-      except ValueError:
-        dt = utc.localize(datetime.datetime.strptime(begin_ts, "%Y-%m-%d %H:%M:%S.%f"))
-      begin_ts = dt.astimezone(pst).strftime("%Y-%m-%d %H:%M:%S.%f")
-  return begin_ts
+  """
+  Convert an epoch ms timestamp read in ts_timezone to be in timezone: graph_timezone. Use
+  naarad.timezone_converter.TimezoneConverter to convert whole series
+
+  :param int begin_ts: epoch ms timestamp, as returned by get_standardized_timestamp()
+  :param string ts_timezone: IANA zone name or alias of the input timestamps
+  :param string graph_timezone: IANA zone name or alias used for the graphs
+  :return: epoch ms timestamp in graph_timezone
+  """
+  return naarad.timezone_converter.TimezoneConverter(ts_timezone, graph_timezone).convert_timestamp(begin_ts)
 
 
 def convert_to_unixts(ts_string):
@@ -618,7 +642,8 @@ def normalize_float_for_display(data_val):
 
 def calculate_stats(data_list, stats_to_calculate=['mean', 'std'], percentiles_to_calculate=[]):
   """
-  Calculate statistics for given data.
+  Calculate statistics for given data. The data is converted to a float64 array once and sorted once, min, max, median
+  and all the percentiles are then read from the sorted array.
 
   :param list data_list: List of floats
   :param list stats_to_calculate: List of strings with statistics to calculate. Supported stats are defined in constant stats_to_numpy_method_map
@@ -638,22 +663,36 @@ def calculate_stats(data_list, stats_to_calculate=['mean', 'std'], percentiles_t
   calculated_percentiles = {}
   if len(data_list) == 0:
     return calculated_stats, calculated_percentiles
+  data = numpy.asarray(data_list, dtype=numpy.float64)
+  sorted_data = numpy.sort(data)
   for stat in stats_to_calculate:
-    if stat in stats_to_numpy_method_map.keys():
-      calculated_stats[stat] = stats_to_numpy_method_map[stat](data_list)
-    else:
+    if stat not in stats_to_numpy_method_map.keys():
       logger.error("Unsupported stat : " + str(stat))
+    elif stat == 'min':
+      calculated_stats[stat] = sorted_data[0]
+    elif stat == 'max':
+      calculated_stats[stat] = sorted_data[-1]
+    elif stat == 'median':
+      calculated_stats[stat] = numpy.median(sorted_data)
+    else:
+      calculated_stats[stat] = stats_to_numpy_method_map[stat](data)
+  valid_percentiles = []
   for percentile in percentiles_to_calculate:
     if isinstance(percentile, float) or isinstance(percentile, int):
-      calculated_percentiles[percentile] = numpy.percentile(data_list, percentile)
+      valid_percentiles.append(percentile)
     else:
       logger.error("Unsupported percentile requested (should be int or float): " + str(percentile))
+  if valid_percentiles:
+    percentile_values = numpy.percentile(sorted_data, valid_percentiles)
+    for percentile, value in zip(valid_percentiles, percentile_values):
+      calculated_percentiles[percentile] = value
   return calculated_stats, calculated_percentiles
 
 
 def is_valid_file(filename):
   """
-  Check if the specifed file exists and is not empty
+  Check if the specifed file exists and is not empty. The file can be a member of a tar archive, see
+  compression.find_archive_member()
 
   :param filename: full path to the file that needs to be checked
   :return: Status, Message
@@ -662,6 +701,15 @@ def is_valid_file(filename):
     if not os.path.getsize(filename):
       logger.warning('%s : file is empty.', filename)
       return False
+  elif naarad.compression.find_archive_member(filename):
+    try:
+      with naarad.compression.open_input(filename) as FH:
+        if not FH.read(1):
+          logger.warning('%s : file is empty.', filename)
+          return False
+    except IOError as e:
+      logger.warning('%s : %s', filename, e)
+      return False
   else:
     logger.warning('%s : file does not exist.', filename)
     return False
@@ -675,63 +723,28 @@ def detect_timestamp_format(timestamp):
   :param string timestamp: the timestamp string for which we need to determine format
   :return: best guess timestamp format
   """
-  time_formats = {
-      'epoch': re.compile(r'^[0-9]{10}$'),
-      'epoch_ms': re.compile(r'^[0-9]{13}$'),
-      'epoch_fraction': re.compile(r'^[0-9]{10}\.[0-9]{3,9}$'),
-      '%Y-%m-%d %H:%M:%S': re.compile(r'^[0-9]{4}-[0-1][0-9]-[0-3][0-9] [0-2][0-9]:[0-5][0-9]:[0-5][0-9]$'),
-      '%Y-%m-%dT%H:%M:%S': re.compile(r'^[0-9]{4}-[0-1][0-9]-[0-3][0-9]T[0-2][0-9]:[0-5][0-9]:[0-5][0-9]$'),
-      '%Y-%m-%d_%H:%M:%S': re.compile(r'^[0-9]{4}-[0-1][0-9]-[0-3][0-9]_[0-2][0-9]:[0-5][0-9]:[0-5][0-9]$'),
-      '%Y-%m-%d %H:%M:%S.%f': re.compile(r'^[0-9]{4}-[0-1][0-9]-[0-3][0-9] [0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]+$'),
-      '%Y-%m-%dT%H:%M:%S.%f': re.compile(r'^[0-9]{4}-[0-1][0-9]-[0-3][0-9]T[0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]+$'),
-      '%Y-%m-%d_%H:%M:%S.%f': re.compile(r'^[0-9]{4}-[0-1][0-9]-[0-3][0-9]_[0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]+$'),
-      '%Y%m%d %H:%M:%S': re.compile(r'^[0-9]{4}[0-1][0-9][0-3][0-9] [0-2][0-9]:[0-5][0-9]:[0-5][0-9]$'),
-      '%Y%m%dT%H:%M:%S': re.compile(r'^[0-9]{4}[0-1][0-9][0-3][0-9]T[0-2][0-9]:[0-5][0-9]:[0-5][0-9]$'),
-      '%Y%m%d_%H:%M:%S': re.compile(r'^[0-9]{4}[0-1][0-9][0-3][0-9]_[0-2][0-9]:[0-5][0-9]:[0-5][0-9]$'),
-      '%Y%m%d %H:%M:%S.%f': re.compile(r'^[0-9]{4}[0-1][0-9][0-3][0-9] [0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]+$'),
-      '%Y%m%dT%H:%M:%S.%f': re.compile(r'^[0-9]{4}[0-1][0-9][0-3][0-9]T[0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]+$'),
-      '%Y%m%d_%H:%M:%S.%f': re.compile(r'^[0-9]{4}[0-1][0-9][0-3][0-9]_[0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]+$'),
-      '%H:%M:%S': re.compile(r'^[0-2][0-9]:[0-5][0-9]:[0-5][0-9]$'),
-      '%H:%M:%S.%f': re.compile(r'^[0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]+$'),
-      '%Y-%m-%dT%H:%M:%S.%f%z': re.compile(r'^[0-9]{4}-[0-1][0-9]-[0-3][0-9]T[0-2][0-9]:[0-5][0-9]:[0-5][0-9].[0-9]+[+-][0-9]{4}$')
-  }
-  for time_format in time_formats:
-    if re.match(time_formats[time_format], timestamp):
-      return time_format
-  return 'unknown'
+  return naarad.timestamp_parser.detect_timestamp_format(timestamp)
 
 
 def get_standardized_timestamp(timestamp, ts_format):
   """
   Given a timestamp string, return a time stamp in the epoch ms format. If no date is present in
-  timestamp then today's date will be added as a prefix before conversion to epoch ms
+  timestamp then today's date will be added as a prefix before conversion to epoch ms. Timestamps that are already
+  epoch ms ints are returned as is
+
+  :param string timestamp: timestamp string or epoch ms int
+  :param string ts_format: format of the timestamp, detected when None
+  :return: int epoch ms, -1 if the timestamp cannot be parsed or None if no timestamp is given
   """
   if not timestamp:
     return None
+  if isinstance(timestamp, (int, long)):
+    return timestamp
   if timestamp == 'now':
     timestamp = str(datetime.datetime.now())
   if not ts_format:
     ts_format = detect_timestamp_format(timestamp)
-  try:
-    if ts_format == 'unknown':
-      logger.error('Unable to determine timestamp format for : %s', timestamp)
-      return -1
-    elif ts_format == 'epoch':
-      ts = int(timestamp) * 1000
-    elif ts_format == 'epoch_ms':
-      ts = timestamp
-    elif ts_format == 'epoch_fraction':
-      ts = int(timestamp[:10]) * 1000 + int(timestamp[11:])
-    elif ts_format in ('%H:%M:%S', '%H:%M:%S.%f'):
-      date_today = str(datetime.date.today())
-      dt_obj = datetime.datetime.strptime(date_today + ' ' + timestamp, '%Y-%m-%d ' + ts_format)
-      ts = calendar.timegm(dt_obj.utctimetuple()) * 1000 + dt_obj.microsecond / 1000
-    else:
-      dt_obj = datetime.datetime.strptime(timestamp, ts_format)
-      ts = calendar.timegm(dt_obj.utctimetuple()) * 1000 + dt_obj.microsecond / 1000
-  except ValueError:
-    return -1
-  return str(ts)
+  return naarad.timestamp_parser.parse_timestamp(timestamp, ts_format)
 
 
 def set_sla(obj, metric, sub_metric, rules):
@@ -811,6 +824,7 @@ def parse_and_plot_single_metrics(metric, graph_timezone, outdir_default, indir_
     if metric.collect():
       if metric.parse():
         metric.calc()
+        metric.save_series_store()
         metric.calculate_stats()
         check_slas(metric)
         metric.detect_anomaly()
@@ -822,6 +836,49 @@ def parse_and_plot_single_metrics(metric, graph_timezone, outdir_default, indir_
       logger.error('Fetch/Collect failed for metric: ' + metric.label)
 
 
+# Metrics being analyzed by the process pool. Worker processes inherit this list when they are forked, so the metric
+# objects themselves never need to be pickled.
+_pool_metrics = []
+
+
+def _parse_and_plot_pool_metric(index, graph_timezone, outdir_default, indir_default, graphing_library, skip_plots):
+  """
+  Worker process entry point: analyze the metric at the given index of _pool_metrics and return its result state
+  """
+  metric = _pool_metrics[index]
+  parse_and_plot_single_metrics(metric, graph_timezone, outdir_default, indir_default, graphing_library, skip_plots)
+  return metric.get_result_state()
+
+
+def parse_and_plot_metrics_in_processes(metrics, graph_timezone, outdir_default, indir_default, graphing_library,
+                                        skip_plots, workers=None):
+  """
+  Run the collect/parse/calc/stats/sla/anomaly/graph chain for each metric in a pool of worker processes. Only the
+  result state of each metric is sent back from the workers and it is used to update the metric objects in this process
+  :param metrics: list of metric objects
+  :param workers: number of worker processes. Defaults to the number of cpus
+  """
+  global _pool_metrics
+  if len(metrics) == 0:
+    return
+  _pool_metrics = metrics
+  pool = multiprocessing.Pool(processes=workers)
+  try:
+    results = [pool.apply_async(_parse_and_plot_pool_metric, (index, graph_timezone, outdir_default, indir_default,
+                                                              graphing_library, skip_plots))
+               for index in range(len(metrics))]
+    pool.close()
+    for metric, result in zip(metrics, results):
+      try:
+        metric.set_result_state(result.get())
+      except Exception:
+        logger.exception('Analysis failed in worker process for metric: ' + metric.label)
+    pool.join()
+  finally:
+    pool.terminate()
+    _pool_metrics = []
+
+
 def init_logging(logger, log_file, log_level):
   """
   Initialize the naarad logger.
@@ -870,6 +927,12 @@ def get_argument_parser():
                           help="Don't generate plot images. Useful when you only want SLA calculations. Note that on-demand charts can "
                                "still be generated through client-charting.", action="store_true")
   arg_parser.add_argument('-e', '--exit_code', help="optional argument to enable exit_code for naarad", action="store_true")
+  arg_parser.add_argument('-w', '--workers', type=int,
+                          help="Analyze metrics in a pool of the specified number of worker processes instead of threads")
+  arg_parser.add_argument('--cache_dir', '--cache-dir', dest='cache_dir',
+                          help="Cache downloaded http(s) inputs and reports in this directory and only download them again when they changed")
+  arg_parser.add_argument('--cache_size', type=int, help="Maximum size of the download cache in MB, least recently used files are evicted "
+                                                        "beyond it. Defaults to %d MB" % (CONSTANTS.DOWNLOAD_CACHE_MAX_SIZE / 1024 ** 2))
   # TODO(Ritesh) : Print a list of all templates supported with descriptions
   # arg_parser.add_argument('-l', '--list_templates', help="List all template configs", action="store_true")
   return arg_parser
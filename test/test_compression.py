@@ -0,0 +1,152 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import BaseHTTPServer
+import bz2
+import gzip
+import os
+import shutil
+import SimpleHTTPServer
+import sys
+import tarfile
+import threading
+import uuid
+
+# add the path of ~/naarad/src;   the testing py is under ~/naarad/test
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')))
+import naarad
+import naarad.compression
+import naarad.httpdownload
+import naarad.naarad_constants as CONSTANTS
+
+# the temporary directory for testing, will remove it after done.
+tmp_dir = ''
+csv_content = '1398295480440,0.0428320\n1398295487030,0.0230040\n'
+
+
+def setup_module():
+  global tmp_dir
+  tmp_dir = os.path.abspath(os.path.join('./', 'tmp' + '.' + str(uuid.uuid4())))
+  os.makedirs(os.path.join(tmp_dir, 'resources', 'GC.GCPause.tiles'))
+  for file_name in ('GC.GCPause.csv', 'GC.stats.csv', os.path.join('GC.GCPause.tiles', '1000.699147.csv')):
+    with open(os.path.join(tmp_dir, 'resources', file_name), 'w') as FH:
+      FH.write(csv_content)
+  with open(os.path.join(tmp_dir, 'resources', 'GC.GCPause.tiles', 'index.json'), 'w') as FH:
+    FH.write('{}')
+
+
+def teardown_module():
+  shutil.rmtree(tmp_dir)
+
+
+def test_compress_resources():
+  resource_directory = os.path.join(tmp_dir, 'resources')
+  assert naarad.compression.compress_resources(resource_directory, ['gzip']) == 3
+  assert sorted(os.listdir(resource_directory)) == ['GC.GCPause.csv.gz', 'GC.GCPause.tiles', 'GC.stats.csv.gz']
+  assert sorted(os.listdir(os.path.join(resource_directory, 'GC.GCPause.tiles'))) == ['1000.699147.csv.gz', 'index.json']
+  with gzip.open(os.path.join(resource_directory, 'GC.GCPause.csv.gz')) as FH:
+    assert FH.read() == csv_content
+  with open(os.path.join(resource_directory, 'GC.stats.csv.gz'), 'rb') as FH:
+    content = FH.read()
+  assert naarad.compression.gunzip(content) == csv_content
+  assert naarad.compression.gunzip(csv_content) == csv_content
+  os.makedirs(os.path.join(tmp_dir, 'diff'))
+  copy = naarad.compression.copy_resource(os.path.join(resource_directory, 'GC.stats.csv'), os.path.join(tmp_dir, 'diff'))
+  assert copy == os.path.join(tmp_dir, 'diff', 'GC.stats.csv')
+  with open(copy) as FH:
+    assert FH.read() == csv_content
+
+
+def test_report_compressed_resources():
+  """
+  The client charting page of a report written with compressed resources loads their .gz copies directly
+  """
+  with open(os.path.join(tmp_dir, 'latency.out'), 'w') as FH:
+    FH.writelines('2014-04-14 12:09:%02d,%d\n' % (second, second % 7) for second in range(60))
+  for report_options, compressed in (('', False), ('[REPORT]\ncompress_resources=gzip\n', True)):
+    config_file = os.path.join(tmp_dir, 'config-compressed')
+    with open(config_file, 'w') as FH:
+      FH.write('[LATENCY]\ninfile=latency.out\ncolumns=rt\nsep=,\n\n' + report_options)
+    output_directory = os.path.join(tmp_dir, 'report-%s' % compressed)
+    naarad_obj = naarad.Naarad()
+    naarad_obj.skip_plots = True
+    assert naarad_obj.analyze(tmp_dir, output_directory, config=config_file) == CONSTANTS.OK
+    assert os.path.exists(os.path.join(output_directory, 'resources', 'LATENCY.rt.csv.gz')) == compressed
+    with open(os.path.join(output_directory, CONSTANTS.CLIENT_CHARTING_FILE)) as FH:
+      assert 'compressedResources = %s;' % ('true' if compressed else 'false') in FH.read()
+
+
+def test_download_compressed_resource():
+  """
+  csv files of reports written with compressed resources are downloaded from their .gz variant
+  """
+  os.chdir(tmp_dir)
+  server = BaseHTTPServer.HTTPServer(('localhost', 0), SimpleHTTPServer.SimpleHTTPRequestHandler)
+  thread = threading.Thread(target=server.serve_forever)
+  thread.daemon = True
+  thread.start()
+  try:
+    os.makedirs(os.path.join(tmp_dir, 'download'))
+    url = 'http://localhost:%d/resources/GC.GCPause.csv' % server.server_port
+    output_file = naarad.httpdownload.download_url_single(url, os.path.join(tmp_dir, 'download'))
+    with open(output_file) as FH:
+      assert FH.read() == csv_content
+    assert naarad.httpdownload.download_url_single(url.replace('GCPause', 'appstop'), os.path.join(tmp_dir, 'download')) is None
+  finally:
+    server.shutdown()
+    server.server_close()
+    os.chdir(os.path.dirname(tmp_dir))
+
+
+def test_open_input():
+  """
+  Compressed inputs and members of tar archives are read without being extracted to disk
+  """
+  input_directory = os.path.join(tmp_dir, 'inputs')
+  os.makedirs(os.path.join(input_directory, 'sar-results-2014-04-23'))
+  with open(os.path.join(input_directory, 'sar-results-2014-04-23', 'sar.cpuusage.out'), 'w') as FH:
+    FH.write(csv_content * 1000)
+  with gzip.open(os.path.join(input_directory, 'sar.cpuusage.out.gz'), 'wb') as FH:
+    FH.write(csv_content * 500)
+  # gzip files which were appended to
+  with gzip.open(os.path.join(input_directory, 'sar.cpuusage.out.gz'), 'ab') as FH:
+    FH.write(csv_content * 500)
+  with open(os.path.join(input_directory, 'sar.cpuusage.out.bz2'), 'wb') as FH:
+    FH.write(bz2.compress(csv_content * 1000))
+  tar = tarfile.open(os.path.join(input_directory, 'sar-results.tar.gz'), 'w:gz')
+  tar.add(os.path.join(input_directory, 'sar-results-2014-04-23'), 'sar-results-2014-04-23')
+  tar.close()
+  for file_name in ('sar-results-2014-04-23/sar.cpuusage.out', 'sar.cpuusage.out.gz', 'sar.cpuusage.out.bz2',
+                    'sar-results.tar.gz/sar-results-2014-04-23/sar.cpuusage.out', 'sar-results.tar.gz/sar.cpuusage.out'):
+    assert naarad.compression.input_exists(os.path.join(input_directory, file_name))
+    with naarad.compression.open_input(os.path.join(input_directory, file_name)) as FH:
+      assert list(FH) == (csv_content * 1000).splitlines(True)
+  assert naarad.compression.find_archive_member(os.path.join(input_directory, 'sar-results.tar.gz', 'sar.cpuusage.out')) == \
+      (os.path.join(input_directory, 'sar-results.tar.gz'), 'sar.cpuusage.out')
+  assert naarad.compression.find_archive_member(os.path.join(input_directory, 'sar.cpuusage.out.gz')) is None
+  assert not naarad.compression.input_exists(os.path.join(input_directory, 'sar.device.out'))
+  try:
+    naarad.compression.open_input(os.path.join(input_directory, 'sar-results.tar.gz', 'sar.device.out'))
+    assert False, 'missing archive members should not be opened'
+  except IOError:
+    pass
+  with naarad.compression.open_input(os.path.join(input_directory, 'sar.cpuusage.out.gz')) as FH:
+    assert FH.readline() == csv_content.splitlines(True)[0]
+    FH.seek(0)
+    assert FH.read(len(csv_content) * 2) == csv_content * 2
+    FH.seek(len(csv_content) * 700)
+    assert FH.read() == csv_content * 300
@@ -0,0 +1,96 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import shutil
+import sys
+import time
+import uuid
+
+# add the path of ~/naarad/src;   the testing py is under ~/naarad/test
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')))
+import numpy
+import naarad.graphing.csv_reader
+from naarad.graphing.csv_reader import parse_numeric_csv, read_columns
+import naarad.naarad_constants as CONSTANTS
+import naarad.series_store
+
+# the temporary directory for testing, will remove it after done.
+tmp_dir = ''
+
+
+def setup_module():
+  global tmp_dir
+  tmp_dir = os.path.join('./', 'tmp' + '.' + str(uuid.uuid4()))
+  os.makedirs(tmp_dir)
+
+
+def teardown_module():
+  shutil.rmtree(tmp_dir)
+
+
+def _write_csv(name, content):
+  csv_file = os.path.join(tmp_dir, name)
+  with open(csv_file, 'w') as fh:
+    fh.write(content)
+  return csv_file
+
+
+def test_parse_numeric_csv():
+  csv_file = _write_csv('SAR-memory.frmpg-s.csv', '1330032560000,-1379.50\n1330032562000,-311.00\n1330032564000,1057\n')
+  assert numpy.array_equal(parse_numeric_csv(csv_file), numpy.loadtxt(csv_file, delimiter=','))
+  timestamps, values = naarad.series_store.read_csv(csv_file)
+  assert timestamps.tolist() == [1330032560000, 1330032562000, 1330032564000]
+  assert values.tolist() == [-1379.5, -311.0, 1057.0]
+  assert parse_numeric_csv(_write_csv('empty.csv', '')).shape == (0, 2)
+  assert parse_numeric_csv(_write_csv('bad-value.csv', '1330032560000,1.5\n1330032562000,abc\n')) is None
+  assert parse_numeric_csv(_write_csv('formatted-timestamp.csv', '2012-02-23 21:29:20,0.40\n')) is None
+  assert parse_numeric_csv(_write_csv('ragged.csv', '1,2\n3\n4,5\n')) is None
+  assert parse_numeric_csv(_write_csv('blank-lines.csv', '\n1,2\r\n3,4\r\n\n\n')).tolist() == [[1, 2], [3, 4]]
+  assert parse_numeric_csv(_write_csv('blank.csv', ' \n\n')).shape == (0, 2)
+
+
+def test_parse_numeric_csv_chunks():
+  content = ''.join('%d,%d.5\n' % (1330032560000 + i, i) for i in range(1000))
+  csv_file = _write_csv('chunks.csv', content)
+  chunk_size = CONSTANTS.CSV_PARSE_CHUNK_SIZE
+  try:
+    # chunks end in the middle of lines
+    CONSTANTS.CSV_PARSE_CHUNK_SIZE = 97
+    assert numpy.array_equal(parse_numeric_csv(csv_file), numpy.loadtxt(csv_file, delimiter=','))
+  finally:
+    CONSTANTS.CSV_PARSE_CHUNK_SIZE = chunk_size
+
+
+def test_read_columns_cache():
+  csv_file = _write_csv('GC.GCPause.percentiles.csv', '0,0.01\n50,0.04\n100,0.12\n')
+  columns = read_columns(csv_file)
+  assert columns[0].tolist() == [0, 50, 100]
+  assert columns[1].tolist() == [0.01, 0.04, 0.12]
+  assert read_columns(csv_file) is columns
+  time.sleep(0.01)
+  _write_csv('GC.GCPause.percentiles.csv', '0,0.02\n100,0.2\n')
+  assert read_columns(csv_file)[1].tolist() == [0.02, 0.2]
+
+
+def test_read_columns_cache_eviction():
+  cache = naarad.graphing.csv_reader._columns_cache
+  csv_files = [_write_csv('evicted.%d.csv' % i, '0,%d\n' % i) for i in range(CONSTANTS.CSV_COLUMNS_CACHE_SIZE + 1)]
+  columns = [read_columns(csv_file) for csv_file in csv_files]
+  assert len(cache) == CONSTANTS.CSV_COLUMNS_CACHE_SIZE
+  assert cache.get(csv_files[0]) is None
+  assert read_columns(csv_files[-1]) is columns[-1]
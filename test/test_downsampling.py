@@ -0,0 +1,107 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import ConfigParser
+import os
+import shutil
+import sys
+import uuid
+
+# add the path of ~/naarad/src;   the testing py is under ~/naarad/test
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')))
+import numpy
+import naarad.downsampling
+import naarad.naarad_constants as CONSTANTS
+import naarad.series_store
+import naarad.utils
+from naarad.naarad_imports import metric_classes, aggregate_metric_classes
+from naarad.metrics.metric import Metric
+
+# the temporary directory for testing, will remove it after done.
+tmp_dir = ''
+
+
+def setup_module():
+  global tmp_dir
+  tmp_dir = os.path.join('./', 'tmp' + '.' + str(uuid.uuid4()))
+  os.makedirs(tmp_dir)
+
+
+def teardown_module():
+  shutil.rmtree(tmp_dir)
+
+
+def _series(count):
+  timestamps = 1398295480000 + numpy.arange(count, dtype=numpy.int64) * 1000
+  values = numpy.sin(numpy.arange(count) / 500.0) * 10
+  # isolated spikes which a plain LTTB selection may miss
+  values[1234] = 50.0
+  values[count - 7] = -50.0
+  return timestamps, values
+
+
+def test_lttb_indices():
+  timestamps, values = _series(100000)
+  indices = naarad.downsampling.lttb_indices(timestamps, values, 1000)
+  assert len(indices) <= 1000
+  assert indices[0] == 0
+  assert indices[-1] == 99999
+  assert numpy.all(numpy.diff(indices) > 0)
+  assert 1234 in indices
+  assert 99993 in indices
+  assert naarad.downsampling.lttb_indices(timestamps[:500], values[:500], 1000).tolist() == range(500)
+  for points in range(-1, 5):
+    assert naarad.downsampling.lttb_indices(timestamps, values, points).tolist() == [0, 99999]
+  assert len(naarad.downsampling.lttb_indices(timestamps, values, 5)) <= 5
+
+
+def test_downsample():
+  timestamps, values = _series(10000)
+  downsampled_timestamps, downsampled_values = naarad.downsampling.downsample(timestamps, values, 300)
+  assert len(downsampled_values) <= 300
+  assert downsampled_values.max() == values.max()
+  assert downsampled_values.min() == values.min()
+  assert naarad.downsampling.downsample(timestamps, values, None)[1] is values
+  assert naarad.downsampling.downsample(timestamps, values, 10000)[1] is values
+  assert naarad.downsampling.downsample(timestamps, values, 0)[1].tolist() == [values[0], values[-1]]
+
+
+def test_write_downsampled_csv():
+  timestamps, values = _series(10000)
+  csv_file = os.path.join(tmp_dir, 'SAR-cpuusage.all.%sys.csv')
+  assert naarad.downsampling.write_downsampled_csv(csv_file, timestamps, values, 20000) is None
+  downsampled_csv = naarad.downsampling.write_downsampled_csv(csv_file, timestamps, values, 1000)
+  assert downsampled_csv == os.path.join(tmp_dir, 'SAR-cpuusage.all.%sys.ds.csv')
+  downsampled_timestamps, downsampled_values = naarad.series_store.read_csv(downsampled_csv)
+  expected_timestamps, expected_values = naarad.downsampling.downsample(timestamps, values, 1000)
+  assert numpy.array_equal(downsampled_timestamps, expected_timestamps)
+  assert numpy.array_equal(downsampled_values, expected_values)
+
+
+def test_plot_points_option():
+  for plot_points, expected in (('1000', 1000), (' 2', 2), ('1', CONSTANTS.DEFAULT_PLOT_POINTS), ('0', CONSTANTS.DEFAULT_PLOT_POINTS),
+                                ('-5', CONSTANTS.DEFAULT_PLOT_POINTS), ('many', CONSTANTS.DEFAULT_PLOT_POINTS)):
+    metric = Metric('LATENCY', ['latency.out'], 'localhost', None, tmp_dir, 'resources', 'LATENCY', None, None, {}, [], None,
+                    columns='rt', plot_points=plot_points)
+    assert metric.plot_points == expected
+    for section in ('JMETER', 'SAR-cpuusage', 'GC'):
+      config = ConfigParser.ConfigParser()
+      config.add_section(section)
+      config.set(section, 'infile', 'input.log')
+      config.set(section, 'plot_points', plot_points)
+      metric = naarad.utils.parse_metric_section(config, section, metric_classes, [], aggregate_metric_classes, tmp_dir, 'resources')
+      assert metric.plot_points == expected
@@ -0,0 +1,193 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import multiprocessing
+import os
+import shutil
+import sys
+import uuid
+
+# add the path of ~/naarad/src;   the testing py is under ~/naarad/test
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')))
+import naarad
+import naarad.gc_log_parser
+import naarad.naarad_constants as CONSTANTS
+import naarad.utils
+from naarad.gc_log_parser import awk_number, parse_gc_log, parse_gc_logs
+from naarad.metrics.gc_metric import GCMetric
+
+# the temporary directory for testing, will remove it after done.
+tmp_dir = ''
+
+G1_LOG = """2014-04-23T23:24:40.440+0000: 11.304: [GC pause (young)
+Desired survivor size 54525952 bytes, new threshold 15 (max 15)
+, 0.0428320 secs]
+   [Parallel Time: 18.3 ms, GC Workers: 18]
+      [GC Worker Start (ms): Min: 11303.7, Avg: 11304.8, Max: 11305.7, Diff: 2.0]
+      [Ext Root Scanning (ms): Min: 0.6, Avg: 2.1, Max: 9.8, Diff: 9.1, Sum: 37.4]
+      [Update RS (ms): Min: 0.0, Avg: 0.0, Max: 0.2, Diff: 0.2, Sum: 0.2]
+         [Processed Buffers: Min: 0, Avg: 2.4, Max: 34, Diff: 34, Sum: 44]
+      [Scan RS (ms): Min: 0.0, Avg: 0.1, Max: 0.2, Diff: 0.2, Sum: 1.1]
+      [Object Copy (ms): Min: 6.6, Avg: 13.2, Max: 14.3, Diff: 7.7, Sum: 236.8]
+      [Termination (ms): Min: 0.0, Avg: 0.8, Max: 1.0, Diff: 1.0, Sum: 15.2]
+      [GC Worker Other (ms): Min: 0.0, Avg: 0.1, Max: 0.2, Diff: 0.2, Sum: 0.9]
+      [GC Worker Total (ms): Min: 15.2, Avg: 16.2, Max: 17.2, Diff: 2.0, Sum: 291.6]
+      [GC Worker End (ms): Min: 11320.9, Avg: 11321.0, Max: 11321.1, Diff: 0.2]
+   [Code Root Fixup: 0.4 ms]
+   [Clear CT: 1.6 ms]
+   [Other: 22.5 ms]
+      [Choose CSet: 0.0 ms]
+      [Ref Proc: 21.3 ms]
+      [Ref Enq: 0.8 ms]
+      [Free CSet: 0.2 ms]
+   [Eden: 816.0M(816.0M)->0.0B(768.0M) Survivors: 0.0B->48.0M Heap: 816.0M(16.0G)->42.9M(16.0G)]
+ [Times: user=0.37 sys=0.00, real=0.04 secs]
+"""
+
+CMS_LOG = """2015-01-11T12:06:20.100+0100: 0.145: [GC (Allocation Failure) 0.145: [ParNew: 2743K->320K(3072K), 0.0081559 secs] \
+2743K->1046K(9920K), 0.0082548 secs] [Times: user=0.02 sys=0.01, real=0.01 secs]
+2015-01-11T12:06:20.200+0100: 0.245: [GC 0.245: [ParNew
+Desired survivor size 163840 bytes, new threshold 1 (max 6)
+- age   1:     327680 bytes,     327680 total
+: 3072K->320K(3072K), 0.0061559 secs] 3798K->1546K(9920K), 0.0062548 secs] [Times: user=0.01 sys=0.00, real=0.01 secs]
+2015-01-11T12:06:21.000+0100: 1.045: [GC [1 CMS-initial-mark: 14136K(23568K)] 14216K(25680K), 0.0062443 secs] [Times: user=0.01 sys=0.00, real=0.01 secs]
+2015-01-11T12:06:21.100+0100: 1.145: [CMS-concurrent-mark-start]
+2015-01-11T12:06:21.300+0100: 1.345: [CMS-concurrent-mark: 0.202/0.204 secs] [Times: user=0.40 sys=0.01, real=0.20 secs]
+2015-01-11T12:06:21.400+0100: 1.445: [GC[YG occupancy: 1000 K (3072 K)]1.445: [Rescan (parallel) , 0.0010 secs]\
+1.446: [weak refs processing, 0.0001 secs] [1 CMS-remark: 10044K(16744K)] 10412K(18856K), 0.2095526 secs] \
+[Times: user=0.01 sys=0.00, real=0.01 secs]
+2015-01-11T12:06:21.500+0100: 1.545: [CMS-concurrent-sweep: 0.030/0.031 secs] [Times: user=0.01 sys=0.00, real=0.01 secs]
+2015-01-11T12:06:34.000+0100: 23.0: Total time for which application threads were stopped: 0.0123400 seconds
+"""
+
+
+def setup_module():
+  global tmp_dir
+  tmp_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tmp.' + str(uuid.uuid4()))
+  os.makedirs(tmp_dir)
+  for name, log in (('g1.log', G1_LOG), ('cms.log', CMS_LOG)):
+    with open(os.path.join(tmp_dir, name), 'w') as log_file:
+      log_file.write(log)
+
+
+def teardown_module():
+  if os.path.exists(tmp_dir):
+    shutil.rmtree(tmp_dir)
+
+
+def ts(timestamp):
+  return naarad.utils.get_standardized_timestamp(timestamp, None)
+
+
+def test_awk_number():
+  assert awk_number('0.0428320') == 0.042832
+  assert awk_number('816.0M') == 816.0
+  assert awk_number('16.0G') == 16.0
+  assert awk_number('secs]') == 0
+  assert awk_number(3.5) == 3.5
+
+
+def test_parse_g1_log():
+  columns = parse_gc_log(os.path.join(tmp_dir, 'g1.log'), GCMetric.val_types)
+  timestamps = [ts('2014-04-23T23:24:40.440')]
+  expected = {
+      'g1-pause-young': 0.042832,
+      'GCPause': 0.042832,
+      'g1-pause-young.parallel': 18.3,
+      'g1-pause-young.parallel.gcworkers': 18,
+      'g1-pause-young.parallel.gc-worker-start.avg': 11304.8,
+      'g1-pause-young.parallel.gc-worker-end.max': 11321.1,
+      'g1-pause-young.parallel.gc-worker-total.avg': 16.2,
+      'g1-pause-young.parallel.object-copy-rs.max': 14.3,
+      'g1-pause-young.code-root-fixup': 0.4,
+      'g1-pause-young.other.ref-proc': 21.3,
+      'g1-eden-occupancy-before-gc': 816,
+      'g1-eden-capacity-after-gc': 768,
+      'g1-survivor-after-gc': 48,
+      'g1-heap-occupancy-after-gc': 42.9,
+      'g1-heap-capacity-after-gc': 16,
+      'g1-young-cpu.usr': 0.37,
+      'g1-young-cpu.real': 0.04
+  }
+  for sub_metric, value in expected.items():
+    assert columns[sub_metric] == (timestamps, [value])
+  assert 'g1-pause-mixed' not in columns
+
+
+def test_parse_cms_log():
+  columns = parse_gc_log(os.path.join(tmp_dir, 'cms.log'), GCMetric.val_types)
+  young_timestamps = [ts('2015-01-11T12:06:20.100'), ts('2015-01-11T12:06:20.200')]
+  assert columns['gen0'] == (young_timestamps, [0.0081559, 0.0061559])
+  assert columns['gen0t'] == (young_timestamps, [0.0082548, 0.0062548])
+  assert columns['used0AfterGC'] == (young_timestamps, [320 / 1024.0, 320 / 1024.0])
+  assert columns['commit'] == (young_timestamps, [9920 / 1024.0, 9920 / 1024.0])
+  assert columns['cmsIM'] == ([ts('2015-01-11T12:06:21.000')], [0.0062443])
+  assert columns['cmsRM'] == ([ts('2015-01-11T12:06:21.400')], [0.2095526])
+  assert columns['cmsCM'] == ([ts('2015-01-11T12:06:21.300')], [0.202])
+  assert columns['cmsCS'] == ([ts('2015-01-11T12:06:21.500')], [0.03])
+  assert columns['safept'] == ([ts('2015-01-11T12:06:34.000')], [0.01234])
+  # gen0 is not a pause of the application on its own, gen0t covers it
+  assert columns['GCPause'][1] == [0.0082548, 0.0062548, 0.0062443, 0.2095526]
+
+
+def test_parse_sub_metrics_and_time_range():
+  columns = parse_gc_log(os.path.join(tmp_dir, 'cms.log'), ['gen0t', 'cmsRM'], ts('2015-01-11T12:06:20.150'),
+                         ts('2015-01-11T12:06:21.200'))
+  assert sorted(columns.keys()) == ['gen0t']
+  assert columns['gen0t'] == ([ts('2015-01-11T12:06:20.200')], [0.0062548])
+
+
+def test_parse_gc_logs():
+  infile_list = [os.path.join(tmp_dir, 'cms.log'), os.path.join(tmp_dir, 'g1.log'), os.path.join(tmp_dir, 'cms.log')]
+  columns = parse_gc_logs(infile_list, ['gen0t', 'GCPause'], workers=2)
+  assert columns['gen0t'][1] == [0.0082548, 0.0062548] * 2
+  assert columns['GCPause'][1] == [0.0082548, 0.0062548, 0.0062443, 0.2095526, 0.042832] + \
+      [0.0082548, 0.0062548, 0.0062443, 0.2095526]
+  assert columns == parse_gc_logs(infile_list, ['gen0t', 'GCPause'], workers=1)
+
+
+class RecordingMultiprocessing(object):
+  """
+  Stand-in for the multiprocessing module which records the number of processes of the pools it starts
+  """
+  def __init__(self):
+    self.pools = []
+
+  def __getattr__(self, name):
+    return getattr(multiprocessing, name)
+
+  def Pool(self, processes=None):
+    self.pools.append(processes)
+    return multiprocessing.Pool(processes=processes)
+
+
+def test_parse_gc_logs_pool_in_analysis():
+  """
+  GC metrics analyzed in threads parse their files in a pool of the workers of the analysis
+  """
+  config_file = os.path.join(tmp_dir, 'config-gc')
+  with open(config_file, 'w') as config:
+    config.write('[GLOBAL]\nworkers=2\n\n[GC]\ninfile=cms.log g1.log\nsub_metrics=gen0t GCPause\n')
+  recording_multiprocessing = RecordingMultiprocessing()
+  naarad_obj = naarad.Naarad()
+  naarad_obj.skip_plots = True
+  naarad.gc_log_parser.multiprocessing = recording_multiprocessing
+  try:
+    assert naarad_obj.analyze(tmp_dir, os.path.join(tmp_dir, 'analysis'), config=config_file) == CONSTANTS.OK
+  finally:
+    naarad.gc_log_parser.multiprocessing = multiprocessing
+  assert recording_multiprocessing.pools == [2]
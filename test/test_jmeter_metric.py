@@ -0,0 +1,144 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import gzip
+import os
+import shutil
+import sys
+import tarfile
+import uuid
+
+# add the path of ~/naarad/src;   the testing py is under ~/naarad/test
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')))
+from naarad.metrics.jmeter_metric import JmeterMetric
+
+# the temporary directory for testing, will remove it after done.
+tmp_dir = ''
+
+JTL = """<?xml version="1.0" encoding="UTF-8"?>
+<testResults version="1.2">
+<httpSample t="100" lt="10" ts="1383861309100" s="true" lb="search" rc="200" by="1000">
+  <httpSample t="5" lt="1" ts="1383861309100" s="true" lb="redirect" rc="302" by="10"/>
+  <responseData class="java.lang.String">results</responseData>
+</httpSample>
+<sample t="300" lt="20" ts="1383861309500" s="true" lb="home/page" rc="200" by="3000"/>
+<httpSample t="200" lt="10" ts="1383861310200" s="false" lb="search" rc="500" by="2000"/>
+<httpSample t="400" lt="10" ts="1383861310700" s="true" lb="search" rc="200" by="4000"/>
+</testResults>
+"""
+
+CSV_HEADER = 'timeStamp,elapsed,label,responseCode,responseMessage,threadName,dataType,success,failureMessage,bytes,sentBytes,grpThreads,' \
+             'allThreads,URL,Latency,IdleTime,Connect\n'
+
+CSV_JTL = """1383861309100,100,search,200,OK,Thread Group 1-1,text,true,,1000,120,1,1,http://host/search,10,0,2
+1383861309500,300,home/page,200,"OK, cached",Thread Group 1-1,text,true,,3000,120,1,1,http://host/,20,0,2
+1383861310200,200,search,500,Internal Server Error,Thread Group 1-1,text,false,failed,2000,120,1,1,http://host/search,10,0,2
+1383861310700,400,search,200,OK,Thread Group 1-1,text,true,,4000,120,1,1,http://host/search,10,0,2
+"""
+
+
+def setup_module():
+  global tmp_dir
+  tmp_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tmp.' + str(uuid.uuid4()))
+  os.makedirs(tmp_dir)
+  for name, jtl in (('result.jtl', JTL), ('result.csv', CSV_HEADER + CSV_JTL), ('result_no_header.csv', CSV_JTL),
+                    ('result_tabs.csv', (CSV_HEADER + CSV_JTL).replace('"OK, cached"', 'OK').replace(',', '\t'))):
+    with open(os.path.join(tmp_dir, name), 'w') as jtl_file:
+      jtl_file.write(jtl)
+
+
+def teardown_module():
+  if os.path.exists(tmp_dir):
+    shutil.rmtree(tmp_dir)
+
+
+def get_metric(infile='result.jtl'):
+  metric = JmeterMetric('JMETER', [os.path.join(tmp_dir, infile)], 'localhost', None, tmp_dir, tmp_dir, 'JMETER', None, None, {},
+                        None, None)
+  metric.graph_timezone = None
+  return metric
+
+
+def read_csv(metric, transaction, column):
+  with open(metric.get_csv(transaction, column)) as csv_file:
+    return csv_file.read().split('\n')
+
+
+def test_iter_samples():
+  metric = get_metric()
+  samples = [(sample.tag, sample.get('lb')) for sample in metric.iter_samples(os.path.join(tmp_dir, 'result.jtl'))]
+  assert samples == [('httpSample', 'search'), ('sample', 'home/page'), ('httpSample', 'search'), ('httpSample', 'search')]
+
+
+def test_parse_xml_jtl():
+  check_parsed_metric(get_metric())
+
+
+def test_parse_gzip_xml_jtl():
+  with open(os.path.join(tmp_dir, 'result.jtl'), 'rb') as jtl_file:
+    with gzip.open(os.path.join(tmp_dir, 'result.jtl.gz'), 'wb') as gzip_file:
+      gzip_file.write(jtl_file.read())
+  metric = get_metric('result.jtl.gz')
+  assert not metric.is_csv_jtl(metric.infile_list[0])
+  check_parsed_metric(metric)
+
+
+def test_parse_archived_jtl():
+  with tarfile.open(os.path.join(tmp_dir, 'results.tar.gz'), 'w:gz') as tar:
+    tar.add(os.path.join(tmp_dir, 'result.jtl'), 'jmeter/result.jtl')
+    tar.add(os.path.join(tmp_dir, 'result.csv'), 'jmeter/result.csv')
+  for infile in ('results.tar.gz/jmeter/result.jtl', 'results.tar.gz/result.csv'):
+    check_parsed_metric(get_metric(infile))
+  assert not get_metric('results.tar.gz/missing.jtl').parse()
+
+
+def test_parse_csv_jtl():
+  for infile in ('result.csv', 'result_no_header.csv', 'result_tabs.csv'):
+    metric = get_metric(infile)
+    assert metric.is_csv_jtl(metric.infile_list[0])
+    check_parsed_metric(metric)
+
+
+def check_parsed_metric(metric):
+  assert metric.parse()
+  assert read_csv(metric, 'search', 't') == ['1383861309000,100.0', '1383861310000,300.0']
+  assert read_csv(metric, 'home_page', 'by') == ['1383861309000,3000.0']
+  assert read_csv(metric, 'Overall_Summary', 't') == ['1383861309000,200.0', '1383861310000,300.0']
+  assert read_csv(metric, 'Overall_Summary', 'qps') == ['1383861309000,2.0', '1383861310000,1.0']
+  assert read_csv(metric, 'search', 'eqps') == ['1383861310000,1.0']
+  assert metric.calculated_stats['Overall_Summary.ResponseTime']['mean'] == 250.0
+  assert metric.calculated_stats['Overall_Summary.ResponseTime']['max'] == 400.0
+  assert metric.calculated_percentiles['search.ResponseSize'][50] == 2000.0
+  assert 'redirect.ResponseTime' not in metric.calculated_stats
+  sub_metrics = [transaction + '.' + column for transaction in ('search', 'home_page', 'Overall_Summary')
+                 for column in ('ResponseTime', 'ResponseSize', 'qps', 'DataThroughput')]
+  assert sorted(metric.calculated_stats.keys()) == sorted(sub_metrics + ['Overall_Summary.ErrorsPerSecond', 'search.ErrorsPerSecond'])
+
+
+def test_parse_xml_jtl_sketch():
+  metric = get_metric()
+  metric.exact_percentiles_threshold = 2
+  assert metric.parse()
+  assert metric.calculated_stats['Overall_Summary.ResponseTime']['mean'] == 250.0
+  assert metric.calculated_stats['Overall_Summary.ResponseTime']['min'] == 100.0
+  assert 100.0 <= metric.calculated_percentiles['Overall_Summary.ResponseTime'][50] <= 400.0
+
+
+def test_parse_csv_jtl_missing_columns():
+  with open(os.path.join(tmp_dir, 'result_missing.csv'), 'w') as jtl_file:
+    jtl_file.write('timeStamp,elapsed,label\n1383861309100,100,search\n')
+  assert not get_metric('result_missing.csv').parse()
@@ -0,0 +1,134 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import ConfigParser
+import multiprocessing
+import os
+import shutil
+import sys
+import uuid
+
+# add the path of ~/naarad/src;   the testing py is under ~/naarad/test
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')))
+import naarad
+import naarad.utils
+import naarad.naarad_constants as CONSTANTS
+from naarad.metrics.metric import Metric
+from luminol import anomaly_detector
+
+# the temporary directory for testing, will remove it after done.
+tmp_dir = ''
+
+
+def setup_module():
+  global tmp_dir
+  tmp_dir = os.path.join('./', 'tmp' + '.' + str(uuid.uuid4()))
+  os.makedirs(os.path.join(tmp_dir, 'resources'))
+  with open(os.path.join(tmp_dir, 'latency.out'), 'w') as fh:
+    for second in range(60):
+      fh.write('2014-04-14 12:09:%02d,%d,%d\n' % (second, second % 7, 100 + second))
+
+
+def teardown_module():
+  shutil.rmtree(tmp_dir)
+
+
+def _create_metrics():
+  metrics = []
+  for label in ('LATENCY-1', 'LATENCY-2'):
+    metrics.append(Metric(label, ['latency.out'], 'localhost', None, tmp_dir, 'resources', label, None, None,
+                          {'queue': 'max<5 mean<3'}, [], None, columns='queue rt', sep=','))
+  return metrics
+
+
+def test_parse_and_plot_metrics_in_processes():
+  """
+  Metrics analyzed in worker processes should end up with the same results as metrics analyzed in this process
+  """
+  expected_metrics = _create_metrics()
+  for metric in expected_metrics:
+    naarad.utils.parse_and_plot_single_metrics(metric, None, tmp_dir, tmp_dir, None, True)
+  metrics = _create_metrics()
+  naarad.utils.parse_and_plot_metrics_in_processes(metrics, None, tmp_dir, tmp_dir, None, True, 2)
+  for metric, expected_metric in zip(metrics, expected_metrics):
+    assert len(metric.csv_files) == 3
+    assert sorted(metric.csv_files) == sorted(expected_metric.csv_files)
+    assert metric.calculated_stats == expected_metric.calculated_stats
+    assert metric.calculated_percentiles == expected_metric.calculated_percentiles
+    assert dict(metric.summary_stats) == dict(expected_metric.summary_stats)
+    assert metric.status == expected_metric.status == CONSTANTS.SLA_FAILED
+    sla = metric.sla_map[metric.label]['queue']['max']
+    assert sla.sla_passed is False
+    assert sla in metric.sla_list
+
+
+class RecordingMultiprocessing(object):
+  """
+  Stand-in for the multiprocessing module which records the number of processes of the pools it starts
+  """
+  def __init__(self):
+    self.pools = []
+
+  def __getattr__(self, name):
+    return getattr(multiprocessing, name)
+
+  def Pool(self, processes=None):
+    self.pools.append(processes)
+    return multiprocessing.Pool(processes=processes)
+
+
+def test_anomaly_detection_pool():
+  """
+  Metrics analyzed in threads detect anomalies in a pool of the workers of the analysis
+  """
+  config_file = os.path.join(tmp_dir, 'config-anomalies')
+  with open(config_file, 'w') as fh:
+    fh.write('[GLOBAL]\nworkers=2\n\n[LATENCY]\ninfile=latency.out\ncolumns=queue rt\nsep=,\nanomaly_detection_metrics=queue rt\n')
+  recording_multiprocessing = RecordingMultiprocessing()
+  naarad_obj = naarad.Naarad()
+  naarad_obj.skip_plots = True
+  anomaly_detector.multiprocessing = recording_multiprocessing
+  try:
+    assert naarad_obj.analyze(tmp_dir, os.path.join(tmp_dir, 'anomalies'), config=config_file) == CONSTANTS.OK
+  finally:
+    anomaly_detector.multiprocessing = multiprocessing
+  assert recording_multiprocessing.pools == [2]
+
+
+def test_parse_executor_options():
+  config = ConfigParser.ConfigParser()
+  config.add_section('GLOBAL')
+  assert naarad.utils.parse_executor_options(config, 'GLOBAL') == (None, None)
+  config.set('GLOBAL', 'executor', 'Process')
+  config.set('GLOBAL', 'workers', '4')
+  assert naarad.utils.parse_executor_options(config, 'GLOBAL') == (CONSTANTS.PROCESS_EXECUTOR, 4)
+  assert not config.has_option('GLOBAL', 'executor')
+  config.set('GLOBAL', 'executor', 'fork')
+  config.set('GLOBAL', 'workers', '-1')
+  assert naarad.utils.parse_executor_options(config, 'GLOBAL') == (None, None)
+
+
+def test_workers_argument():
+  """
+  --workers switches to the process executor, invalid numbers of workers are ignored
+  """
+  naarad_obj = naarad.Naarad()
+  default = (CONSTANTS.DEFAULT_EXECUTOR, None)
+  for arguments, expected in [([], default), (['-w', '3'], (CONSTANTS.PROCESS_EXECUTOR, 3)), (['-w', '0'], default), (['--workers', '-2'], default)]:
+    analysis = naarad._Analysis(None, None)
+    naarad_obj._process_args(analysis, naarad.utils.get_argument_parser().parse_args(arguments))
+    assert (analysis.executor, analysis.workers) == expected
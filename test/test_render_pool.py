@@ -0,0 +1,95 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import shutil
+import sys
+import uuid
+
+# add the path of ~/naarad/src;   the testing py is under ~/naarad/test
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')))
+import numpy
+import matplotlib.image
+import naarad.graphing.matplotlib_naarad as matplotlib_naarad
+from naarad.graphing.plot_data import PlotData
+
+# the temporary directory for testing, will remove it after done.
+tmp_dir = ''
+
+
+def setup_module():
+  global tmp_dir
+  tmp_dir = os.path.join('./', 'tmp' + '.' + str(uuid.uuid4()))
+  os.makedirs(tmp_dir)
+  with open(os.path.join(tmp_dir, 'GC.GCPause.csv'), 'w') as fh:
+    fh.write('\n'.join('%d,%f' % (1398295480440 + i * 1000, (i % 17) / 10.0) for i in range(300)))
+  with open(os.path.join(tmp_dir, 'GC.GCPause.percentiles.csv'), 'w') as fh:
+    fh.write('\n'.join('%d,%f' % (i, i / 50.0) for i in range(101)))
+  with open(os.path.join(tmp_dir, 'GC.bad.csv'), 'w') as fh:
+    fh.write('1398295480440,abc\n')
+
+
+def teardown_module():
+  shutil.rmtree(tmp_dir)
+
+
+def _graph(suffix):
+  timeseries_plot = PlotData(os.path.join(tmp_dir, 'GC.GCPause.csv'), 1, 'GC.GCPause', 'seconds', None, 600, 1200, 'line')
+  percentiles_plot = PlotData(os.path.join(tmp_dir, 'GC.GCPause.percentiles.csv'), 1, 'GC.GCPause.percentiles', 'seconds', None, 600, 1200,
+                              'line', x_label='Percentiles')
+  bad_plot = PlotData(os.path.join(tmp_dir, 'GC.bad.csv'), 1, 'GC.bad', 'seconds', None, 600, 1200, 'line')
+  return [matplotlib_naarad.graph_data([timeseries_plot], tmp_dir, 'resources', 'GC.GCPause' + suffix),
+          matplotlib_naarad.graph_data_on_the_same_graph([percentiles_plot], tmp_dir, 'resources', 'GC.GCPause.percentiles' + suffix),
+          matplotlib_naarad.graph_data([bad_plot], tmp_dir, 'resources', 'GC.bad' + suffix)]
+
+
+def test_render_pool():
+  """
+  Charts rendered by the render pool should be the same as the ones rendered by the calling thread. Charts which fail
+  to render are reported by wait_for_render_pool()
+  """
+  matplotlib_naarad.start_render_pool(2)
+  results = _graph('.pool')
+  assert all(graphed for graphed, div_file in results)
+  failed_div_files = matplotlib_naarad.wait_for_render_pool()
+  assert failed_div_files == set([os.path.join(tmp_dir, 'GC.bad.pool.div')])
+  assert matplotlib_naarad.wait_for_render_pool() == set()
+  try:
+    _graph('.inline')
+  except ValueError:
+    pass
+  for name in ('GC.GCPause', 'GC.GCPause.percentiles'):
+    assert os.path.exists(os.path.join(tmp_dir, name + '.pool.div'))
+    pool_image = matplotlib.image.imread(os.path.join(tmp_dir, name + '.pool.png'))
+    inline_image = matplotlib.image.imread(os.path.join(tmp_dir, name + '.inline.png'))
+    assert numpy.array_equal(pool_image, inline_image)
+
+
+def test_stop_render_pool():
+  """
+  A render pool stopped without waiting for it, e.g. when the analysis failed, should not be used by later charts
+  """
+  matplotlib_naarad.start_render_pool(2)
+  _graph('.stopped')
+  matplotlib_naarad.stop_render_pool()
+  assert matplotlib_naarad._render_pool is None
+  assert matplotlib_naarad.wait_for_render_pool() == set()
+  try:
+    _graph('.after')
+  except ValueError:
+    pass
+  assert os.path.exists(os.path.join(tmp_dir, 'GC.GCPause.after.png'))
@@ -0,0 +1,98 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import gzip
+import os
+import shutil
+import sys
+import tarfile
+import uuid
+
+# add the path of ~/naarad/src;   the testing py is under ~/naarad/test
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')))
+import naarad.naarad_constants as CONSTANTS
+from naarad.metrics.sar_metric import SARMetric
+
+# the temporary directory for testing, will remove it after done.
+tmp_dir = ''
+
+
+def setup_module():
+  global tmp_dir
+  tmp_dir = os.path.join('./', 'tmp' + '.' + str(uuid.uuid4()))
+  os.makedirs(os.path.join(tmp_dir, 'resources'))
+  log = []
+  log.append('Linux 2.6.32 (machine1) \t02/23/2012 \t_x86_64_\t(24 CPU)')
+  log.append('')
+  log.append('09:29:18 PM   frmpg/s   bufpg/s   campg/s')
+  log.append('09:29:20 PM  -1379.50     69.00 -13747.50')
+  log.append('09:29:22 PM   -311.00     44.50 -12618.50')
+  log.append('09:29:24 PM   1057.00      1.50  -6196.50')
+  log.append('09:29:26 PM    264.50     -0.50   -398.50')
+  log.append('09:29:28 PM  64617.91     -6.97 -70561.69')
+  log.append('Average:     12849.78     21.51 -20704.54')
+  with open(os.path.join(tmp_dir, 'sar.memory.out'), 'w') as fh:
+    fh.write('\n'.join(log))
+  with gzip.open(os.path.join(tmp_dir, 'sar.memory.out.gz'), 'wb') as fh:
+    fh.write('\n'.join(log))
+  tar = tarfile.open(os.path.join(tmp_dir, 'sar-results.tar.gz'), 'w:gz')
+  tar.add(os.path.join(tmp_dir, 'sar.memory.out'), 'sar-results-2012-02-23/sar.memory.out')
+  tar.close()
+
+
+def teardown_module():
+  shutil.rmtree(tmp_dir)
+
+
+def _parse_metric(label, infile='sar.memory.out'):
+  metric = SARMetric('SAR-memory', [os.path.join(tmp_dir, infile)], 'localhost', None, tmp_dir, 'resources', label, None, None,
+                     {}, [], None)
+  metric.timezone = 'UTC'
+  metric.graph_timezone = None
+  metric.device_types = CONSTANTS.device_type_metrics
+  metric.parse()
+  return metric
+
+
+def test_stats_from_series_store():
+  """
+  Stats calculated from the series store, saved from the rows handed over by parse(), should be the same as the ones
+  calculated from the csv files
+  """
+  metric = _parse_metric('STORE')
+  assert sorted(metric.csv_rows.keys()) == sorted(metric.csv_files)
+  metric.save_series_store()
+  assert not metric.csv_rows
+  assert os.path.exists(os.path.join(tmp_dir, 'resources', 'STORE.series.npz'))
+  metric.calculate_stats()
+  from_disk_metric = _parse_metric('FROM-DISK')
+  from_disk_metric.csv_rows = {}
+  from_disk_metric.calculate_stats()
+  assert metric.calculated_stats == from_disk_metric.calculated_stats
+  assert metric.calculated_percentiles == from_disk_metric.calculated_percentiles
+  assert metric.calculated_stats['frmpg/s']['max'] == 64617.91
+
+
+def test_compressed_input():
+  """
+  gzip compressed inputs and inputs in tar archives should be parsed as if they had been extracted
+  """
+  metric = _parse_metric('PLAIN')
+  for infile in ('sar.memory.out.gz', 'sar-results.tar.gz/sar-results-2012-02-23/sar.memory.out'):
+    compressed_metric = _parse_metric('COMPRESSED', infile)
+    assert compressed_metric.collect()
+    assert sorted(compressed_metric.csv_rows.values()) == sorted(metric.csv_rows.values())
@@ -0,0 +1,73 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import shutil
+import sys
+import uuid
+
+# add the path of ~/naarad/src;   the testing py is under ~/naarad/test
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')))
+import numpy
+import naarad.series_store
+
+# the temporary directory for testing, will remove it after done.
+tmp_dir = ''
+
+
+def setup_module():
+  global tmp_dir
+  tmp_dir = os.path.join('./', 'tmp' + '.' + str(uuid.uuid4()))
+  os.makedirs(tmp_dir)
+
+
+def teardown_module():
+  shutil.rmtree(tmp_dir)
+
+
+def test_write_and_read_store():
+  store_file = os.path.join(tmp_dir, 'SAR-device.host1' + '.series.npz')
+  series = {
+      os.path.join(tmp_dir, 'SAR-device.host1.sda.tps.csv'): ([1330032560000, 1330032562000], ['3.50', '4']),
+      os.path.join(tmp_dir, 'SAR-device.host1.sdb.tps.csv'): (numpy.arange(1000, dtype=numpy.int64), numpy.arange(1000) / 3.0),
+      os.path.join(tmp_dir, 'SAR-device.host1.sdc.tps.csv'): ([], [])
+  }
+  naarad.series_store.write_store(store_file, series)
+  store = naarad.series_store.open_store(store_file)
+  assert isinstance(store.values, numpy.memmap)
+  timestamps, values = store.get(os.path.join(tmp_dir, 'SAR-device.host1.sda.tps.csv'))
+  assert timestamps.dtype == numpy.int64
+  assert timestamps.tolist() == [1330032560000, 1330032562000]
+  assert values.tolist() == [3.5, 4.0]
+  timestamps, values = naarad.series_store.read_series(os.path.join(tmp_dir, 'SAR-device.host1.sdb.tps.csv'))
+  assert timestamps.tolist() == range(1000)
+  assert numpy.array_equal(values, numpy.arange(1000) / 3.0)
+  assert len(naarad.series_store.read_series(os.path.join(tmp_dir, 'SAR-device.host1.sdc.tps.csv'))[0]) == 0
+  assert store.get(os.path.join(tmp_dir, 'SAR-device.host1.sdd.tps.csv')) is None
+  # a rewritten store is opened again
+  naarad.series_store.write_store(store_file, {os.path.join(tmp_dir, 'SAR-device.host1.sda.tps.csv'): ([1], [2])})
+  assert naarad.series_store.read_series(os.path.join(tmp_dir, 'SAR-device.host1.sda.tps.csv'))[1].tolist() == [2.0]
+
+
+def test_read_series_without_store():
+  csv_file = os.path.join(tmp_dir, 'GC.appstop.csv')
+  with open(csv_file, 'w') as fh:
+    fh.write('1398295480440,0.0428320\n1398295487030,bad\n2014-04-24 00:00:00,0.5\n')
+  timestamps, values = naarad.series_store.read_series(csv_file)
+  assert timestamps.tolist()[0] == 1398295480440
+  assert len(timestamps) == 2
+  assert values.tolist() == [0.042832, 0.5]
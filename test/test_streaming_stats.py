@@ -0,0 +1,138 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import random
+import shutil
+import sys
+import uuid
+
+# add the path of ~/naarad/src;   the testing py is under ~/naarad/test
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')))
+import numpy
+import naarad.utils
+from naarad.metrics.metric import Metric
+from naarad.streaming_stats import QuantileSketch, StreamingStats
+
+# the temporary directory for testing, will remove it after done.
+tmp_dir = ''
+
+
+def setup_module():
+  global tmp_dir
+  tmp_dir = os.path.join('./', 'tmp' + '.' + str(uuid.uuid4()))
+  os.makedirs(os.path.join(tmp_dir, 'resources'))
+  random.seed(7)
+  with open(os.path.join(tmp_dir, 'requests.out'), 'w') as fh:
+    for second in range(120):
+      for request in range(20):
+        fh.write('2014-04-14 12:%02d:%02d,%s,%.3f\n' % (second / 60, second % 60, random.choice(['GET', 'PUT']), random.expovariate(0.1)))
+
+
+def teardown_module():
+  shutil.rmtree(tmp_dir)
+
+
+def _parse_metric(label, **other_options):
+  metric = Metric(label, [os.path.join(tmp_dir, 'requests.out')], 'localhost', None, tmp_dir, 'resources', label, None, None, {}, [], None,
+                  columns='method latency', sep=',', groupby='method', **other_options)
+  metric.timezone = 'UTC'
+  metric.graph_timezone = 'UTC'
+  metric.parse()
+  return metric
+
+
+def test_quantile_sketch_accuracy():
+  random.seed(11)
+  values = [random.lognormvariate(0, 1) for i in range(50000)]
+  sketch = QuantileSketch()
+  for value in values[:25000]:
+    sketch.add(value)
+  other_sketch = QuantileSketch()
+  for value in values[25000:]:
+    other_sketch.add(value)
+  sketch.merge(other_sketch)
+  assert sketch.count == len(values)
+  assert len(sketch._centroids) < 1000
+  for percentile in (1, 25, 50, 75, 90, 99):
+    expected = numpy.percentile(values, percentile)
+    assert abs(sketch.quantile(percentile / 100.0) - expected) / expected < 0.02
+  assert sketch.quantile(0) == min(values)
+  assert sketch.quantile(1) == max(values)
+
+
+def test_streaming_stats_exact_fallback():
+  values = [random.random() for i in range(500)]
+  stats = StreamingStats(exact_threshold=1000)
+  for value in values:
+    stats.add(value)
+  assert stats.is_exact()
+  assert stats.get_stats(['mean', 'max'], [50, 99]) == naarad.utils.calculate_stats(values, ['mean', 'max'], [50, 99])
+  other_stats = StreamingStats(exact_threshold=1000)
+  for value in values:
+    other_stats.add(value)
+  stats.merge(other_stats)
+  stats.merge(other_stats)
+  assert not stats.is_exact()
+  calculated_stats, calculated_percentiles = stats.get_stats(['mean', 'std', 'min', 'max'], [50])
+  assert abs(calculated_stats['mean'] - numpy.mean(values)) < 1e-9
+  assert abs(calculated_stats['std'] - numpy.std(values)) < 1e-9
+  assert calculated_stats['min'] == min(values)
+  assert calculated_stats['max'] == max(values)
+  assert abs(calculated_percentiles[50] - numpy.percentile(values, 50)) < 0.02
+
+
+def test_streaming_stats_add_values():
+  values = [random.random() * 100 for i in range(3000)]
+  stats = StreamingStats(exact_threshold=1000)
+  stats.add_values(values[:500])
+  assert stats.is_exact()
+  stats.add_values(numpy.array(values[500:2000]))
+  for value in values[2000:]:
+    stats.add(value)
+  assert not stats.is_exact()
+  assert stats.count == len(values)
+  calculated_stats, calculated_percentiles = stats.get_stats(['mean', 'std', 'min', 'max'], [50])
+  assert abs(calculated_stats['mean'] - numpy.mean(values)) < 1e-9
+  assert abs(calculated_stats['std'] - numpy.std(values)) < 1e-9
+  assert calculated_stats['min'] == min(values)
+  assert calculated_stats['max'] == max(values)
+  assert abs(calculated_percentiles[50] - numpy.percentile(values, 50)) < 2
+
+
+def test_streaming_aggregation_parse():
+  """
+  Streaming aggregation should write the same time series as the default aggregation. Stats are exact below the
+  threshold and close to the exact ones above it.
+  """
+  exact_metric = _parse_metric('EXACT')
+  exact_streaming_metric = _parse_metric('EXACT_STREAMING', streaming_aggregation='true')
+  sketch_metric = _parse_metric('SKETCH', streaming_aggregation='true', exact_percentiles_threshold='100')
+  for csv_file in exact_metric.csv_files:
+    with open(csv_file) as fh:
+      expected_data = fh.read()
+    for metric in (exact_streaming_metric, sketch_metric):
+      with open(csv_file.replace('EXACT.', metric.label + '.')) as fh:
+        assert fh.read() == expected_data
+  assert sorted(exact_metric.calculated_stats.keys()) == sorted(sketch_metric.calculated_stats.keys())
+  for sub_metric in ('GET.latency', 'PUT.latency', 'Overall_summary.latency'):
+    assert exact_streaming_metric.calculated_percentiles[sub_metric] == exact_metric.calculated_percentiles[sub_metric]
+    for stat in ('mean', 'std', 'min', 'max'):
+      assert abs(sketch_metric.calculated_stats[sub_metric][stat] - exact_metric.calculated_stats[sub_metric][stat]) < 1e-6
+    for percentile in (50, 75, 90):
+      expected = exact_metric.calculated_percentiles[sub_metric][percentile]
+      assert abs(sketch_metric.calculated_percentiles[sub_metric][percentile] - expected) / expected < 0.05
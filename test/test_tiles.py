@@ -0,0 +1,93 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import os
+import shutil
+import sys
+import uuid
+
+# add the path of ~/naarad/src;   the testing py is under ~/naarad/test
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')))
+import numpy
+import naarad
+import naarad.naarad_constants as CONSTANTS
+import naarad.tiles
+
+# the temporary directory for testing, will remove it after done.
+tmp_dir = ''
+
+
+def setup_module():
+  global tmp_dir
+  tmp_dir = os.path.join('./', 'tmp' + '.' + str(uuid.uuid4()))
+  os.makedirs(tmp_dir)
+
+
+def teardown_module():
+  shutil.rmtree(tmp_dir)
+
+
+def test_aggregate():
+  buckets, minimums, averages, maximums = naarad.tiles.aggregate([12000, 1000, 2500, 9999], [4.0, 1.0, 3.0, 2.0], 10000)
+  assert buckets.tolist() == [0, 10000]
+  assert minimums.tolist() == [1.0, 4.0]
+  assert averages.tolist() == [2.0, 4.0]
+  assert maximums.tolist() == [3.0, 4.0]
+
+
+def test_write_tiles():
+  # 10 hours of 1 second data
+  timestamps = 1398295480000 + numpy.arange(36000, dtype=numpy.int64) * 1000
+  values = numpy.arange(36000) % 60
+  csv_file = os.path.join(tmp_dir, 'SAR-cpuusage.all.%sys.csv')
+  assert naarad.tiles.write_tiles(csv_file, timestamps, values, 40000) is None
+  tiles_directory = naarad.tiles.write_tiles(csv_file, timestamps, values, 4000, chunk_points=100)
+  assert tiles_directory == os.path.join(tmp_dir, 'SAR-cpuusage.all.%sys.tiles')
+  with open(os.path.join(tiles_directory, 'index.json')) as FH:
+    index = json.load(FH)
+  assert index['chunk_points'] == 100
+  assert [level['resolution'] for level in index['levels']] == [1000, 10000, 60000, 600000]
+  coarsest = index['levels'][-1]
+  assert coarsest['chunks'] == [23304, 23305]
+  rows = []
+  for chunk in coarsest['chunks']:
+    with open(os.path.join(tiles_directory, '600000.%d.csv' % chunk)) as FH:
+      rows.extend(line.strip().split(',') for line in FH)
+  assert len(rows) == 61
+  assert [float(value) for value in rows[1][1:]] == [0.0, 29.5, 59.0]
+  assert sum(len(level['chunks']) for level in index['levels']) + 1 == len(os.listdir(tiles_directory))
+
+
+def test_tiles_options():
+  """
+  Tiles are written for the client charting page of reports unless the REPORT or the metric turns them off
+  """
+  with open(os.path.join(tmp_dir, 'latency.out'), 'w') as FH:
+    FH.writelines('2014-04-14 12:%02d:%02d,%d\n' % (second / 60, second % 60, second % 7) for second in range(600))
+  for index, (report_options, metric_options, expected) in enumerate([('', '', True), ('[REPORT]\ntiles=false\n', '', False),
+                                                                      ('', 'tiles=0\n', False), ('[REPORT]\ntiles=0\n', 'tiles=1\n', True)]):
+    config_file = os.path.join(tmp_dir, 'config-tiles-%d' % index)
+    with open(config_file, 'w') as FH:
+      FH.write('[LATENCY]\ninfile=latency.out\ncolumns=rt\nsep=,\nplot_points=100\n%s\n%s' % (metric_options, report_options))
+    output_directory = os.path.join(tmp_dir, 'report-%d' % index)
+    naarad_obj = naarad.Naarad()
+    naarad_obj.skip_plots = True
+    assert naarad_obj.analyze(tmp_dir, output_directory, config=config_file) == CONSTANTS.OK
+    assert os.path.isdir(os.path.join(output_directory, 'resources', 'LATENCY.rt.tiles')) == expected
+    with open(os.path.join(output_directory, CONSTANTS.CLIENT_CHARTING_FILE)) as FH:
+      assert ('tilesEnabled = false;' in FH.read()) == ('tiles=f' in report_options or 'tiles=0' in report_options)
@@ -0,0 +1,98 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import calendar
+import datetime
+import os
+import sys
+
+# add the path of ~/naarad/src;   the testing py is under ~/naarad/test
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')))
+import naarad.utils
+from naarad.timestamp_parser import LRUCache, TimestampParser
+
+
+def strptime_epoch_ms(timestamp, ts_format):
+  """
+  Reference conversion going through strptime for every timestamp
+  """
+  dt_obj = datetime.datetime.strptime(timestamp, ts_format)
+  return calendar.timegm(dt_obj.utctimetuple()) * 1000 + dt_obj.microsecond / 1000
+
+
+def test_parse_matches_strptime():
+  timestamps = {
+      '%Y-%m-%d %H:%M:%S': ['2014-04-14 12:09:01', '2014-04-14 12:09:01', '2014-04-14 12:09:02', '2012-02-29 23:59:59'],
+      '%Y-%m-%d %H:%M:%S.%f': ['2014-04-14 12:09:01.67581', '2014-04-14 12:09:01.9', '2014-04-14 12:09:03.123456'],
+      '%Y-%m-%dT%H:%M:%S.%f': ['2014-04-14T12:09:01.001', '2014-04-14T12:09:01.999'],
+      '%Y-%m-%d_%H:%M:%S': ['2013-12-02_11:20:59'],
+      '%Y%m%d %H:%M:%S.%f': ['20140414 12:09:01.500', '20140414 12:10:01.500'],
+      '%Y%m%dT%H:%M:%S': ['20140414T12:09:01']
+  }
+  for ts_format, format_timestamps in timestamps.items():
+    timestamp_parser = TimestampParser()
+    for timestamp in format_timestamps:
+      assert timestamp_parser.parse(timestamp) == strptime_epoch_ms(timestamp, ts_format)
+      assert naarad.utils.get_standardized_timestamp(timestamp, None) == strptime_epoch_ms(timestamp, ts_format)
+    assert timestamp_parser.ts_format == ts_format
+
+
+def test_parse_epoch():
+  assert TimestampParser().parse('1397477341') == 1397477341000
+  assert TimestampParser().parse('1397477341123') == 1397477341123
+  assert TimestampParser().parse('1397477341.123') == 1397477341123
+  assert naarad.utils.get_standardized_timestamp(1397477341123, None) == 1397477341123
+
+
+def test_parse_invalid():
+  timestamp_parser = TimestampParser()
+  assert timestamp_parser.parse('Linux 2.6.32') == -1
+  assert timestamp_parser.ts_format is None
+  assert timestamp_parser.parse('2014-04-14 12:09:01') == strptime_epoch_ms('2014-04-14 12:09:01', '%Y-%m-%d %H:%M:%S')
+  # the format is locked after the first successful detection
+  assert timestamp_parser.parse('1397477341') == -1
+  assert timestamp_parser.parse('2014-13-14 12:09:01') == -1
+  assert timestamp_parser.parse('2014-02-30 12:09:01') == -1
+  assert timestamp_parser.parse('2014/04/14 12:09:01') == -1
+  timestamp_parser = TimestampParser()
+  assert timestamp_parser.parse('2014-04-14 12:09:01.5') != -1
+  assert timestamp_parser.parse('2014-04-14 12:09:01.1234567') == -1
+  assert timestamp_parser.parse('2014-04-14 12:09:01,5') == -1
+
+
+def test_lru_cache():
+  cache = LRUCache(2)
+  cache.put('a', 1)
+  cache.put('b', 2)
+  assert cache.get('a') == 1
+  cache.put('c', 3)
+  assert cache.get('b') is None
+  assert cache.get('a') == 1
+  assert cache.get('c') == 3
+  assert len(cache) == 2
+
+
+def test_reconcile_timezones():
+  pdt_ts = strptime_epoch_ms('2014-04-14 12:09:01.250', '%Y-%m-%d %H:%M:%S.%f')
+  utc_ts = strptime_epoch_ms('2014-04-14 19:09:01.250', '%Y-%m-%d %H:%M:%S.%f')
+  assert naarad.utils.reconcile_timezones(pdt_ts, 'PDT', 'UTC') == utc_ts
+  assert naarad.utils.reconcile_timezones(utc_ts, 'UTC', 'PDT') == pdt_ts
+  assert naarad.utils.reconcile_timezones(utc_ts, 'UTC', 'UTC') == utc_ts
+  assert naarad.utils.reconcile_timezones(utc_ts, 'PDT', None) == utc_ts
+  # standard time in winter
+  pst_ts = strptime_epoch_ms('2014-01-14 12:09:01', '%Y-%m-%d %H:%M:%S')
+  assert naarad.utils.reconcile_timezones(pst_ts, 'PDT', 'UTC') == strptime_epoch_ms('2014-01-14 20:09:01', '%Y-%m-%d %H:%M:%S')
@@ -0,0 +1,81 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import calendar
+import datetime
+import os
+import random
+import sys
+
+# add the path of ~/naarad/src;   the testing py is under ~/naarad/test
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')))
+from naarad.timezone_converter import get_timezone, is_valid_timezone, TimezoneConverter
+
+ZONES = ['UTC', 'PDT', 'Europe/London', 'Asia/Kolkata', 'Australia/Lord_Howe', 'America/Sao_Paulo']
+
+
+def pytz_convert(timestamp, ts_timezone, graph_timezone):
+  """
+  Reference conversion localizing every timestamp with pytz
+  """
+  dt_obj = get_timezone(ts_timezone).localize(datetime.datetime.utcfromtimestamp(timestamp / 1000))
+  dt_obj = dt_obj.astimezone(get_timezone(graph_timezone)).replace(tzinfo=None)
+  return calendar.timegm(dt_obj.timetuple()) * 1000 + timestamp % 1000
+
+
+def get_test_timestamps(ts_timezone):
+  """
+  Random timestamps plus timestamps around every DST transition of ts_timezone between 2000 and 2030
+  """
+  random.seed(3)
+  timestamps = [random.randint(946684800000, 1893456000000) for i in range(2000)]
+  tz = get_timezone(ts_timezone)
+  for transition in getattr(tz, '_utc_transition_times', []):
+    if 2000 <= transition.year < 2030:
+      transition_ts = calendar.timegm(transition.timetuple()) * 1000
+      timestamps.extend(transition_ts + offset * 900 * 1000 + 1 for offset in range(-8, 9))
+  return timestamps
+
+
+def test_convert_matches_pytz():
+  for ts_timezone in ZONES:
+    timestamps = get_test_timestamps(ts_timezone)
+    for graph_timezone in ZONES:
+      if ts_timezone == graph_timezone:
+        continue
+      timezone_converter = TimezoneConverter(ts_timezone, graph_timezone)
+      converted = timezone_converter.convert(timestamps).tolist()
+      for timestamp, converted_timestamp in zip(timestamps, converted):
+        expected = pytz_convert(timestamp, ts_timezone, graph_timezone)
+        assert converted_timestamp == expected
+        assert timezone_converter.convert_timestamp(timestamp) == expected
+
+
+def test_no_conversion():
+  timestamps = [1397477341123, 1397477342123]
+  for ts_timezone, graph_timezone in (('PDT', None), ('UTC', 'UTC'), ('PDT', 'PST'), ('PST', 'US/Pacific')):
+    timezone_converter = TimezoneConverter(ts_timezone, graph_timezone)
+    assert not timezone_converter.enabled
+    assert timezone_converter.convert(timestamps).tolist() == timestamps
+    assert timezone_converter.convert_timestamp(timestamps[0]) == timestamps[0]
+
+
+def test_is_valid_timezone():
+  assert is_valid_timezone('UTC')
+  assert is_valid_timezone('PDT')
+  assert is_valid_timezone('Asia/Tokyo')
+  assert not is_valid_timezone('Mars/Olympus_Mons')
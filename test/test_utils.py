@@ -0,0 +1,56 @@
+# coding=utf-8
+"""
+Copyright 2013 LinkedIn Corp. All rights reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import random
+import sys
+
+# add the path of ~/naarad/src;   the testing py is under ~/naarad/test
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')))
+import numpy
+import naarad.utils
+
+
+def numpy_stats(data_list, stats_to_calculate, percentiles_to_calculate):
+  """
+  Reference stats computed with one numpy call per stat and per percentile
+  """
+  stats_to_numpy_method_map = {'mean': numpy.mean, 'avg': numpy.mean, 'std': numpy.std, 'median': numpy.median, 'min': numpy.amin,
+                               'max': numpy.amax}
+  calculated_stats = dict((stat, stats_to_numpy_method_map[stat](data_list)) for stat in stats_to_calculate)
+  calculated_percentiles = dict((percentile, numpy.percentile(data_list, percentile)) for percentile in percentiles_to_calculate)
+  return calculated_stats, calculated_percentiles
+
+
+def test_calculate_stats():
+  random.seed(5)
+  stats_to_calculate = ['mean', 'std', 'median', 'min', 'max', 'avg']
+  percentiles_to_calculate = range(0, 101) + [99.9]
+  for size in (1, 2, 3, 10, 101, 5000):
+    data = [random.lognormvariate(0, 2) for i in range(size)]
+    assert naarad.utils.calculate_stats(data, stats_to_calculate, percentiles_to_calculate) == \
+        numpy_stats(data, stats_to_calculate, percentiles_to_calculate)
+    data = [int(value * 100) for value in data]
+    assert naarad.utils.calculate_stats(data, stats_to_calculate, percentiles_to_calculate) == \
+        numpy_stats(data, stats_to_calculate, percentiles_to_calculate)
+
+
+def test_calculate_stats_unsupported():
+  assert naarad.utils.calculate_stats([], ['mean'], [50]) == ({}, {})
+  calculated_stats, calculated_percentiles = naarad.utils.calculate_stats([3.0, 1.0, 2.0], ['mean', 'mode'], [50, '90'])
+  assert calculated_stats == {'mean': 2.0}
+  assert calculated_percentiles == {50: 2.0}